@@ -1,4 +1,14 @@
-from . import agent
+import importlib
 
 
 __all__ = ["agent"]
+
+
+def __getattr__(name):
+    # The agent module imports google.adk and builds the agent, which takes
+    # seconds; it is only loaded on first access, so importing the config,
+    # entities or tools doesn't pay for it. ADK's agent loader imports
+    # agent.agent itself.
+    if name == "agent":
+        return importlib.import_module(".agent", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,15 +2,12 @@ import logging
 import warnings
 from google.adk import Agent
 from .config import Config
-from .prompts import INSTRUCTION
+from .prompts import STATIC_INSTRUCTION, customer_context
 from .shared_libraries.callbacks import before_agent
-from .tools.tools import (
-    check_product_list,
-    get_product_recommendations,
-    check_product_availability,
-    access_cart_information,
-    modify_cart,
-)
+from .shared_libraries.compaction import HistoryCompactor
+from .shared_libraries.context_cache import PromptPrefixCache, build_context_cache
+from .shared_libraries.scheduler import LlmScheduler, Priority, ScheduledLlm
+from .tools.registry import registry
 
 warnings.filterwarnings("ignore", category=UserWarning, module=".*pydantic.*")
 
@@ -19,17 +16,35 @@ configs = Config()
 # configure logging __name__
 logger = logging.getLogger(__name__)
 
+# All outbound model calls are queued here by priority (see scheduler.py).
+scheduler = LlmScheduler(
+    max_concurrency=configs.scheduler_settings.max_concurrency,
+    rpm=configs.scheduler_settings.rpm,
+    window_seconds=configs.scheduler_settings.window_seconds,
+    deadlines={
+        Priority.INTERACTIVE: configs.scheduler_settings.interactive_deadline_secs,
+        Priority.EVAL: configs.scheduler_settings.eval_deadline_secs,
+        Priority.BATCH: configs.scheduler_settings.batch_deadline_secs,
+    },
+)
+compactor = HistoryCompactor(
+    token_budget=configs.compaction_settings.token_budget,
+    keep_recent_turns=configs.compaction_settings.keep_recent_turns,
+)
+prompt_cache = PromptPrefixCache(
+    build_context_cache(
+        configs.context_cache_settings.provider,
+        configs.context_cache_settings.ttl_seconds,
+    )
+)
+
 
 root_agent = Agent(
-    model=configs.agent_settings.model,
-    instruction=INSTRUCTION,
+    model=ScheduledLlm.wrap(configs.agent_settings.model, scheduler),
+    static_instruction=STATIC_INSTRUCTION,
+    instruction=customer_context,
     name=configs.agent_settings.name,
-    tools=[
-        check_product_list,
-        get_product_recommendations,
-        check_product_availability,
-        access_cart_information,
-        modify_cart,
-    ],
+    tools=registry.tools,
     before_agent_callback=before_agent,
+    before_model_callback=[compactor.callback, prompt_cache.callback],
 )
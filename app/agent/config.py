@@ -15,6 +15,192 @@ class AgentModel(BaseModel):
     model: str = Field(default="gemini-2.5-flash")
 
 
+class SchedulerModel(BaseModel):
+    """LLM request scheduler settings."""
+
+    max_concurrency: int = Field(default=4)
+    rpm: int = Field(default=10)
+    window_seconds: float = Field(default=60.0)
+    interactive_deadline_secs: float = Field(default=30.0)
+    eval_deadline_secs: float = Field(default=120.0)
+    batch_deadline_secs: float = Field(default=600.0)
+
+
+class CompactionModel(BaseModel):
+    """History compaction settings."""
+
+    token_budget: int = Field(default=8000)
+    # Turns never compacted, including the current one.
+    keep_recent_turns: int = Field(default=2, ge=1)
+
+
+class ContextCacheModel(BaseModel):
+    """Prompt prefix caching settings."""
+
+    # "none" relies on the provider's implicit prefix caching, "gemini" creates
+    # explicit Gemini context caches and "memory" is a local stand-in.
+    provider: str = Field(default="none")
+    ttl_seconds: int = Field(default=1800)
+
+
+class CustomerStoreModel(BaseModel):
+    """Customer repository settings."""
+
+    db_path: str = Field(default=":memory:")
+    # Loaded into the store on first use when the store is empty.
+    fixture_path: str | None = Field(
+        default=os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "entities/data/customers.json"
+        )
+    )
+    cache_size: int = Field(default=10_000)
+
+
+class CartStoreModel(BaseModel):
+    """Shopping cart store settings."""
+
+    # A file path when several server workers must see the same carts;
+    # deploy/workers.py won't start more than one worker on ":memory:".
+    db_path: str = Field(default=":memory:")
+
+
+class ServerModel(BaseModel):
+    """Production API server settings, used by deploy/workers.py."""
+
+    host: str = Field(default="0.0.0.0")
+    port: int = Field(default=8080)
+    # Worker processes; 0 for one per CPU.
+    workers: int = Field(default=0)
+    # Connections a worker serves at once before answering 503, and the
+    # listen backlog shared by all workers.
+    limit_concurrency: int | None = Field(default=200)
+    backlog: int = Field(default=2048)
+    # A worker is replaced after max_requests requests, plus a random
+    # 0..max_requests_jitter so that workers don't restart together.
+    max_requests: int | None = Field(default=10_000)
+    max_requests_jitter: int = Field(default=1_000)
+    # Seconds a stopping worker has to finish its requests.
+    graceful_timeout_secs: float = Field(default=30.0)
+    # Divide scheduler_settings.max_concurrency and rpm between the workers,
+    # so that together they keep to the configured limits.
+    split_scheduler_limits: bool = Field(default=True)
+    # A SQLAlchemy database URL, e.g. postgresql://..., to store sessions
+    # with ADK's DatabaseSessionService instead of session_store_settings.
+    session_service_uri: str | None = Field(default=None)
+
+
+class SessionStoreModel(BaseModel):
+    """Agent session store settings, used by deploy/fast-api.py."""
+
+    # None for ADK's in-memory sessions, which are lost on restart and kept
+    # by the worker that created them.
+    db_path: str | None = Field(
+        default=os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "../../sessions.db"
+        )
+    )
+    # Appended events are written in batches of up to batch_size, at the end
+    # of each turn, or after flush_interval_secs, whichever comes first.
+    batch_size: int = Field(default=64)
+    flush_interval_secs: float = Field(default=0.05)
+    # Sessions with more events have the tool calls of all but their last
+    # keep_recent_turns turns deleted, then their oldest turns; None disables
+    # compaction.
+    compact_after_events: int | None = Field(default=200)
+    keep_recent_turns: int = Field(default=4)
+
+
+class SegmentModel(BaseModel):
+    """Customer segment index settings."""
+
+    n_segments: int = Field(default=8)
+    # Precomputed index (.npz); built from the repository when missing.
+    index_path: str | None = Field(default=None)
+
+
+class ToolExecutorModel(BaseModel):
+    """MCP server tool executor settings."""
+
+    thread_workers: int = Field(default=8)
+    # A process pool is only started when process_workers > 0.
+    process_workers: int = Field(default=0)
+    # CPU-heavy tools that run on the process pool when there is one. Only
+    # tools registered as stateless are allowed.
+    process_tools: list[str] = Field(default=["get_product_recommendations"])
+    # Maximum concurrent calls per tool; tools not listed are only bounded by
+    # the pool size.
+    tool_limits: dict[str, int] = Field(default={})
+    # Seconds a tool call may run before the server gives up on it; tools not
+    # in tool_timeouts get default_timeout_secs, None for no limit. A client's
+    # request deadline applies too, whichever is sooner.
+    default_timeout_secs: float | None = Field(default=30.0)
+    tool_timeouts: dict[str, float] = Field(default={})
+
+
+class McpResponseModel(BaseModel):
+    """MCP server response settings."""
+
+    # "auto" (orjson when installed, else pydantic), "orjson", "pydantic", "json".
+    serializer: str = Field(default="auto")
+    # Send dict results as structured content too. This roughly doubles the
+    # response size, as the text content is kept for older clients.
+    structured_content: bool = Field(default=True)
+    # Share of tool results written to the debug log, at most
+    # debug_max_per_second of them, truncated to debug_max_chars.
+    debug_sample_rate: float = Field(default=0.01)
+    debug_max_per_second: float = Field(default=5.0)
+    debug_max_chars: int = Field(default=2000)
+
+
+class McpClientModel(BaseModel):
+    """Pooled MCP client settings."""
+
+    # Warm sessions kept open, each carrying up to max_in_flight_per_session
+    # concurrent calls. Callers beyond that wait; more than max_waiting
+    # waiting callers are turned away.
+    pool_size: int = Field(default=4)
+    max_in_flight_per_session: int = Field(default=16)
+    max_waiting: int | None = Field(default=256)
+    request_timeout_secs: float = Field(default=30.0)
+    connect_timeout_secs: float = Field(default=10.0)
+    # Failed sessions reconnect with exponential backoff between these delays.
+    reconnect_delay_secs: float = Field(default=0.5)
+    max_reconnect_delay_secs: float = Field(default=30.0)
+    # Client-side cache of read-only calls, used with ToolCache.from_config().
+    # Seconds to keep each method's results; methods not listed aren't cached.
+    cache_ttls: dict[str, float] = Field(
+        default={
+            "check_product_list": 60.0,
+            "get_product_recommendations": 30.0,
+            "get_version": 300.0,
+        }
+    )
+    cache_max_size: int = Field(default=1024)
+    # Deadlines, retries and hedging of client calls, used with
+    # CallPolicy.from_config(). Seconds a call may take, retries included.
+    call_timeout_secs: float = Field(default=30.0)
+    # Idempotent calls that fail on the transport or are turned away by the
+    # server are retried with jittered exponential backoff.
+    max_retries: int = Field(default=2)
+    retry_backoff_secs: float = Field(default=0.1)
+    max_retry_backoff_secs: float = Field(default=2.0)
+    # Seconds before a slow idempotent call is sent again on another session;
+    # None disables hedging.
+    hedge_after_secs: float | None = Field(default=None)
+    # Read-only tools: CallPolicy retries and hedges them, and HistoryCompactor
+    # drops an earlier result when the same call is repeated.
+    idempotent_tools: list[str] = Field(
+        default=[
+            "check_product_list",
+            "get_product_recommendations",
+            "check_product_availability",
+            "access_cart_information",
+            "get_purchase_history",
+            "get_purchase_analytics",
+        ]
+    )
+
+
 class Config(BaseSettings):
     """Configuration settings for the customer service agent."""
 
@@ -25,6 +211,17 @@ class Config(BaseSettings):
     )
 
     agent_settings: AgentModel = Field(default=AgentModel())
+    scheduler_settings: SchedulerModel = Field(default=SchedulerModel())
+    compaction_settings: CompactionModel = Field(default=CompactionModel())
+    context_cache_settings: ContextCacheModel = Field(default=ContextCacheModel())
+    customer_store_settings: CustomerStoreModel = Field(default=CustomerStoreModel())
+    cart_store_settings: CartStoreModel = Field(default=CartStoreModel())
+    server_settings: ServerModel = Field(default=ServerModel())
+    session_store_settings: SessionStoreModel = Field(default=SessionStoreModel())
+    segment_settings: SegmentModel = Field(default=SegmentModel())
+    tool_executor_settings: ToolExecutorModel = Field(default=ToolExecutorModel())
+    mcp_response_settings: McpResponseModel = Field(default=McpResponseModel())
+    mcp_client_settings: McpClientModel = Field(default=McpClientModel())
     app_name: str = "customer_services_app"
     CLOUD_PROJECT: str = Field(default="dev")
     CLOUD_LOCATION: str = Field(default="europe-west2")
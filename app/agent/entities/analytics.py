@@ -0,0 +1,141 @@
+import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from .customer import Customer, Purchase, add_department_spend
+
+# Loyalty points earned per whole pound spent.
+POINTS_PER_POUND = 1
+
+
+class PurchaseAnalytics(BaseModel):
+    """
+    Represents running purchase analytics for a customer.
+
+    Every field is a running total updated by add(), so reads never rescan
+    the purchase history. Recency and frequency are derived at read time from
+    the stored dates.
+    """
+
+    customer_id: str
+    order_count: int = 0
+    total_spend: float = 0.0
+    spend_by_department: Dict[str, float] = Field(default_factory=dict)
+    quantity_by_product: Dict[str, int] = Field(default_factory=dict)
+    product_names: Dict[str, str] = Field(default_factory=dict)
+    first_order_date: Optional[str] = None
+    last_order_date: Optional[str] = None
+    loyalty_points_balance: int = 0
+    model_config = ConfigDict(from_attributes=True)
+
+    @classmethod
+    def for_customer(
+        cls, customer: Customer, purchases: Optional[List[Purchase]] = None
+    ) -> "PurchaseAnalytics":
+        """
+        Builds the analytics of a customer from their full history.
+
+        The customer's current loyalty_points are taken as the balance after
+        these purchases.
+
+        Args:
+            customer: The customer.
+            purchases: Their purchase history. When None, the totals are taken
+                from the customer's purchase summary, and the products from
+                its recent orders only.
+
+        Returns:
+            The analytics aggregate.
+        """
+        if purchases is None:
+            summary = customer.purchase_summary
+            analytics = cls(
+                customer_id=customer.customer_id,
+                order_count=summary.order_count,
+                total_spend=summary.total_spend,
+                spend_by_department=dict(summary.category_spend),
+                first_order_date=summary.first_order_date,
+                last_order_date=summary.last_order_date,
+            )
+            for purchase in summary.recent_orders:
+                analytics._add_products(purchase)
+        else:
+            analytics = cls(customer_id=customer.customer_id)
+            for purchase in purchases:
+                analytics.add(purchase, earn_points=False)
+        analytics.loyalty_points_balance = customer.loyalty_points
+        return analytics
+
+    def add(self, purchase: Purchase, earn_points: bool = True) -> None:
+        """
+        Folds one new purchase into the running totals.
+
+        Args:
+            purchase: The purchase to add.
+            earn_points: Credit the loyalty points earned by the purchase.
+        """
+        self.order_count += 1
+        self.total_spend = round(self.total_spend + purchase.total_amount, 2)
+        if self.first_order_date is None or purchase.date < self.first_order_date:
+            self.first_order_date = purchase.date
+        if self.last_order_date is None or purchase.date > self.last_order_date:
+            self.last_order_date = purchase.date
+
+        add_department_spend(self.spend_by_department, purchase)
+        self._add_products(purchase)
+        if earn_points:
+            self.loyalty_points_balance += int(purchase.total_amount * POINTS_PER_POUND)
+
+    def _add_products(self, purchase: Purchase) -> None:
+        for item in purchase.items:
+            self.quantity_by_product[item.product_id] = (
+                self.quantity_by_product.get(item.product_id, 0) + item.quantity
+            )
+            self.product_names[item.product_id] = item.name
+
+    def top_products(self, n: int = 5) -> List[Dict]:
+        """The n products bought in the largest quantities."""
+        top = sorted(self.quantity_by_product.items(), key=lambda kv: -kv[1])[:n]
+        return [
+            {"product_id": pid, "name": self.product_names[pid], "quantity": qty}
+            for pid, qty in top
+        ]
+
+    def report(self, today: Optional[datetime.date] = None) -> Dict:
+        """
+        Summarises the analytics for the agent or an API response.
+
+        Args:
+            today: Reference date for recency, defaults to today.
+
+        Returns:
+            Spend per department, recency, frequency, top products and the
+            loyalty points balance.
+        """
+        today = today or datetime.date.today()
+        recency_days = frequency = None
+        if self.last_order_date:
+            last = datetime.date.fromisoformat(self.last_order_date)
+            first = datetime.date.fromisoformat(self.first_order_date)
+            recency_days = (today - last).days
+            years = max((today - first).days / 365.25, 1 / 12)
+            frequency = round(self.order_count / years, 2)
+        return {
+            "customer_id": self.customer_id,
+            "order_count": self.order_count,
+            "total_spend": self.total_spend,
+            "average_order_value": (
+                round(self.total_spend / self.order_count, 2) if self.order_count else 0.0
+            ),
+            "spend_by_department": dict(
+                sorted(self.spend_by_department.items(), key=lambda kv: -kv[1])
+            ),
+            "first_order_date": self.first_order_date,
+            "last_order_date": self.last_order_date,
+            "days_since_last_order": recency_days,
+            "orders_per_year": frequency,
+            "top_products": self.top_products(),
+            "loyalty_points_balance": self.loyalty_points_balance,
+            "currency": "GBP",
+        }
@@ -0,0 +1,150 @@
+import contextlib
+import copy
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS carts (
+    customer_id TEXT PRIMARY KEY,
+    items TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class CartStore:
+    """
+    Shopping carts stored in SQLite, so that every server worker process
+    sees the same carts.
+
+    edit() reads, changes and writes a cart in one IMMEDIATE transaction:
+    concurrent edits of any cart, from other threads or processes, wait for
+    it instead of overwriting it.
+    """
+
+    def __init__(self, path: str = ":memory:", busy_timeout: float = 30.0):
+        """
+        Args:
+            path: The database file, or ":memory:" for a private store.
+            busy_timeout: Seconds to wait for another writer to finish.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Transactions are begun explicitly in edit().
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, customer_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns a copy of a customer's cart.
+
+        Args:
+            customer_id: The ID of the customer.
+
+        Returns:
+            The cart items, or None if the customer has no cart yet.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT items FROM carts WHERE customer_id = ?", (customer_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    @contextlib.contextmanager
+    def edit(
+        self, customer_id: str, default: Optional[List[Dict[str, Any]]] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yields a customer's cart to change in place, and stores it when the
+        block exits. If the block raises, the cart is left as it was.
+
+        Args:
+            customer_id: The ID of the customer.
+            default: The cart of a customer who has none yet; empty if None.
+
+        Yields:
+            The cart items.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT items FROM carts WHERE customer_id = ?", (customer_id,)
+                ).fetchone()
+                before = row[0] if row is not None else None
+                items = (
+                    json.loads(before)
+                    if before is not None
+                    else copy.deepcopy(default or [])
+                )
+                yield items
+                after = json.dumps(items)
+                if after != before:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO carts (customer_id, items) VALUES (?, ?)",
+                        (customer_id, after),
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM carts")
+
+
+_store: Optional[CartStore] = None
+_store_lock = threading.Lock()
+
+
+def get_cart_store() -> CartStore:
+    """Returns the process-wide cart store configured in cart_store_settings."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from ..config import Config
+
+                _store = CartStore(Config().cart_store_settings.db_path)
+    return _store
+
+
+def set_cart_store(store: Optional[CartStore]) -> Optional[CartStore]:
+    """
+    Replaces the process-wide cart store, e.g. with a test store.
+
+    Args:
+        store: The new store, or None to open the configured one on the next
+            get_cart_store().
+
+    Returns:
+        The store it replaces, to restore afterwards.
+    """
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
+
+
+def close_cart_store() -> None:
+    """Closes the process-wide cart store, e.g. before forking server
+    workers; the next get_cart_store() opens it again."""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
@@ -0,0 +1,132 @@
+from typing import Any, Dict
+
+# Departments of the product tools, in catalogue order.
+DEPARTMENTS = (
+    "tools",
+    "seeds",
+    "decor",
+    "irrigation",
+    "soil",
+    "fertilizer",
+    "support",
+)
+# Department of products that aren't in the catalogue.
+OTHER_DEPARTMENT = "other"
+
+# Products for sale, by product id.
+PRODUCTS: Dict[str, Dict[str, Any]] = {
+    "tool-001": {"name": "Hand Trowel", "price": 12.99, "department": "tools"},
+    "tool-002": {"name": "Pruning Shears", "price": 24.99, "department": "tools"},
+    "tool-003": {"name": "Garden Spade", "price": 34.99, "department": "tools"},
+    "seed-101": {
+        "name": "Tomato Seeds - Cherry",
+        "price": 3.99,
+        "department": "seeds",
+    },
+    "seed-102": {
+        "name": "Sunflower Seeds - Giant",
+        "price": 4.99,
+        "department": "seeds",
+    },
+    "seed-103": {
+        "name": "Petunia Seeds - Mixed Colors",
+        "price": 5.99,
+        "department": "seeds",
+    },
+    "decor-201": {
+        "name": "Terracotta Planter - Large",
+        "price": 18.99,
+        "department": "decor",
+    },
+    "decor-202": {
+        "name": "Solar Garden Lantern",
+        "price": 29.99,
+        "department": "decor",
+    },
+    "decor-203": {
+        "name": "Garden Stepping Stones",
+        "price": 39.99,
+        "department": "decor",
+    },
+    "irrig-301": {
+        "name": "Soaker Hose - 25ft",
+        "price": 19.99,
+        "department": "irrigation",
+    },
+    "irrig-302": {
+        "name": "Copper Watering Can",
+        "price": 42.99,
+        "department": "irrigation",
+    },
+    "soil-456": {
+        "name": "Bloom Booster Potting Mix",
+        "price": 14.99,
+        "department": "soil",
+    },
+    "fert-789": {
+        "name": "Flower Power Fertilizer",
+        "price": 9.99,
+        "department": "fertilizer",
+    },
+    "tool-004": {
+        "name": "Deadheading Snips",
+        "price": 16.99,
+        "department": "tools",
+    },
+    "soil-789": {
+        "name": "Vegetable Garden Soil",
+        "price": 12.99,
+        "department": "soil",
+    },
+    "fert-456": {
+        "name": "Tomato & Vegetable Fertilizer",
+        "price": 11.99,
+        "department": "fertilizer",
+    },
+    "supp-101": {
+        "name": "Tomato Cages - Set of 3",
+        "price": 24.99,
+        "department": "support",
+    },
+    "soil-123": {
+        "name": "All-Purpose Garden Soil",
+        "price": 10.99,
+        "department": "soil",
+    },
+    "fert-321": {
+        "name": "High Nitrogen Fertilizer",
+        "price": 13.99,
+        "department": "fertilizer",
+    },
+    "fert-general": {
+        "name": "General Purpose Plant Food",
+        "price": 8.99,
+        "department": "fertilizer",
+    },
+}
+
+
+# Products no longer sold that still appear in purchase histories.
+DISCONTINUED_PRODUCTS: Dict[str, Dict[str, Any]] = {
+    "fert-111": {"name": "All-Purpose Fertilizer", "department": "fertilizer"},
+    "trowel-222": {"name": "Gardening Trowel", "department": "tools"},
+    "seeds-333": {"name": "Tomato Seeds (Variety Pack)", "department": "seeds"},
+    "pots-444": {"name": "Terracotta Pots (6-inch)", "department": "decor"},
+    "gloves-555": {"name": "Gardening Gloves (Leather)", "department": "tools"},
+    "pruner-666": {"name": "Pruning Shears", "department": "tools"},
+}
+
+
+def product_department(product_id: str) -> str:
+    """
+    Department of a product in the catalogue, sold or discontinued.
+
+    Args:
+        product_id: The product, e.g. "seed-101".
+
+    Returns:
+        The department, e.g. "seeds", or OTHER_DEPARTMENT for an unknown
+        product.
+    """
+    product = PRODUCTS.get(product_id) or DISCONTINUED_PRODUCTS.get(product_id)
+    return product["department"] if product is not None else OTHER_DEPARTMENT
@@ -1,5 +1,19 @@
-from typing import List, Dict, Optional
-from pydantic import BaseModel, Field, ConfigDict
+import functools
+from typing import Any, List, Dict, Optional
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+
+from .catalog import product_department
+
+
+@functools.cache
+def type_adapter(tp: Any) -> TypeAdapter:
+    """
+    Returns a TypeAdapter for a type, building its validator only once.
+
+    Args:
+        tp: The type to validate, e.g. List[Purchase].
+    """
+    return TypeAdapter(tp)
 
 
 class Address(BaseModel):
@@ -36,6 +50,74 @@ class Purchase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+def add_department_spend(spend: Dict[str, float], purchase: Purchase) -> None:
+    """
+    Adds a purchase's total to the running spend per catalogue department.
+
+    The total is spread over the departments of the items in proportion to
+    their quantities, as purchases don't carry item prices.
+
+    Args:
+        spend: Spend per department, updated in place.
+        purchase: The purchase to add.
+    """
+    quantity = sum(item.quantity for item in purchase.items)
+    for item in purchase.items if quantity else []:
+        department = product_department(item.product_id)
+        share = purchase.total_amount * item.quantity / quantity
+        spend[department] = round(spend.get(department, 0.0) + share, 2)
+
+
+class PurchaseSummary(BaseModel):
+    """
+    Represents a summary of a customer's purchase history.
+
+    The full history is stored separately and paged through the
+    get_purchase_history tool.
+    """
+
+    order_count: int = 0
+    item_count: int = 0
+    total_spend: float = 0.0
+    first_order_date: Optional[str] = None
+    last_order_date: Optional[str] = None
+    recent_orders: List[Purchase] = Field(default_factory=list)
+    # Spend per catalogue department, see add_department_spend.
+    category_spend: Dict[str, float] = Field(default_factory=dict)
+    model_config = ConfigDict(from_attributes=True)
+
+    def add(self, purchase: Purchase, recent: int = 3) -> None:
+        """
+        Folds one purchase into the summary.
+
+        Args:
+            purchase: The purchase to add.
+            recent: How many of the latest orders to keep in recent_orders.
+        """
+        self.order_count += 1
+        self.total_spend = round(self.total_spend + purchase.total_amount, 2)
+        if self.first_order_date is None or purchase.date < self.first_order_date:
+            self.first_order_date = purchase.date
+        if self.last_order_date is None or purchase.date > self.last_order_date:
+            self.last_order_date = purchase.date
+
+        self.item_count += sum(item.quantity for item in purchase.items)
+        add_department_spend(self.category_spend, purchase)
+
+        self.recent_orders.append(purchase)
+        self.recent_orders.sort(key=lambda p: p.date, reverse=True)
+        del self.recent_orders[recent:]
+
+    @classmethod
+    def from_purchases(
+        cls, purchases: List[Purchase], recent: int = 3
+    ) -> "PurchaseSummary":
+        summary = cls()
+        for purchase in purchases:
+            summary.add(purchase, recent)
+        return summary
+
+
 class CommunicationPreferences(BaseModel):
     """
     Represents a customer's communication preferences.
@@ -74,7 +156,7 @@ class Customer(BaseModel):
     customer_start_date: str
     years_as_customer: int
     billing_address: Address
-    purchase_history: List[Purchase]
+    purchase_summary: PurchaseSummary = Field(default_factory=PurchaseSummary)
     loyalty_points: int
     preferred_store: str
     communication_preferences: CommunicationPreferences
@@ -102,81 +184,6 @@ class Customer(BaseModel):
         Returns:
             The Customer object if found, None otherwise.
         """
-        # In a real application, this would involve a database lookup.
-        # For this example, we'll just return a dummy customer.
-        return Customer(
-            customer_id=current_customer_id,
-            account_number="428765091",
-            customer_first_name="Alex",
-            customer_last_name="Johnson",
-            email="alex.johnson@example.com",
-            phone_number="+1-702-555-1212",
-            customer_start_date="2022-06-10",
-            years_as_customer=2,
-            billing_address=Address(
-                street="123 Main St", city="Anytown", state="CA", zip="12345"
-            ),
-            purchase_history=[  # Example purchase history
-                Purchase(
-                    date="2023-03-05",
-                    items=[
-                        Product(
-                            product_id="fert-111",
-                            name="All-Purpose Fertilizer",
-                            quantity=1,
-                        ),
-                        Product(
-                            product_id="trowel-222",
-                            name="Gardening Trowel",
-                            quantity=1,
-                        ),
-                    ],
-                    total_amount=35.98,
-                ),
-                Purchase(
-                    date="2023-07-12",
-                    items=[
-                        Product(
-                            product_id="seeds-333",
-                            name="Tomato Seeds (Variety Pack)",
-                            quantity=2,
-                        ),
-                        Product(
-                            product_id="pots-444",
-                            name="Terracotta Pots (6-inch)",
-                            quantity=4,
-                        ),
-                    ],
-                    total_amount=42.5,
-                ),
-                Purchase(
-                    date="2024-01-20",
-                    items=[
-                        Product(
-                            product_id="gloves-555",
-                            name="Gardening Gloves (Leather)",
-                            quantity=1,
-                        ),
-                        Product(
-                            product_id="pruner-666",
-                            name="Pruning Shears",
-                            quantity=1,
-                        ),
-                    ],
-                    total_amount=55.25,
-                ),
-            ],
-            loyalty_points=133,
-            preferred_store="Anytown Garden Store",
-            communication_preferences=CommunicationPreferences(
-                email=True, sms=False, push_notifications=True
-            ),
-            garden_profile=GardenProfile(
-                type="backyard",
-                size="medium",
-                sun_exposure="full sun",
-                soil_type="unknown",
-                interests=["flowers", "vegetables"],
-            ),
-            scheduled_appointments={},
-        )
+        from .repository import get_repository
+
+        return get_repository().get(current_customer_id)
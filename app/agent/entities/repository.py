@@ -0,0 +1,629 @@
+import contextlib
+import gc
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .analytics import PurchaseAnalytics
+from .customer import Customer, Purchase, PurchaseSummary, type_adapter
+from .views import CustomerView
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_FIXTURE = os.path.join(DATA_DIR, "customers.json")
+
+# SQLite builds before 3.32 cap bound parameters at 999 per statement.
+MAX_BATCH = 900
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS purchases (
+    customer_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (customer_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS purchase_analytics (
+    customer_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Pauses the cyclic garbage collector while building many objects.
+
+    Bulk model construction allocates enough container objects to trigger
+    repeated full collections over everything already built, which costs
+    several times the validation itself.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def decode_many(model: Any, documents: List[str]) -> List[Any]:
+    """
+    Validates stored JSON documents with one call to a cached TypeAdapter.
+
+    Args:
+        model: The model class of every document.
+        documents: The JSON documents.
+
+    Returns:
+        The models, in order.
+    """
+    if not documents:
+        return []
+    with gc_paused():
+        return type_adapter(List[model]).validate_json("[" + ",".join(documents) + "]")
+
+
+def split_record(record: Dict[str, Any]) -> Tuple[Customer, List[Purchase]]:
+    """
+    Splits a full customer record into the profile and its purchase history.
+
+    Args:
+        record: A customer dict, optionally with a "purchase_history" list.
+
+    Returns:
+        The Customer, with a summary of the history, and the purchases sorted
+        oldest first.
+    """
+    record = dict(record)
+    purchases = sorted(
+        type_adapter(List[Purchase]).validate_python(
+            record.pop("purchase_history", None) or []
+        ),
+        key=lambda p: p.date,
+    )
+    if purchases:
+        record["purchase_summary"] = PurchaseSummary.from_purchases(purchases)
+    return Customer.model_validate(record), purchases
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe least-recently-used cache.
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[object]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: object) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def invalidate(self) -> None:
+        """Drops every entry, keeping the hit and miss counts."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class CustomerRepository:
+    """
+    Customer profiles stored in SQLite with an in-process LRU cache in front.
+
+    Profiles are stored as JSON documents keyed by customer id. Batches are
+    decoded with one TypeAdapter call, and get_view() skips building models
+    for read-only use. Cached Customer objects are shared between callers and
+    must be treated as read-only; use model_copy() before changing one.
+
+    Several processes may share a file database. Each keeps its own cache,
+    which is dropped whenever another process has written to the database,
+    so cached customers are never older than the last read.
+
+    Listeners added with add_listener() are called with the ids of the
+    customers each write changed, after it commits.
+    """
+
+    def __init__(self, path: str = ":memory:", cache_size: int = 10_000):
+        self.path = path
+        self.cache = LRUCache(cache_size)
+        # Re-entrant, so methods holding it can call each other.
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[List[str]], None]] = []
+        # Bumped by every write. A read only caches what it loaded if no
+        # write happened since it started, or it could cache a stale row.
+        self._generation = 0
+        self._cache_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._data_version = self._read_data_version()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _read_data_version(self) -> int:
+        # Changes when another connection commits to the database, not when
+        # this one does.
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_external_writes(self) -> None:
+        """Drops the cache if another process has written since the last check."""
+        if self.path == ":memory:":
+            return
+        version = self._read_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            with self._cache_lock:
+                self._generation += 1
+                self.cache.invalidate()
+
+    def _evict(self, customer_ids: Iterable[str]) -> None:
+        """Drops written customers from the cache, after the write commits."""
+        with self._cache_lock:
+            self._generation += 1
+            for customer_id in customer_ids:
+                self.cache.pop(customer_id)
+
+    def _cache_put(self, customer_id: str, customer: Customer, generation: int) -> None:
+        with self._cache_lock:
+            if self._generation == generation:
+                self.cache.put(customer_id, customer)
+
+    def add_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """
+        Calls listener with the changed customer ids after every write.
+
+        Listeners run on the writing thread and must not block; exceptions
+        are logged and don't fail the write.
+
+        Args:
+            listener: Called with the list of changed customer ids.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[List[str]], None]) -> None:
+        with contextlib.suppress(ValueError):
+            self._listeners.remove(listener)
+
+    def _notify(self, customer_ids: List[str]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(customer_ids)
+            except Exception:
+                logger.exception("Customer change listener %r failed", listener)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+
+    def customer_ids(self, limit: int = -1) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT customer_id FROM customers ORDER BY customer_id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_customers(self, batch_size: int = 1000) -> Iterator[Customer]:
+        """
+        Streams every customer in id order, one query per batch.
+
+        Bulk scans bypass the cache so they don't evict the hot entries.
+        """
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT customer_id, data FROM customers WHERE customer_id > ? "
+                    "ORDER BY customer_id LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            yield from decode_many(Customer, [data for _, data in rows])
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    def get(self, customer_id: str) -> Optional[Customer]:
+        """
+        Retrieves one customer, from the cache when possible.
+
+        Args:
+            customer_id: The ID of the customer to retrieve.
+
+        Returns:
+            The Customer object if found, None otherwise.
+        """
+        self._check_external_writes()
+        customer = self.cache.get(customer_id)
+        if customer is not None:
+            return customer
+        generation = self._generation
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM customers WHERE customer_id = ?", (customer_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        customer = Customer.model_validate_json(row[0])
+        self._cache_put(customer_id, customer, generation)
+        return customer
+
+    def get_view(self, customer_id: str) -> Optional[CustomerView]:
+        """
+        Returns a read-only view of a stored profile without building the model.
+
+        Views bypass the cache; the stored JSON is only parsed when an
+        attribute is first read.
+
+        Args:
+            customer_id: The ID of the customer to retrieve.
+
+        Returns:
+            The CustomerView if found, None otherwise.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM customers WHERE customer_id = ?", (customer_id,)
+            ).fetchone()
+        return None if row is None else CustomerView(row[0])
+
+    def get_many(self, customer_ids: Iterable[str]) -> Dict[str, Customer]:
+        """
+        Retrieves several customers with one query per batch of cache misses.
+
+        Args:
+            customer_ids: The IDs of the customers to retrieve.
+
+        Returns:
+            A dict of customer id to Customer. Unknown ids are left out.
+        """
+        self._check_external_writes()
+        found: Dict[str, Customer] = {}
+        missing: List[str] = []
+        for customer_id in dict.fromkeys(customer_ids):
+            customer = self.cache.get(customer_id)
+            if customer is None:
+                missing.append(customer_id)
+            else:
+                found[customer_id] = customer
+
+        for start in range(0, len(missing), MAX_BATCH):
+            batch = missing[start : start + MAX_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            generation = self._generation
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT customer_id, data FROM customers "
+                    f"WHERE customer_id IN ({placeholders})",
+                    batch,
+                ).fetchall()
+            customers = decode_many(Customer, [data for _, data in rows])
+            for (customer_id, _), customer in zip(rows, customers):
+                self._cache_put(customer_id, customer, generation)
+                found[customer_id] = customer
+        return found
+
+    def exists(self, customer_id: str) -> bool:
+        self._check_external_writes()
+        if self.cache.get(customer_id) is not None:
+            return True
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM customers WHERE customer_id = ?", (customer_id,)
+            ).fetchone()
+        return row is not None
+
+    def get_purchases(
+        self,
+        customer_id: str,
+        cursor: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Tuple[List[Purchase], Optional[str]]:
+        """
+        Returns one page of a customer's purchase history, newest first.
+
+        Args:
+            customer_id: The customer whose purchases to read.
+            cursor: The next_cursor of the previous page, None for the first page.
+            page_size: Purchases per page, capped at MAX_PAGE_SIZE.
+
+        Returns:
+            The purchases of the page and the cursor of the next page, or None
+            when this is the last page.
+
+        Raises:
+            ValueError: If cursor is not a cursor returned by this method.
+        """
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        before = None
+        if cursor:
+            if not cursor.isdigit():
+                raise ValueError(f"Invalid cursor {cursor!r}")
+            before = int(cursor)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, data FROM purchases WHERE customer_id = ? "
+                "AND (? IS NULL OR seq < ?) ORDER BY seq DESC LIMIT ?",
+                (customer_id, before, before, page_size + 1),
+            ).fetchall()
+        next_cursor = str(rows[page_size - 1][0]) if len(rows) > page_size else None
+        return decode_many(Purchase, [data for _, data in rows[:page_size]]), next_cursor
+
+    def upsert(
+        self, customer: Customer, purchases: Optional[List[Purchase]] = None
+    ) -> None:
+        """
+        Inserts or replaces a customer.
+
+        Args:
+            customer: The customer profile.
+            purchases: When given, replaces the stored purchase history and
+                rebuilds the analytics from it. The customer's summary is
+                expected to match it.
+        """
+        self._write([(customer, purchases)])
+
+    def upsert_many(self, customers: Iterable[Customer]) -> int:
+        """
+        Inserts or replaces customers in one transaction, keeping their stored
+        purchase histories.
+
+        Args:
+            customers: The customers to store.
+
+        Returns:
+            The number of customers written.
+        """
+        entries = [(customer, None) for customer in customers]
+        self._write(entries)
+        return len(entries)
+
+    def get_analytics(self, customer_id: str) -> Optional[PurchaseAnalytics]:
+        """
+        Returns the running purchase analytics of a customer.
+
+        This is a single row read, whatever the length of the history.
+
+        Args:
+            customer_id: The customer whose analytics to read.
+
+        Returns:
+            The PurchaseAnalytics, or None for an unknown customer.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM purchase_analytics WHERE customer_id = ?",
+                (customer_id,),
+            ).fetchone()
+        if row is not None:
+            return PurchaseAnalytics.model_validate_json(row[0])
+        customer = self.get(customer_id)
+        return None if customer is None else PurchaseAnalytics.for_customer(customer)
+
+    def add_purchase(self, customer_id: str, purchase: Purchase) -> Customer:
+        """
+        Appends a purchase to a customer's history and updates their summary,
+        analytics and loyalty points.
+
+        Args:
+            customer_id: The customer who made the purchase.
+            purchase: The new purchase.
+
+        Returns:
+            The updated Customer.
+        """
+        with self._lock:
+            # Other workers may be adding purchases for the same customer: the
+            # profile and analytics are read from the store, not the cache,
+            # inside the write transaction, which they wait for.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM customers WHERE customer_id = ?", (customer_id,)
+                ).fetchone()
+                if row is None:
+                    raise KeyError(customer_id)
+                customer = Customer.model_validate_json(row[0])
+                row = self._conn.execute(
+                    "SELECT data FROM purchase_analytics WHERE customer_id = ?",
+                    (customer_id,),
+                ).fetchone()
+                analytics = (
+                    PurchaseAnalytics.model_validate_json(row[0])
+                    if row is not None
+                    else PurchaseAnalytics.for_customer(customer)
+                )
+                analytics.add(purchase)
+                customer.purchase_summary.add(purchase)
+                customer.loyalty_points = analytics.loyalty_points_balance
+                self._conn.execute(
+                    "INSERT INTO purchases (customer_id, seq, data) "
+                    "SELECT ?, COALESCE(MAX(seq) + 1, 0), ? FROM purchases "
+                    "WHERE customer_id = ?",
+                    (customer_id, purchase.model_dump_json(), customer_id),
+                )
+                self._conn.execute(
+                    "UPDATE customers SET data = ? WHERE customer_id = ?",
+                    (customer.model_dump_json(), customer_id),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO purchase_analytics (customer_id, data) "
+                    "VALUES (?, ?)",
+                    (customer_id, analytics.model_dump_json()),
+                )
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+            self._evict([customer_id])
+        self._notify([customer_id])
+        return customer
+
+    def load_fixture(self, path: str = DEFAULT_FIXTURE) -> int:
+        """
+        Bulk loads customers from a fixture file.
+
+        The file is either a JSON array of customer objects or JSON lines with
+        one customer object per line. A record's "purchase_history" is moved to
+        the purchases table and summarised on the profile. Every record is
+        validated before any is written.
+
+        Args:
+            path: The fixture file.
+
+        Returns:
+            The number of customers loaded.
+        """
+        with open(path) as f:
+            if path.endswith(".jsonl"):
+                records = [json.loads(line) for line in f if line.strip()]
+            else:
+                records = json.load(f)
+        with gc_paused():
+            entries = [split_record(record) for record in records]
+        self._write(entries)
+        logger.info("Loaded %i customers from %s", len(entries), path)
+        return len(entries)
+
+    def _write(self, entries: List[Tuple[Customer, Optional[List[Purchase]]]]) -> None:
+        customer_rows = [(c.customer_id, c.model_dump_json()) for c, _ in entries]
+        replaced = [(c.customer_id,) for c, purchases in entries if purchases is not None]
+        purchase_rows = [
+            (c.customer_id, seq, purchase.model_dump_json())
+            for c, purchases in entries
+            for seq, purchase in enumerate(purchases or [])
+        ]
+        analytics_rows = [
+            (c.customer_id, PurchaseAnalytics.for_customer(c, purchases).model_dump_json())
+            for c, purchases in entries
+            if purchases is not None
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO customers (customer_id, data) VALUES (?, ?)",
+                    customer_rows,
+                )
+                self._conn.executemany(
+                    "DELETE FROM purchases WHERE customer_id = ?", replaced
+                )
+                self._conn.executemany(
+                    "INSERT INTO purchases (customer_id, seq, data) VALUES (?, ?, ?)",
+                    purchase_rows,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO purchase_analytics (customer_id, data) "
+                    "VALUES (?, ?)",
+                    analytics_rows,
+                )
+        self._evict(customer_id for customer_id, _ in customer_rows)
+        if customer_rows:
+            self._notify([customer_id for customer_id, _ in customer_rows])
+
+
+_repository: Optional[CustomerRepository] = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> CustomerRepository:
+    """
+    Returns the process-wide repository configured in customer_store_settings.
+
+    The store is opened on first use and loaded from the fixture file when
+    it is empty.
+    """
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                from ..config import Config
+
+                settings = Config().customer_store_settings
+                repository = CustomerRepository(settings.db_path, settings.cache_size)
+                if settings.fixture_path and repository.count() == 0:
+                    repository.load_fixture(settings.fixture_path)
+                _repository = repository
+    return _repository
+
+
+def set_repository(repository: Optional[CustomerRepository]) -> None:
+    """Replaces the process-wide repository, e.g. with a test store."""
+    global _repository
+    _repository = repository
+
+
+def close_repository() -> None:
+    """
+    Closes the process-wide repository; the next get_repository() opens it
+    again. Server workers forked from a process that used it must not share
+    its connection, so it is closed before forking.
+    """
+    global _repository
+    with _repository_lock:
+        repository, _repository = _repository, None
+    if repository is not None:
+        repository.close()
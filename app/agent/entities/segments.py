@@ -0,0 +1,346 @@
+import logging
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .catalog import DEPARTMENTS
+from .customer import Customer
+
+logger = logging.getLogger(__name__)
+
+GARDEN_TYPES = ("backyard", "balcony", "allotment", "front garden")
+SIZES = {"small": 0.0, "medium": 0.5, "large": 1.0}
+SOIL_TYPES = ("loam", "clay", "sand", "potting mix")
+INTERESTS = ("flowers", "vegetables", "herbs", "fruit", "containers", "lawn")
+
+FEATURE_NAMES: Tuple[str, ...] = (
+    *(f"type:{t}" for t in GARDEN_TYPES),
+    "size",
+    "sun",
+    *(f"soil:{s}" for s in SOIL_TYPES),
+    *(f"interest:{i}" for i in INTERESTS),
+    *(f"spend:{d}" for d in DEPARTMENTS),
+    "log_orders",
+    "log_spend",
+    "log_loyalty_points",
+    "years_as_customer",
+)
+FEATURE_DIM = len(FEATURE_NAMES)
+
+_OFFSETS = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+
+def _sun(exposure: str) -> float:
+    exposure = exposure.lower()
+    if "full" in exposure:
+        return 1.0
+    if "partial" in exposure:
+        return 0.5
+    return 0.0
+
+
+def customer_features(customer: Customer) -> np.ndarray:
+    """
+    Derives the fixed-length feature vector of a customer.
+
+    The vector holds one-hot garden type and soil, ordinal garden size and sun
+    exposure, multi-hot interests, the share of spend per product category
+    (from the purchase summary) and log-scaled order count, spend and loyalty
+    points. FEATURE_NAMES lists the columns.
+
+    Args:
+        customer: The customer to describe.
+
+    Returns:
+        A float32 vector of FEATURE_DIM values.
+    """
+    vector = np.zeros(FEATURE_DIM, dtype=np.float32)
+    garden = customer.garden_profile
+    garden_type = garden.type.lower()
+    if garden_type in GARDEN_TYPES:
+        vector[_OFFSETS[f"type:{garden_type}"]] = 1.0
+    vector[_OFFSETS["size"]] = SIZES.get(garden.size.lower(), 0.5)
+    vector[_OFFSETS["sun"]] = _sun(garden.sun_exposure)
+    for soil in SOIL_TYPES:
+        if soil in garden.soil_type.lower():
+            vector[_OFFSETS[f"soil:{soil}"]] = 1.0
+    for interest in garden.interests:
+        offset = _OFFSETS.get(f"interest:{interest.lower()}")
+        if offset is not None:
+            vector[offset] = 1.0
+
+    summary = customer.purchase_summary
+    if summary.total_spend > 0:
+        for category, spend in summary.category_spend.items():
+            offset = _OFFSETS.get(f"spend:{category}")
+            if offset is not None:
+                vector[offset] = spend / summary.total_spend
+    vector[_OFFSETS["log_orders"]] = math.log1p(summary.order_count)
+    vector[_OFFSETS["log_spend"]] = math.log1p(summary.total_spend)
+    vector[_OFFSETS["log_loyalty_points"]] = math.log1p(customer.loyalty_points)
+    vector[_OFFSETS["years_as_customer"]] = customer.years_as_customer
+    return vector
+
+
+def kmeans(
+    x: np.ndarray, k: int, iterations: int = 25, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clusters the rows of x with k-means++ seeding and Lloyd iterations.
+
+    Args:
+        x: A (n, d) float32 array.
+        k: Number of clusters, at most n.
+        iterations: Maximum number of Lloyd iterations.
+        seed: Seed for the k-means++ seeding.
+
+    Returns:
+        The (k, d) centroids and the cluster label of every row.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    centroids = np.empty((k, x.shape[1]), dtype=x.dtype)
+    centroids[0] = x[rng.integers(n)]
+    closest = ((x - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        index = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centroids[i] = x[index]
+        closest = np.minimum(closest, ((x - centroids[i]) ** 2).sum(axis=1))
+
+    labels = np.full(n, -1)
+    squared_norms = (x**2).sum(axis=1)[:, None]
+    for _ in range(iterations):
+        distances = squared_norms - 2 * x @ centroids.T + (centroids**2).sum(axis=1)
+        new_labels = distances.argmin(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        # Empty clusters keep their previous centroid.
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids, labels
+
+
+class SegmentIndex:
+    """
+    Array-backed index of customer feature vectors and segment assignments.
+
+    Vectors are standardised per feature and stored sorted by segment, so the
+    members of a segment are one contiguous slice of the matrix. Segment and
+    vector lookups are a dict lookup plus an array index; nearest() searches
+    the query's own segment by default, like an inverted-file index.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        segments: np.ndarray,
+        centroids: np.ndarray,
+        mean: np.ndarray,
+        scale: np.ndarray,
+    ):
+        order = np.argsort(segments, kind="stable")
+        self.ids = ids[order]
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.segments = segments[order]
+        self.centroids = centroids
+        self.mean = mean
+        self.scale = scale
+        self.rows: Dict[str, int] = {
+            customer_id: row for row, customer_id in enumerate(self.ids.tolist())
+        }
+        norms = np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self._unit = self.vectors / np.where(norms > 0, norms, 1)
+        bounds = np.searchsorted(self.segments, np.arange(len(centroids) + 1)).tolist()
+        self._slices = [slice(bounds[s], bounds[s + 1]) for s in range(len(centroids))]
+        self._profiles = [self._describe(s) for s in range(len(centroids))]
+
+    @classmethod
+    def build(
+        cls, customers: Iterable[Customer], n_segments: int = 8, seed: int = 0
+    ) -> "SegmentIndex":
+        """
+        Computes the feature vectors of all customers and clusters them.
+
+        Args:
+            customers: The customers to index.
+            n_segments: Number of segments, capped at the number of customers.
+            seed: Seed for the clustering.
+
+        Returns:
+            The index.
+        """
+        ids: List[str] = []
+        rows: List[np.ndarray] = []
+        for customer in customers:
+            ids.append(customer.customer_id)
+            rows.append(customer_features(customer))
+        if not rows:
+            raise ValueError("Cannot build a segment index without customers")
+        raw = np.vstack(rows)
+        mean = raw.mean(axis=0)
+        scale = raw.std(axis=0)
+        scale[scale == 0] = 1.0
+        vectors = (raw - mean) / scale
+        centroids, labels = kmeans(vectors, min(n_segments, len(ids)), seed=seed)
+        return cls(np.array(ids), vectors, labels, centroids, mean, scale)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, customer_id: str) -> bool:
+        return customer_id in self.rows
+
+    def vector(self, customer_id: str) -> Optional[np.ndarray]:
+        row = self.rows.get(customer_id)
+        return None if row is None else self.vectors[row]
+
+    def segment(self, customer_id: str) -> Optional[int]:
+        row = self.rows.get(customer_id)
+        return None if row is None else int(self.segments[row])
+
+    def profile(self, segment: int) -> Dict:
+        """
+        Describes a segment: its size and the interests and product categories
+        its centroid leans towards.
+        """
+        return self._profiles[segment]
+
+    def transform(self, customer: Customer) -> np.ndarray:
+        """Standardised feature vector of a customer that may not be indexed."""
+        return (customer_features(customer) - self.mean) / self.scale
+
+    def assign(self, vector: np.ndarray) -> int:
+        """Segment of the centroid closest to a standardised vector."""
+        return int(((self.centroids - vector) ** 2).sum(axis=1).argmin())
+
+    def nearest(
+        self,
+        query: Union[str, np.ndarray],
+        k: int = 5,
+        within_segment: bool = True,
+    ) -> List[Tuple[str, float]]:
+        """
+        Finds the customers most similar to a customer or a vector.
+
+        Args:
+            query: An indexed customer id or a standardised feature vector.
+            k: Number of neighbours to return.
+            within_segment: Search only the query's segment instead of every
+                customer.
+
+        Returns:
+            Up to k (customer id, cosine similarity) pairs, most similar first.
+            A customer id query is not returned as its own neighbour.
+        """
+        exclude = None
+        if isinstance(query, str):
+            exclude = self.rows.get(query)
+            if exclude is None:
+                raise KeyError(query)
+            vector = self.vectors[exclude]
+            segment = int(self.segments[exclude])
+        else:
+            vector = np.asarray(query, dtype=self.vectors.dtype)
+            segment = self.assign(vector)
+
+        window = self._slices[segment] if within_segment else slice(0, len(self))
+        norm = np.linalg.norm(vector)
+        scores = self._unit[window] @ (vector / norm if norm > 0 else vector)
+        if exclude is not None and window.start <= exclude < window.stop:
+            scores[exclude - window.start] = -np.inf
+
+        k = min(k, len(scores) - (exclude is not None))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(str(self.ids[window.start + i]), float(scores[i])) for i in top]
+
+    def save(self, path: str) -> None:
+        # Through a file, as np.savez adds ".npz" to a path without it and
+        # load() must find the index at the same path.
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                ids=self.ids,
+                vectors=self.vectors,
+                segments=self.segments,
+                centroids=self.centroids,
+                mean=self.mean,
+                scale=self.scale,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "SegmentIndex":
+        with np.load(path) as data:
+            return cls(
+                data["ids"],
+                data["vectors"],
+                data["segments"],
+                data["centroids"],
+                data["mean"],
+                data["scale"],
+            )
+
+    def _describe(self, segment: int) -> Dict:
+        centroid = self.centroids[segment] * self.scale + self.mean
+
+        def top(prefix: str, names: Sequence[str]) -> List[str]:
+            values = [(centroid[_OFFSETS[f"{prefix}:{n}"]], n) for n in names]
+            return [n for value, n in sorted(values, reverse=True)[:2] if value > 0.25]
+
+        window = self._slices[segment]
+        return {
+            "segment": segment,
+            "size": window.stop - window.start,
+            "top_interests": top("interest", INTERESTS),
+            "top_categories": top("spend", DEPARTMENTS),
+        }
+
+
+_index: Optional[SegmentIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_segment_index() -> SegmentIndex:
+    """
+    Returns the process-wide segment index configured in segment_settings.
+
+    The index is loaded from segment_settings.index_path when that file
+    exists, otherwise it is built from every customer in the repository (and
+    saved to index_path when one is set).
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from ..config import Config
+                from .repository import get_repository
+
+                settings = Config().segment_settings
+                if settings.index_path and os.path.exists(settings.index_path):
+                    index = SegmentIndex.load(settings.index_path)
+                else:
+                    index = SegmentIndex.build(
+                        get_repository().iter_customers(), settings.n_segments
+                    )
+                    if settings.index_path:
+                        index.save(settings.index_path)
+                logger.info("Segment index ready with %i customers", len(index))
+                _index = index
+    return _index
+
+
+def set_segment_index(index: Optional[SegmentIndex]) -> None:
+    """Replaces the process-wide index, e.g. after a rebuild or in tests."""
+    global _index
+    _index = index
@@ -0,0 +1,94 @@
+import json
+from typing import Any, Dict, Union
+
+from .customer import Customer
+
+
+class ReadView:
+    """
+    Read-only attribute view over a dict of stored, already validated data.
+
+    Nested dicts are wrapped in views when accessed and lists of dicts become
+    lists of views; nothing is validated or copied up front.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict[str, Any]):
+        object.__setattr__(self, "_data", data)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return _wrap(self._data[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._data
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return ReadView(value)
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return [ReadView(v) for v in value]
+    return value
+
+
+class CustomerView(ReadView):
+    """
+    Lightweight read view of a stored customer profile.
+
+    Built from the stored JSON, which is only parsed on the first attribute
+    access. Use to_customer() to get the full model.
+    """
+
+    __slots__ = ("_raw",)
+
+    def __init__(self, raw: Union[str, bytes, Dict[str, Any]]):
+        if isinstance(raw, dict):
+            super().__init__(raw)
+            object.__setattr__(self, "_raw", None)
+        else:
+            object.__setattr__(self, "_raw", raw)
+
+    @property
+    def _parsed(self) -> Dict[str, Any]:
+        try:
+            return self._data
+        except AttributeError:
+            object.__setattr__(self, "_data", json.loads(self._raw))
+            return self._data
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_data":
+            # Unset slot: the JSON has not been parsed yet.
+            raise AttributeError(name)
+        try:
+            return _wrap(self._parsed[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self) -> str:
+        return f"CustomerView({self.customer_id!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._parsed
+
+    def to_json(self) -> str:
+        """The stored JSON, without parsing it when it was never accessed."""
+        if self._raw is not None:
+            return self._raw if isinstance(self._raw, str) else self._raw.decode()
+        return json.dumps(self._data)
+
+    def to_customer(self) -> Customer:
+        """The full Customer model."""
+        if self._raw is not None:
+            return Customer.model_validate_json(self._raw)
+        return Customer.model_validate(self._data)
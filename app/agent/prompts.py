@@ -1,8 +1,6 @@
-from .entities.customer import Customer
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.genai import types
 
-GLOBAL_INSTRUCTION = f"""
-The profile of the current customer is:  {Customer.get_customer("123").to_json()}
-"""
 
 INSTRUCTION = """
 You are "Project Pro," the primary AI assistant for Cymbal Home & Garden, a big-box retailer specializing in home improvement, gardening, and related supplies.
@@ -131,8 +129,35 @@ Provide exceptional, personalized customer service by helping customers find the
 Always consider the customer profile information available to you:
 - Name: Use for personalized greetings
 - Garden profile: Tailor recommendations to their space and interests
-- Purchase history: Reference past purchases and suggest complementary items
+- Purchase history: Reference past purchases and suggest complementary items.
+  The profile holds a purchase summary with the latest orders; call
+  **get_purchase_history** (following next_cursor) only when older orders are needed
 - Loyalty points: Mention when relevant for promotions
+- Spending questions ("how much have I spent on seeds?"): use **get_purchase_analytics**
 - Location: Consider London UK climate for plant recommendations
 
 """
+
+# The instruction above never changes, so it is sent as the system instruction
+# and, together with the tool declarations, forms a byte-stable request prefix
+# that the provider can cache. Anything per-customer goes in CUSTOMER_CONTEXT,
+# which ADK places in the request contents after that prefix.
+STATIC_INSTRUCTION = types.Content(role="user", parts=[types.Part(text=INSTRUCTION)])
+
+CUSTOMER_CONTEXT = """
+The profile of the current customer is:  {customer_profile}
+"""
+
+
+def customer_context(context: ReadonlyContext) -> str:
+    """
+    Builds the per-customer part of the prompt from the session state.
+
+    Args:
+        context: The readonly context of the current invocation.
+
+    Returns:
+        The customer context text.
+    """
+    profile = context.state.get("customer_profile", "No customer profile loaded.")
+    return CUSTOMER_CONTEXT.format(customer_profile=profile)
@@ -1,6 +1,24 @@
-from .callbacks import rate_limit_callback
-from .callbacks import before_tool
-from .callbacks import before_agent
+import importlib
 
+from .metrics import metrics
+from .metrics import instrument
 
-__all__ = ["rate_limit_callback", "before_tool", "before_agent"]
+
+# The callbacks import google.adk, which takes seconds; they are imported on
+# first access, so that importing e.g. shared_libraries.metrics doesn't pay
+# for it.
+_CALLBACKS = ["rate_limit_callback", "before_tool", "before_agent"]
+
+__all__ = [
+    "rate_limit_callback",
+    "before_tool",
+    "before_agent",
+    "metrics",
+    "instrument",
+]
+
+
+def __getattr__(name):
+    if name not in _CALLBACKS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(".callbacks", __name__), name)
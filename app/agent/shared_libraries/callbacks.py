@@ -1,3 +1,4 @@
+import json
 import logging
 import time
 
@@ -7,16 +8,22 @@ from typing import Any, Dict, Optional, Tuple
 from google.adk.tools import BaseTool
 from google.adk.sessions.state import State
 from google.adk.tools.tool_context import ToolContext
-from jsonschema import ValidationError
+from pydantic import ValidationError
 from ..entities.customer import Customer
+from ..entities.repository import get_repository
+from .metrics import instrument
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 RATE_LIMIT_SECS = 60
 RPM_QUOTA = 10
+# Profile of a session that names no known customer: the agent can answer
+# general questions, and tools that take a customer_id are refused.
+ANONYMOUS_PROFILE = json.dumps({"customer_id": None, "anonymous": True})
 
 
+@instrument("callback")
 def rate_limit_callback(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> None:
@@ -77,29 +84,35 @@ def validate_customer_id(customer_id: str, session_state: State) -> Tuple[bool,
         When False, a string with the error message to pass to the model for deciding
         what actions to take to remediate.
     """
-    if "customer_profile" not in session_state:
+    if session_state.get("customer_profile") in (None, ANONYMOUS_PROFILE):
         return False, "No customer profile selected. Please select a profile."
 
-    try:
-        # We read the profile from the state, where it is set deterministically
-        # at the beginning of the session.
-        c = Customer.model_validate_json(session_state["customer_profile"])
-        if customer_id == c.customer_id:
-            return True, None
-        else:
+    # We read the customer id from the state, where it is set deterministically
+    # at the beginning of the session.
+    session_customer_id = session_state.get("customer_id")
+    if session_customer_id is None:
+        try:
+            session_customer_id = Customer.model_validate_json(
+                session_state["customer_profile"]
+            ).customer_id
+        except ValidationError:
             return (
                 False,
-                "You cannot use the tool with customer_id "
-                + customer_id
-                + ", only for "
-                + c.customer_id
-                + ".",
+                "Customer profile couldn't be parsed. Please reload the customer data. ",
             )
-    except ValidationError:
+
+    if customer_id != session_customer_id:
         return (
             False,
-            "Customer profile couldn't be parsed. Please reload the customer data. ",
+            "You cannot use the tool with customer_id "
+            + customer_id
+            + ", only for "
+            + session_customer_id
+            + ".",
         )
+    if not get_repository().exists(customer_id):
+        return False, "Customer " + customer_id + " was not found."
+    return True, None
 
 
 def lowercase_value(value):
@@ -116,6 +129,7 @@ def lowercase_value(value):
 
 
 # Callback Methods
+@instrument("callback")
 def before_tool(tool: BaseTool, args: Dict[str, Any], tool_context: CallbackContext):
     # i make sure all values that the agent is sending to tools are lowercase
     lowercase_value(args)
@@ -145,6 +159,7 @@ def before_tool(tool: BaseTool, args: Dict[str, Any], tool_context: CallbackCont
     return None
 
 
+@instrument("callback")
 def after_tool(
     tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Dict
 ) -> Optional[Dict]:
@@ -164,13 +179,22 @@ def after_tool(
 
 
 # checking that the customer profile is loaded as state.
+@instrument("callback")
 def before_agent(callback_context: CallbackContext):
     # In a production agent, this is set as part of the
     # session creation for the agent.
     logger.info("BEFORE AGENT")
-    if "customer_profile" not in callback_context.state:
-        callback_context.state["customer_profile"] = Customer.get_customer(
-            "123"
-        ).to_json()
+    state = callback_context.state
+    if "customer_profile" not in state:
+        # Sessions name their customer in state when they are created.
+        customer_id = state.get("customer_id")
+        # The stored profile JSON goes into state as is, without building
+        # the Customer model.
+        profile = get_repository().get_view(customer_id) if customer_id else None
+        if profile is None:
+            logger.info("Unknown customer %s, continuing anonymously", customer_id)
+            state["customer_profile"] = ANONYMOUS_PROFILE
+        else:
+            state["customer_profile"] = profile.to_json()
 
-    logger.info(callback_context.state["customer_profile"])
+    logger.info(state["customer_profile"])
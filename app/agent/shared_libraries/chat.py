@@ -0,0 +1,203 @@
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai import types
+from pydantic import BaseModel, field_validator
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Session state only the server sets: the customer is the authenticated user,
+# and their profile is loaded from the repository by before_agent.
+SERVER_STATE_KEYS = ("customer_id", "customer_profile")
+
+
+class ChatRequest(BaseModel):
+    """A user message for the chat endpoint."""
+
+    user_id: str
+    message: str
+    # Continues this session, or starts it if it doesn't exist; a new
+    # session is started when None.
+    session_id: Optional[str] = None
+    # Initial state of a new session. Its customer_id, which names the
+    # customer profile the agent loads, is always user_id.
+    state: Optional[Dict[str, Any]] = None
+
+    @field_validator("state")
+    @classmethod
+    def _no_server_state(
+        cls, state: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        for key in SERVER_STATE_KEYS:
+            if state and key in state:
+                raise ValueError(f"state may not set {key}")
+        return state
+
+
+class TurnTimer:
+    """
+    Times one agent turn: from the request to the first model text, the
+    first tool call and the end of the turn.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.first_tool_call: Optional[float] = None
+        self.turn: Optional[float] = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def event(self, event: Event) -> None:
+        """Notes the first text and tool call of the turn."""
+        if self.first_tool_call is None and event.get_function_calls():
+            self.first_tool_call = self.elapsed()
+        if self.first_token is None and _text(event):
+            self.first_token = self.elapsed()
+
+    def finish(self, outcome: str) -> None:
+        """
+        Ends the turn and records its timings.
+
+        Args:
+            outcome: "ok", "error" or "cancelled".
+        """
+        self.turn = self.elapsed()
+        if self.first_token is not None:
+            metrics.record("chat", "time_to_first_token", self.first_token)
+        if self.first_tool_call is not None:
+            metrics.record("chat", "time_to_first_tool_call", self.first_tool_call)
+        metrics.record("chat", "turn", self.turn, error=outcome == "error")
+        metrics.increment("chat_turns_total", outcome=outcome)
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        return {
+            f"{name}_ms": round(value * 1e3, 1) if value is not None else None
+            for name, value in (
+                ("first_token", self.first_token),
+                ("first_tool_call", self.first_tool_call),
+                ("turn", self.turn),
+            )
+        }
+
+
+def _text(event: Event) -> str:
+    if not event.content or not event.content.parts or event.author == "user":
+        return ""
+    return "".join(part.text for part in event.content.parts if part.text)
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _messages(event: Event) -> Iterator[str]:
+    """The SSE messages for one agent event."""
+    text = _text(event)
+    if text:
+        # Streamed models send the text in partial chunks, then once more
+        # complete; clients append "token" text and may replace it with
+        # the "message".
+        kind = "token" if event.partial else "message"
+        yield format_sse(kind, {"author": event.author, "text": text})
+    for call in event.get_function_calls():
+        yield format_sse("tool_call", {"name": call.name, "args": call.args})
+    for response in event.get_function_responses():
+        yield format_sse("tool_result", {"name": response.name})
+
+
+async def stream_turn(runner: Runner, request: ChatRequest) -> AsyncIterator[str]:
+    """
+    Runs one agent turn and yields its events as Server-Sent Events as they
+    arrive: "token" for partial text, "message" for a complete text,
+    "tool_call" and "tool_result", then "done" with the session ID and the
+    turn's timings, or "error".
+
+    Args:
+        runner: Runs the agent.
+        request: The user's message and session.
+
+    Yields:
+        The formatted events.
+    """
+    timer = TurnTimer()
+    outcome = "cancelled"
+    try:
+        session_service = runner.session_service
+        session = None
+        if request.session_id:
+            session = await session_service.get_session(
+                app_name=runner.app_name,
+                user_id=request.user_id,
+                session_id=request.session_id,
+            )
+        if session is None:
+            session = await session_service.create_session(
+                app_name=runner.app_name,
+                user_id=request.user_id,
+                session_id=request.session_id,
+                state={**(request.state or {}), "customer_id": request.user_id},
+            )
+
+        async for event in runner.run_async(
+            user_id=request.user_id,
+            session_id=session.id,
+            new_message=types.Content(
+                role="user", parts=[types.Part(text=request.message)]
+            ),
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+        ):
+            timer.event(event)
+            for message in _messages(event):
+                yield message
+    except Exception as e:
+        outcome = "error"
+        logger.exception("Chat turn failed")
+        timer.finish(outcome)
+        yield format_sse("error", {"message": str(e), **timer.to_dict()})
+        return
+    except BaseException:
+        # The client went away; the generator is being closed.
+        timer.finish(outcome)
+        raise
+    outcome = "ok"
+    timer.finish(outcome)
+    yield format_sse("done", {"session_id": session.id, **timer.to_dict()})
+
+
+def chat_router(runner: Runner, path: str = "/chat") -> APIRouter:
+    """
+    Returns a router with a POST endpoint that runs the agent on a
+    ChatRequest and streams the turn as Server-Sent Events.
+
+    Args:
+        runner: Runs the agent.
+        path: The endpoint path.
+
+    Returns:
+        The router.
+    """
+    router = APIRouter()
+
+    @router.post(path)
+    async def chat(request: ChatRequest) -> StreamingResponse:
+        """Runs the agent on a message and streams its reply as Server-Sent Events."""
+        return StreamingResponse(
+            stream_turn(runner, request),
+            media_type="text/event-stream",
+            # Proxies mustn't buffer the stream.
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    return router
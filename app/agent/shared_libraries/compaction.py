@@ -0,0 +1,317 @@
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from .metrics import instrument, metrics
+
+logger = logging.getLogger(__name__)
+
+# Rough Gemini tokenisation ratio for English text and compact JSON.
+CHARS_PER_TOKEN = 4
+
+# A result of the key tool makes every earlier result of the listed tools stale:
+# a fresh cart read replaces older cart reads and the cart summaries returned
+# by earlier modifications.
+SUPERSEDED_BY: Dict[str, Tuple[str, ...]] = {
+    "access_cart_information": ("access_cart_information", "modify_cart"),
+}
+
+def _part_chars(part: types.Part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(part.function_call.name or "") + len(
+            json.dumps(part.function_call.args or {}, default=str)
+        )
+    if part.function_response:
+        return len(part.function_response.name or "") + len(
+            json.dumps(part.function_response.response or {}, default=str)
+        )
+    return 0
+
+
+def estimate_tokens(contents: Iterable[types.Content]) -> int:
+    """
+    Estimates the prompt tokens of a list of contents.
+
+    Args:
+        contents: The request contents.
+
+    Returns:
+        The estimated token count.
+    """
+    chars = sum(
+        _part_chars(part) for content in contents for part in (content.parts or [])
+    )
+    return chars // CHARS_PER_TOKEN
+
+
+def shrink_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keeps the scalar fields of a tool response and replaces lists and nested
+    objects with a count, e.g. {"products": [...]} -> {"products": "<11 items omitted>"}.
+
+    Args:
+        response: The tool response.
+
+    Returns:
+        The shrunk response.
+    """
+    shrunk = {}
+    for key, value in response.items():
+        if isinstance(value, list):
+            shrunk[key] = f"<{len(value)} items omitted>"
+        elif isinstance(value, dict):
+            shrunk[key] = shrink_response(value)
+        else:
+            shrunk[key] = value
+    return shrunk
+
+
+def _superseded_response(name: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    stub = {"superseded": f"Stale result; see the latest {name} result."}
+    for key in ("message", "status", "customer_id", "department"):
+        if key in response:
+            stub[key] = response[key]
+    return stub
+
+
+def _with_response(part: types.Part, response: Dict[str, Any]) -> types.Part:
+    return types.Part(
+        function_response=types.FunctionResponse(
+            id=part.function_response.id,
+            name=part.function_response.name,
+            response=response,
+        )
+    )
+
+
+def _response_args(contents: List[types.Content]) -> Dict[Tuple[int, int], str]:
+    """Maps each function response (content index, part index) to its call args."""
+    by_id: Dict[str, str] = {}
+    pending: Dict[str, List[str]] = {}
+    result = {}
+    for i, content in enumerate(contents):
+        for j, part in enumerate(content.parts or []):
+            if part.function_call:
+                args = json.dumps(part.function_call.args or {}, sort_keys=True, default=str)
+                if part.function_call.id:
+                    by_id[part.function_call.id] = args
+                pending.setdefault(part.function_call.name, []).append(args)
+            elif part.function_response:
+                response = part.function_response
+                queue = pending.get(response.name) or []
+                if response.id and response.id in by_id:
+                    result[(i, j)] = by_id[response.id]
+                    if by_id[response.id] in queue:
+                        queue.remove(by_id[response.id])
+                elif queue:
+                    result[(i, j)] = queue.pop(0)
+    return result
+
+
+def _is_user_text(content: types.Content) -> bool:
+    return content.role == "user" and any(
+        part.text for part in (content.parts or [])
+    )
+
+
+def _turn_starts(contents: List[types.Content]) -> List[int]:
+    """Indices where a user turn starts.
+
+    Consecutive user text contents (e.g. the per-customer context that ADK
+    inserts right before the user's message) belong to the same turn. User
+    content between a function call and its response is not a new turn:
+    during a tool round ADK inserts the customer context there, after the
+    model's function call.
+    """
+    starts = []
+    in_tool_round = False
+    for i, content in enumerate(contents):
+        parts = content.parts or []
+        if content.role != "user":
+            in_tool_round = any(part.function_call for part in parts)
+            continue
+        if in_tool_round:
+            if any(part.function_response for part in parts):
+                in_tool_round = False
+            continue
+        if _is_user_text(content) and not (i and _is_user_text(contents[i - 1])):
+            starts.append(i)
+    return starts
+
+
+class HistoryCompactor:
+    """
+    Shrinks the conversation history sent to the model to fit a token budget.
+
+    Compaction runs in stages and stops as soon as the history fits:
+
+    1. Always: results of superseded tool calls (everything before the latest
+       cart read, repeated identical product lookups) are replaced by a stub.
+    2. Tool results outside the most recent turns are shrunk to their scalar
+       fields.
+    3. Tool call/response pairs outside the most recent turns are removed,
+       collapsing those turns to the user text and the model's answer.
+    4. The oldest turns are dropped entirely.
+
+    The most recent `keep_recent_turns` turns are never touched by stages 2-4.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 8000,
+        keep_recent_turns: int = 2,
+        superseded_by: Dict[str, Sequence[str]] = SUPERSEDED_BY,
+        idempotent_tools: Optional[Sequence[str]] = None,
+    ):
+        self.token_budget = token_budget
+        # The current turn is always kept, or the model would get no message.
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.superseded_by = {name: tuple(tools) for name, tools in superseded_by.items()}
+        if idempotent_tools is None:
+            from ..config import Config
+
+            idempotent_tools = Config().mcp_client_settings.idempotent_tools
+        self.idempotent_tools = frozenset(idempotent_tools)
+
+    def compact(self, contents: List[types.Content]) -> List[types.Content]:
+        """
+        Returns a compacted copy of contents. The input is not modified.
+
+        Args:
+            contents: The request contents, oldest first.
+
+        Returns:
+            The compacted contents.
+        """
+        contents = self._drop_superseded(contents)
+        if estimate_tokens(contents) <= self.token_budget:
+            return contents
+
+        boundary = self._recent_boundary(contents)
+        contents = self._shrink_old_responses(contents, boundary)
+        if estimate_tokens(contents) <= self.token_budget:
+            return contents
+
+        contents, boundary = self._collapse_old_turns(contents, boundary)
+        if estimate_tokens(contents) <= self.token_budget:
+            return contents
+
+        return self._drop_old_turns(contents, boundary)
+
+    def _recent_boundary(self, contents: List[types.Content]) -> int:
+        """Index of the first content belonging to the protected recent turns."""
+        starts = _turn_starts(contents)
+        if len(starts) <= self.keep_recent_turns:
+            return 0
+        return starts[-self.keep_recent_turns]
+
+    def _drop_superseded(self, contents: List[types.Content]) -> List[types.Content]:
+        response_args = _response_args(contents)
+
+        # Walk backwards so the first result seen for a key is the latest one.
+        seen = set()
+        stale_tools = set()
+        compacted = []
+        for i in range(len(contents) - 1, -1, -1):
+            content = contents[i]
+            parts = []
+            changed = False
+            for j, part in enumerate(content.parts or []):
+                response = part.function_response
+                if response is None or not isinstance(response.response, dict):
+                    parts.append(part)
+                    continue
+                stale = response.name in stale_tools
+                if not stale and response.name in self.idempotent_tools:
+                    key = (response.name, response_args.get((i, j)))
+                    stale = key in seen
+                    seen.add(key)
+                stale_tools.update(self.superseded_by.get(response.name, ()))
+                if stale:
+                    parts.append(
+                        _with_response(
+                            part, _superseded_response(response.name, response.response)
+                        )
+                    )
+                    changed = True
+                else:
+                    parts.append(part)
+            compacted.append(
+                types.Content(role=content.role, parts=parts) if changed else content
+            )
+        compacted.reverse()
+        return compacted
+
+    def _shrink_old_responses(
+        self, contents: List[types.Content], boundary: int
+    ) -> List[types.Content]:
+        compacted = list(contents)
+        for i in range(boundary):
+            content = contents[i]
+            if not any(part.function_response for part in content.parts or []):
+                continue
+            compacted[i] = types.Content(
+                role=content.role,
+                parts=[
+                    _with_response(part, shrink_response(part.function_response.response))
+                    if part.function_response
+                    and isinstance(part.function_response.response, dict)
+                    else part
+                    for part in content.parts
+                ],
+            )
+        return compacted
+
+    def _collapse_old_turns(
+        self, contents: List[types.Content], boundary: int
+    ) -> Tuple[List[types.Content], int]:
+        compacted = []
+        for i, content in enumerate(contents):
+            if i >= boundary:
+                compacted.append(content)
+                continue
+            parts = [
+                part
+                for part in content.parts or []
+                if not (part.function_call or part.function_response)
+            ]
+            if parts:
+                compacted.append(types.Content(role=content.role, parts=parts))
+        removed = len(contents) - len(compacted)
+        return compacted, boundary - removed
+
+    def _drop_old_turns(
+        self, contents: List[types.Content], boundary: int
+    ) -> List[types.Content]:
+        starts = [i for i in _turn_starts(contents) if i < boundary] + [boundary]
+        for start in starts:
+            remaining = contents[start:]
+            if estimate_tokens(remaining) <= self.token_budget:
+                return remaining
+        return contents[boundary:]
+
+    @instrument("callback", name="compact_history")
+    def callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        """Before-model callback that compacts the request history in place.
+
+        Args:
+          callback_context: A CallbackContext obj representing the active callback
+            context.
+          llm_request: A LlmRequest obj representing the active LLM request.
+        """
+        before = estimate_tokens(llm_request.contents)
+        llm_request.contents = self.compact(llm_request.contents)
+        after = estimate_tokens(llm_request.contents)
+
+        metrics.increment("prompt_tokens_estimated_total", before, stage="before")
+        metrics.increment("prompt_tokens_estimated_total", after, stage="after")
+        if after < before:
+            logger.debug("compact_history [tokens: %i -> %i]", before, after)
@@ -0,0 +1,270 @@
+import abc
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from .metrics import instrument, metrics
+
+logger = logging.getLogger(__name__)
+
+
+def prefix_payload(llm_request: LlmRequest) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Serialises the cacheable prefix of a request: system instruction and tools.
+
+    Args:
+        llm_request: The request about to be sent.
+
+    Returns:
+        The canonical prefix bytes and the prefix fields as sent to the model.
+    """
+    config = llm_request.config
+    fields = {
+        "model": llm_request.model,
+        "system_instruction": config.system_instruction if config else None,
+        "tools": [
+            tool.model_dump(mode="json", exclude_none=True)
+            for tool in (config.tools if config and config.tools else [])
+        ],
+    }
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str)
+    return canonical.encode("utf-8"), fields
+
+
+def variable_bytes(llm_request: LlmRequest) -> int:
+    """Size in bytes of the per-request part of the prompt (the contents)."""
+    return sum(
+        len(content.model_dump_json(exclude_none=True))
+        for content in llm_request.contents
+    )
+
+
+class ContextCache:
+    """
+    Backend that stores request prefixes on the model provider.
+
+    Subclasses return a provider cache name for a prefix key, creating the
+    cache entry when needed, or None to send the prefix inline.
+    """
+
+    async def get_or_create(
+        self, key: str, model: Optional[str], fields: Dict[str, Any]
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Looks up the cache entry for a prefix, creating it on a miss.
+
+        Args:
+            key: Hash of the canonical prefix bytes.
+            model: The model name the cache is created for.
+            fields: The system instruction and tools of the prefix.
+
+        Returns:
+            A tuple of the cache name (None when not cached) and whether it
+            was an existing entry.
+        """
+        return None, False
+
+
+class _TtlContextCache(ContextCache, abc.ABC):
+    """
+    Keeps key -> (cache name, expiry) and delegates creation to _create.
+
+    Concurrent misses on one key share a single _create call. A key whose
+    creation failed is sent inline for failure_ttl_seconds before it is
+    tried again.
+    """
+
+    def __init__(self, ttl_seconds: int = 1800, failure_ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._failed: Dict[str, float] = {}
+        self._creating: Dict[str, asyncio.Future] = {}
+
+    async def get_or_create(self, key, model, fields):
+        entry = self._entries.get(key)
+        # Refresh a little before the provider expires the entry.
+        if entry and entry[1] - 30 > time.monotonic():
+            return entry[0], True
+        if self._failed.get(key, 0.0) > time.monotonic():
+            return None, False
+        task = self._creating.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(self._create_entry(key, model, fields))
+            self._creating[key] = task
+            task.add_done_callback(lambda _: self._creating.pop(key, None))
+        # Shielded, so a cancelled request doesn't cancel the others' creation.
+        name = await asyncio.shield(task)
+        return name, shared and name is not None
+
+    async def _create_entry(self, key, model, fields) -> Optional[str]:
+        name = await self._create(key, model, fields)
+        if name is None:
+            self._failed[key] = time.monotonic() + self.failure_ttl_seconds
+        else:
+            self._failed.pop(key, None)
+            self._entries[key] = (name, time.monotonic() + self.ttl_seconds)
+        return name
+
+    @abc.abstractmethod
+    async def _create(self, key, model, fields) -> Optional[str]:
+        """Creates the provider cache entry for a prefix, returning its name,
+        or None to send the prefix inline."""
+
+
+class InMemoryContextCache(_TtlContextCache):
+    """
+    Local stand-in for a provider cache, used in tests and in the prefix report.
+    """
+
+    def __init__(self, ttl_seconds: int = 1800):
+        super().__init__(ttl_seconds)
+        self.created: List[str] = []
+
+    async def _create(self, key, model, fields):
+        name = f"cachedContents/local-{key[:16]}"
+        self.created.append(name)
+        return name
+
+
+class GeminiContextCache(_TtlContextCache):
+    """
+    Explicit Gemini context caching through the google-genai caches API.
+    """
+
+    def __init__(
+        self, client=None, ttl_seconds: int = 1800, failure_ttl_seconds: float = 60.0
+    ):
+        super().__init__(ttl_seconds, failure_ttl_seconds)
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+
+            self._client = genai.Client()
+        return self._client
+
+    async def _create(self, key, model, fields):
+        try:
+            cache = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"customer-services-{key[:16]}",
+                    system_instruction=fields["system_instruction"],
+                    tools=fields["tools"] or None,
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+        except Exception as e:
+            # Prefixes under the provider's minimum size, quota errors, etc.
+            # fall back to sending the prefix inline.
+            logger.warning("Context cache creation failed: %s", e)
+            return None
+        return cache.name
+
+
+class PrefixStats:
+    """Per-request prefix and variable byte counts plus the cache hit rate."""
+
+    def __init__(self):
+        self.requests = 0
+        self.hits = 0
+        self.prefix_bytes = 0
+        self.variable_bytes = 0
+        self.prefix_keys = set()
+
+    def record(self, key: str, prefix: int, variable: int, hit: bool) -> None:
+        self.requests += 1
+        self.hits += int(hit)
+        self.prefix_bytes += prefix
+        self.variable_bytes += variable
+        self.prefix_keys.add(key)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "distinct_prefixes": len(self.prefix_keys),
+            "prefix_bytes": self.prefix_bytes,
+            "variable_bytes": self.variable_bytes,
+            "cache_hits": self.hits,
+            "cache_hit_rate": self.hit_rate,
+        }
+
+
+class PromptPrefixCache:
+    """
+    Before-model callback that measures the stable request prefix and, when a
+    ContextCache backend is configured, replaces it with a provider cache
+    reference.
+
+    The agent sends its static instruction as the system instruction and the
+    per-customer context as content, so the system instruction and tool
+    declarations hash to the same key for every customer and turn.
+    """
+
+    def __init__(self, cache: Optional[ContextCache] = None):
+        self.cache = cache
+        self.stats = PrefixStats()
+
+    @instrument("callback", name="prompt_prefix_cache")
+    async def callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        """Before-model callback that applies the prefix cache to the request.
+
+        Args:
+          callback_context: A CallbackContext obj representing the active callback
+            context.
+          llm_request: A LlmRequest obj representing the active LLM request.
+        """
+        prefix, fields = prefix_payload(llm_request)
+        key = hashlib.sha256(prefix).hexdigest()
+        if self.cache is None:
+            # Implicit provider caching: a repeat of an earlier prefix can hit.
+            name, hit = None, key in self.stats.prefix_keys
+        else:
+            name, hit = await self.cache.get_or_create(key, llm_request.model, fields)
+
+        self.stats.record(key, len(prefix), variable_bytes(llm_request), hit)
+        metrics.increment("prompt_prefix_requests_total", cache="hit" if hit else "miss")
+
+        if name is not None:
+            # The cached content carries the instruction and tools.
+            llm_request.config.cached_content = name
+            llm_request.config.system_instruction = None
+            llm_request.config.tools = None
+            llm_request.config.tool_config = None
+
+
+def build_context_cache(provider: str, ttl_seconds: int) -> Optional[ContextCache]:
+    """
+    Returns the ContextCache backend for a configured provider name.
+
+    Args:
+        provider: "none" (implicit provider caching only), "memory" or "gemini".
+        ttl_seconds: Lifetime of created cache entries.
+
+    Returns:
+        The backend, or None for "none".
+    """
+    if provider == "none":
+        return None
+    if provider == "memory":
+        return InMemoryContextCache(ttl_seconds)
+    if provider == "gemini":
+        return GeminiContextCache(ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown context cache provider '{provider}'")
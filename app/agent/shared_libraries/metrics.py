@@ -0,0 +1,394 @@
+import bisect
+import functools
+import inspect
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds of the latency buckets in seconds, roughly log-spaced from 100us to 60s.
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Upper bounds of the payload-size buckets in bytes.
+PAYLOAD_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRIC_PREFIX = "customer_services"
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram. Observations are O(log buckets) and allocation free.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: Iterable[float]):
+        self.bounds = tuple(bounds)
+        # One extra slot for the +Inf bucket.
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+
+        Args:
+            q: The quantile to estimate, between 0 and 1.
+
+        Returns:
+            The bucket upper bound, or None when nothing has been observed.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Returns (upper bound, cumulative count) pairs including +Inf."""
+        result = []
+        running = 0
+        for bound, bucket_count in zip(self.bounds + (float("inf"),), self.counts):
+            running += bucket_count
+            result.append((bound, running))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                ("+Inf" if bound == float("inf") else repr(bound)): count
+                for bound, count in self.cumulative()
+            },
+        }
+
+
+class OperationStats:
+    """
+    Latency, call, error and payload statistics for a single tool or callback.
+    """
+
+    __slots__ = ("kind", "name", "calls", "errors", "latency", "payload")
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.payload = Histogram(PAYLOAD_BUCKETS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_seconds": self.latency.to_dict(),
+            "payload_bytes": self.payload.to_dict(),
+        }
+
+
+def payload_size(value: Any) -> Optional[int]:
+    """
+    Returns the serialised size of a tool or callback result in bytes.
+
+    Results other than str and bytes are serialised to JSON to measure them,
+    so the instrument() wrappers only call this for sampled calls.
+
+    Args:
+        value: The returned value.
+
+    Returns:
+        The size in bytes, or None for a None result.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return None
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of per-operation statistics, counters and gauges.
+    """
+
+    def __init__(self, payload_sample_rate: float = 0.01):
+        """
+        Args:
+            payload_sample_rate: Fraction of instrumented calls whose result
+                is serialised to measure its size. str and bytes results are
+                always measured.
+        """
+        self.payload_sample_rate = payload_sample_rate
+        self._lock = threading.Lock()
+        self._operations: Dict[Tuple[str, str], OperationStats] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        duration: float,
+        payload_bytes: Optional[int] = None,
+        error: bool = False,
+    ) -> None:
+        """
+        Records one completed call.
+
+        Args:
+            kind: The operation kind, e.g. "tool" or "callback".
+            name: The operation name, e.g. "modify_cart".
+            duration: The wall-clock duration in seconds.
+            payload_bytes: The size of the result, if known.
+            error: Whether the call raised.
+        """
+        key = (kind, name)
+        with self._lock:
+            stats = self._operations.get(key)
+            if stats is None:
+                stats = self._operations[key] = OperationStats(kind, name)
+            stats.calls += 1
+            stats.latency.observe(duration)
+            if error:
+                stats.errors += 1
+            if payload_bytes is not None:
+                stats.payload.observe(payload_bytes)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        """Adds value to a labelled counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        """Sets a labelled gauge to value."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def get(self, kind: str, name: str) -> Optional[OperationStats]:
+        with self._lock:
+            return self._operations.get((kind, name))
+
+    def counter(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def gauge(self, name: str, **labels: str) -> Optional[float]:
+        with self._lock:
+            return self._gauges.get((name, tuple(sorted(labels.items()))))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-serialisable view of every metric.
+
+        Returns:
+            A dictionary with "operations", "counters" and "gauges" keys.
+        """
+        with self._lock:
+            return {
+                "operations": [s.to_dict() for s in self._operations.values()],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._counters.items()
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._gauges.items()
+                ],
+            }
+
+    def render_prometheus(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            The exposition text.
+        """
+        latency = f"{METRIC_PREFIX}_latency_seconds"
+        payload = f"{METRIC_PREFIX}_payload_bytes"
+        calls = f"{METRIC_PREFIX}_calls_total"
+        errors = f"{METRIC_PREFIX}_errors_total"
+        lines = [
+            f"# TYPE {latency} histogram",
+            f"# TYPE {payload} histogram",
+            f"# TYPE {calls} counter",
+            f"# TYPE {errors} counter",
+        ]
+        with self._lock:
+            for stats in self._operations.values():
+                labels = f'kind="{_escape(stats.kind)}",name="{_escape(stats.name)}"'
+                lines.extend(_render_histogram(latency, labels, stats.latency))
+                lines.extend(_render_histogram(payload, labels, stats.payload))
+                lines.append(f"{calls}{{{labels}}} {stats.calls}")
+                lines.append(f"{errors}{{{labels}}} {stats.errors}")
+            lines.extend(_render_family("counter", self._counters))
+            lines.extend(_render_family("gauge", self._gauges))
+        return "\n".join(lines) + "\n"
+
+    def _payload_bytes(self, value: Any) -> Optional[int]:
+        # Serialising every result would cost more than the rest of the
+        # instrumentation, so other results are only measured when sampled.
+        if value is None:
+            return None
+        if isinstance(value, (str, bytes, bytearray)) or (
+            random.random() < self.payload_sample_rate
+        ):
+            return payload_size(value)
+        return None
+
+    def instrument(
+        self, kind: str, name: Optional[str] = None
+    ) -> Callable[[Callable], Callable]:
+        """
+        Decorator that records latency and errors of each call, and the
+        payload size of a sample of them (see payload_sample_rate).
+
+        The wrapper keeps the wrapped signature and docstring, so ADK and MCP
+        still derive the same tool declarations from it.
+
+        Args:
+            kind: The operation kind, e.g. "tool" or "callback".
+            name: The operation name. Defaults to the function name.
+
+        Returns:
+            The decorator.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            op_name = name or func.__name__
+
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except BaseException:
+                        self.record(kind, op_name, time.perf_counter() - start, error=True)
+                        raise
+                    self.record(
+                        kind,
+                        op_name,
+                        time.perf_counter() - start,
+                        self._payload_bytes(result),
+                    )
+                    return result
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    self.record(kind, op_name, time.perf_counter() - start, error=True)
+                    raise
+                self.record(
+                    kind,
+                    op_name,
+                    time.perf_counter() - start,
+                    self._payload_bytes(result),
+                )
+                return result
+
+            return wrapper
+
+        return decorator
+
+
+def _escape(value: Any) -> str:
+    # Label values escape backslash, double quote and newline.
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _render_family(
+    metric_type: str, values: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
+) -> List[str]:
+    # Samples of one metric must follow its TYPE line.
+    families: Dict[str, List[str]] = {}
+    for (name, labels), value in values.items():
+        metric = f"{METRIC_PREFIX}_{name}"
+        families.setdefault(metric, []).append(
+            f"{metric}{_render_labels(labels)} {value}"
+        )
+    lines = []
+    for metric, samples in families.items():
+        lines.append(f"# TYPE {metric} {metric_type}")
+        lines.extend(samples)
+    return lines
+
+
+def _render_histogram(metric: str, labels: str, histogram: Histogram) -> List[str]:
+    lines = []
+    for bound, count in histogram.cumulative():
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
+    lines.append(f"{metric}_sum{{{labels}}} {histogram.total}")
+    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+# Process-wide registry used by the agent, the tools and the /metrics endpoint.
+metrics = MetricsRegistry()
+
+
+def instrument(kind: str, name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Instruments a function against the process-wide registry."""
+    return metrics.instrument(kind, name)
@@ -0,0 +1,277 @@
+import asyncio
+import collections
+import contextlib
+import contextvars
+import enum
+import heapq
+import itertools
+import logging
+import time
+from typing import AsyncGenerator, Deque, Dict, List, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.base_llm_connection import BaseLlmConnection
+from google.adk.models.registry import LLMRegistry
+from pydantic import Field
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(enum.IntEnum):
+    """
+    Scheduling class of an outbound model request. Lower values run first.
+    """
+
+    INTERACTIVE = 0
+    EVAL = 1
+    BATCH = 2
+
+
+# Seconds a request may wait in the queue before it is dropped, per priority.
+DEFAULT_DEADLINES = {
+    Priority.INTERACTIVE: 30.0,
+    Priority.EVAL: 120.0,
+    Priority.BATCH: 600.0,
+}
+
+# Priority and absolute deadline (on the scheduler clock) of the current
+# request. Entry points such as the eval suite or batch jobs set these with
+# request_context(); customer turns get the INTERACTIVE defaults.
+request_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "request_priority", default=Priority.INTERACTIVE
+)
+request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request's deadline passes before it is sent to the model,
+    or before an MCP call or tool returns."""
+
+
+@contextlib.contextmanager
+def request_context(priority: Priority, timeout: Optional[float] = None):
+    """
+    Runs the enclosed model calls with the given priority and deadline.
+
+    Args:
+        priority: The scheduling class of the enclosed requests.
+        timeout: Seconds from now until the enclosed requests expire. Defaults
+            to the scheduler deadline for the priority.
+    """
+    priority_token = request_priority.set(priority)
+    deadline_token = request_deadline.set(
+        time.monotonic() + timeout if timeout is not None else None
+    )
+    try:
+        yield
+    finally:
+        request_deadline.reset(deadline_token)
+        request_priority.reset(priority_token)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "deadline", "future", "enqueued_at")
+
+    def __init__(self, priority, seq, deadline, future, enqueued_at):
+        self.priority = priority
+        self.seq = seq
+        self.deadline = deadline
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LlmScheduler:
+    """
+    Priority queue in front of the model that enforces a concurrency limit and
+    a requests-per-window quota together.
+
+    Requests are granted in (priority, arrival) order. A request whose deadline
+    passes while it is queued is dropped with DeadlineExceeded, so it never
+    consumes quota.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        rpm: int = 10,
+        window_seconds: float = 60.0,
+        deadlines: Optional[Dict[Priority, float]] = None,
+    ):
+        if max_concurrency < 1 or rpm < 1:
+            raise ValueError("max_concurrency and rpm must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.window_seconds = window_seconds
+        self.deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+        self.in_flight = 0
+        self.dropped = 0
+        self._queue: List[_Waiter] = []
+        self._starts: Deque[float] = collections.deque()
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def queue_depth(self) -> int:
+        return sum(1 for w in self._queue if not w.future.done())
+
+    async def acquire(
+        self, priority: Optional[Priority] = None, deadline: Optional[float] = None
+    ) -> None:
+        """
+        Waits for a slot. Every successful acquire must be paired with release().
+
+        Args:
+            priority: Scheduling class. Defaults to the request_priority context.
+            deadline: Absolute time.monotonic() deadline. Defaults to the
+                request_deadline context, then to the priority's default.
+
+        Raises:
+            DeadlineExceeded: If the deadline passes before a slot is granted.
+        """
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        if priority is None:
+            priority = request_priority.get()
+        if deadline is None:
+            deadline = request_deadline.get()
+        if deadline is None:
+            deadline = now + self.deadlines[priority]
+
+        waiter = _Waiter(priority, next(self._seq), deadline, loop.create_future(), now)
+        heapq.heappush(self._queue, waiter)
+        self._dispatch()
+
+        expiry = loop.call_at(
+            loop.time() + max(0.0, deadline - now), self._expire, waiter
+        )
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                if waiter.future.exception() is None:
+                    # Granted and cancelled in the same tick; hand the slot back.
+                    self.release()
+            raise
+        finally:
+            expiry.cancel()
+        metrics.record(
+            "llm_queue", priority.name.lower(), time.monotonic() - waiter.enqueued_at
+        )
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(
+        self, priority: Optional[Priority] = None, deadline: Optional[float] = None
+    ):
+        """Async context manager around acquire() and release()."""
+        await self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _expire(self, waiter: _Waiter) -> None:
+        if not waiter.future.done():
+            self._drop(waiter)
+            self._dispatch()
+
+    def _drop(self, waiter: _Waiter) -> None:
+        self.dropped += 1
+        metrics.increment(
+            "llm_scheduler_dropped_total", priority=waiter.priority.name.lower()
+        )
+        waiter.future.set_exception(
+            DeadlineExceeded(
+                f"{waiter.priority.name} request expired after "
+                f"{time.monotonic() - waiter.enqueued_at:.3f}s in the queue"
+            )
+        )
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self._starts and now - self._starts[0] >= self.window_seconds:
+            self._starts.popleft()
+
+        while self._queue and self.in_flight < self.max_concurrency:
+            waiter = self._queue[0]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+            if waiter.deadline <= now:
+                heapq.heappop(self._queue)
+                self._drop(waiter)
+                continue
+            if len(self._starts) >= self.rpm:
+                self._schedule_wakeup(self._starts[0] + self.window_seconds - now)
+                break
+            heapq.heappop(self._queue)
+            self.in_flight += 1
+            self._starts.append(now)
+            waiter.future.set_result(None)
+
+        depth = collections.Counter(
+            w.priority for w in self._queue if not w.future.done()
+        )
+        for priority in Priority:
+            metrics.set_gauge(
+                "llm_scheduler_queue_depth",
+                depth[priority],
+                priority=priority.name.lower(),
+            )
+
+    def _schedule_wakeup(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self._wakeup is not None and self._wakeup_loop is loop:
+            return
+
+        def wakeup():
+            self._wakeup = None
+            self._dispatch()
+
+        self._wakeup = loop.call_later(max(0.0, delay), wakeup)
+        self._wakeup_loop = loop
+
+
+class ScheduledLlm(BaseLlm):
+    """
+    Wraps a model so every generate call goes through an LlmScheduler.
+    """
+
+    llm: BaseLlm
+    scheduler: LlmScheduler = Field(exclude=True)
+
+    @classmethod
+    def wrap(cls, model: str | BaseLlm, scheduler: LlmScheduler) -> "ScheduledLlm":
+        """
+        Builds a scheduled model from a model name or model instance.
+
+        Args:
+            model: A model name resolvable by the ADK registry, or a BaseLlm.
+            scheduler: The scheduler to queue requests on.
+
+        Returns:
+            The wrapping ScheduledLlm.
+        """
+        llm = LLMRegistry.new_llm(model) if isinstance(model, str) else model
+        return cls(model=llm.model, llm=llm, scheduler=scheduler)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async with self.scheduler.slot():
+            async for response in self.llm.generate_content_async(llm_request, stream):
+                yield response
+
+    def connect(self, llm_request: LlmRequest) -> BaseLlmConnection:
+        # Live (bidi) sessions hold a connection open and are not queued.
+        return self.llm.connect(llm_request)
@@ -0,0 +1,677 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from pydantic import TypeAdapter
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_events_adapter = TypeAdapter(List[Event])
+
+# Events are clustered by their primary key, so a session's events are
+# contiguous on disk and loaded with one range scan of the
+# (app_name, user_id, session_id) index.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    last_seq INTEGER NOT NULL DEFAULT 0,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    compacted_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (app_name, user_id, session_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+) WITHOUT ROWID;
+"""
+
+SessionKey = Tuple[str, str, str]
+
+
+def split_state(
+    state: Optional[Dict[str, Any]],
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Splits a state or state delta into its app, user and session parts, with
+    the app: and user: prefixes removed. temp: keys are dropped.
+
+    Args:
+        state: The state.
+
+    Returns:
+        The app, user and session state.
+    """
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+def _has_text(event: Dict[str, Any]) -> bool:
+    parts = (event.get("content") or {}).get("parts") or []
+    return any(part.get("text") for part in parts)
+
+
+def _is_tool_part(part: Dict[str, Any]) -> bool:
+    return "function_call" in part or "function_response" in part
+
+
+def _is_tool_traffic(event: Dict[str, Any]) -> bool:
+    parts = (event.get("content") or {}).get("parts") or []
+    return bool(parts) and all(_is_tool_part(part) for part in parts)
+
+
+def _has_tool_parts(event: Dict[str, Any]) -> bool:
+    parts = (event.get("content") or {}).get("parts") or []
+    return any(_is_tool_part(part) for part in parts)
+
+
+def _without_tool_parts(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns a copy of an event with text as well as tool calls, without
+    the tool calls, so that no call is left without its response."""
+    content = dict(event["content"])
+    content["parts"] = [part for part in content["parts"] if not _is_tool_part(part)]
+    return {**event, "content": content}
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    ADK session service storing sessions in SQLite, so that sessions survive
+    restarts and every server worker process sees the same sessions.
+
+    Appended events are buffered and written in batches, one transaction
+    each: when batch_size events are waiting, when an agent's final response
+    of a turn arrives, and flush_interval seconds after the first buffered
+    event otherwise. Reads through this service flush first, so they see
+    every event appended to it; other processes see them once written.
+
+    Long event logs are compacted as they grow: once a session has more than
+    compact_after_events events, the tool calls and responses of all but the
+    last keep_recent_turns turns are deleted, leaving the user's messages
+    and the agent's answers. If that isn't enough, the oldest turns are
+    deleted until about half that many events are left. Session, user and
+    app state are kept separately and aren't affected.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        batch_size: int = 64,
+        flush_interval: float = 0.05,
+        compact_after_events: Optional[int] = 200,
+        keep_recent_turns: int = 4,
+        busy_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            path: The database file, or ":memory:" for a private store.
+            batch_size: Buffered events that trigger a write.
+            flush_interval: Seconds an event may wait in the buffer.
+            compact_after_events: Events a session may have before it's
+                compacted; None disables compaction.
+            keep_recent_turns: Turns at the end of a session never compacted.
+            busy_timeout: Seconds to wait for another writer to finish.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_after_events = compact_after_events
+        self.keep_recent_turns = keep_recent_turns
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        # Opened on first use, so a server can build the service before it
+        # forks its workers.
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._inherited: List[sqlite3.Connection] = []
+        # Events waiting to be written, in append order:
+        # (session key, timestamp, event JSON, state delta).
+        self._pending: List[Tuple[SessionKey, float, str, Dict[str, Any]]] = []
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls) -> "SqliteSessionService":
+        """Builds a service from Config().session_store_settings."""
+        from ..config import Config
+
+        settings = Config().session_store_settings
+        return cls(
+            settings.db_path,
+            batch_size=settings.batch_size,
+            flush_interval=settings.flush_interval_secs,
+            compact_after_events=settings.compact_after_events,
+            keep_recent_turns=settings.keep_recent_turns,
+        )
+
+    def close(self) -> None:
+        """Writes any buffered events and closes the database."""
+        batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Server workers forked after the app was built must not share the
+        # parent's connection, so each process opens its own.
+        if self._conn is not None and self._pid != os.getpid():
+            # Kept, not closed: closing a connection inherited across fork
+            # is unsafe for the parent's use of it.
+            self._inherited.append(self._conn)
+            self._conn = None
+        if self._conn is None:
+            # Transactions are begun explicitly.
+            self._conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self._pid = os.getpid()
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (
+            session_id.strip()
+            if session_id and session_id.strip()
+            else str(uuid.uuid4())
+        )
+        return await asyncio.to_thread(
+            self._create, app_name, user_id, session_id, state or {}
+        )
+
+    def _create(
+        self, app_name: str, user_id: str, session_id: str, state: Dict[str, Any]
+    ) -> Session:
+        app_delta, user_delta, session_state = split_state(state)
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT INTO sessions (app_name, user_id, session_id, state, "
+                    "update_time) VALUES (?, ?, ?, ?, ?)",
+                    (app_name, user_id, session_id, json.dumps(session_state), now),
+                )
+                self._update_states(
+                    conn, {app_name: app_delta}, {(app_name, user_id): user_delta}
+                )
+                app_state, user_state = self._load_states(conn, app_name, user_id)
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Session already exists: {session_id}") from None
+        return self._session(
+            app_name, user_id, session_id, session_state, now, [], app_state, user_state
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        await self.flush()
+        return await asyncio.to_thread(self._get, app_name, user_id, session_id, config)
+
+    def _get(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig],
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        query = (
+            "SELECT seq, data FROM events "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ?"
+        )
+        params: Tuple[Any, ...] = key
+        if config and config.after_timestamp:
+            query += " AND timestamp >= ?"
+            params += (config.after_timestamp,)
+        if config and config.num_recent_events:
+            query = f"SELECT * FROM ({query} ORDER BY seq DESC LIMIT ?) ORDER BY seq"
+            params += (config.num_recent_events,)
+        else:
+            query += " ORDER BY seq"
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT state, update_time FROM sessions "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            data = [data for _, data in conn.execute(query, params)]
+            app_state, user_state = self._load_states(conn, app_name, user_id)
+        # One validation call for all the events instead of one per event.
+        events = _events_adapter.validate_json("[" + ",".join(data) + "]")
+        return self._session(
+            app_name,
+            user_id,
+            session_id,
+            json.loads(row[0]),
+            row[1],
+            events,
+            app_state,
+            user_state,
+        )
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        await self.flush()
+        return await asyncio.to_thread(self._list, app_name, user_id)
+
+    def _list(self, app_name: str, user_id: str) -> ListSessionsResponse:
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT session_id, state, update_time FROM sessions "
+                "WHERE app_name = ? AND user_id = ?",
+                (app_name, user_id),
+            ).fetchall()
+            app_state, user_state = self._load_states(conn, app_name, user_id)
+        return ListSessionsResponse(
+            sessions=[
+                self._session(
+                    app_name,
+                    user_id,
+                    session_id,
+                    json.loads(state),
+                    update_time,
+                    [],
+                    app_state,
+                    user_state,
+                )
+                for session_id, state, update_time in rows
+            ]
+        )
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        key = (app_name, user_id, session_id)
+        self._pending = [entry for entry in self._pending if entry[0] != key]
+        await asyncio.to_thread(self._delete, key)
+
+    def _delete(self, key: SessionKey) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                key,
+            )
+            conn.execute(
+                "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                key,
+            )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        delta = dict(event.actions.state_delta) if event.actions else {}
+        self._pending.append(
+            (key, event.timestamp, event.model_dump_json(exclude_none=True), delta)
+        )
+        metrics.increment("session_events_appended_total")
+        if len(self._pending) >= self.batch_size or (
+            event.author != "user" and event.is_final_response()
+        ):
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return event
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.flush_interval)
+        except asyncio.CancelledError:
+            # The event loop is shutting down; don't lose the buffer.
+            batch, self._pending = self._pending, []
+            if batch:
+                self._write(batch)
+            raise
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Writes the buffered events."""
+        if not self._pending:
+            return
+        loop = asyncio.get_running_loop()
+        if self._flush_loop is not loop:
+            self._flush_lock, self._flush_loop = asyncio.Lock(), loop
+        # Batches are written in order, so a session's events are too.
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if batch:
+                await asyncio.to_thread(self._write, batch)
+
+    def _write(
+        self, batch: List[Tuple[SessionKey, float, str, Dict[str, Any]]]
+    ) -> None:
+        by_session: Dict[SessionKey, List[Tuple[float, str, Dict[str, Any]]]] = (
+            defaultdict(list)
+        )
+        for key, timestamp, data, delta in batch:
+            by_session[key].append((timestamp, data, delta))
+
+        app_deltas: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        user_deltas: Dict[Tuple[str, str], Dict[str, Any]] = defaultdict(dict)
+        to_compact = []
+        with self._transaction() as conn:
+            for key, events in by_session.items():
+                row = conn.execute(
+                    "SELECT state, last_seq, event_count, compacted_count FROM sessions "
+                    "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    logger.warning("Dropped events of deleted session %s", key[2])
+                    continue
+                state, seq, count, compacted = (
+                    json.loads(row[0]),
+                    row[1],
+                    row[2],
+                    row[3],
+                )
+                rows = []
+                for timestamp, data, delta in events:
+                    seq += 1
+                    rows.append((*key, seq, timestamp, data))
+                    app_delta, user_delta, session_delta = split_state(delta)
+                    app_deltas[key[0]].update(app_delta)
+                    user_deltas[key[:2]].update(user_delta)
+                    state.update(session_delta)
+                conn.executemany(
+                    "INSERT INTO events (app_name, user_id, session_id, seq, "
+                    "timestamp, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute(
+                    "UPDATE sessions SET state = ?, update_time = ?, last_seq = ?, "
+                    "event_count = ? "
+                    "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (json.dumps(state), events[-1][0], seq, count + len(rows), *key),
+                )
+                if self._needs_compaction(count + len(rows), compacted):
+                    to_compact.append(key)
+            self._update_states(conn, app_deltas, user_deltas)
+        metrics.increment("session_event_batches_total")
+
+        for key in to_compact:
+            self.compact(*key)
+
+    def _needs_compaction(self, count: int, compacted: int) -> bool:
+        # Sessions whose recent turns alone are long are compacted again
+        # only after as many new events as compaction aims to leave.
+        limit = self.compact_after_events
+        return limit is not None and count > limit and count - compacted >= limit // 2
+
+    def compact(self, app_name: str, user_id: str, session_id: str) -> int:
+        """
+        Compacts a session's stored events, as described in the class
+        docstring. Buffered events are not included.
+
+        Args:
+            app_name: The name of the app.
+            user_id: The ID of the user.
+            session_id: The ID of the session.
+
+        Returns:
+            The number of events deleted.
+        """
+        key = (app_name, user_id, session_id)
+        with self._transaction() as conn:
+            events = [
+                (seq, json.loads(data))
+                for seq, data in conn.execute(
+                    "SELECT seq, data FROM events "
+                    "WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq",
+                    key,
+                )
+            ]
+            starts = [
+                i
+                for i, (_, event) in enumerate(events)
+                if event.get("author") == "user" and _has_text(event)
+            ]
+            if len(starts) <= self.keep_recent_turns:
+                boundary = 0
+            elif self.keep_recent_turns:
+                boundary = starts[-self.keep_recent_turns]
+            else:
+                boundary = len(events)
+
+            # Tool traffic of the older turns first.
+            delete = set()
+            rewrite = []
+            for seq, event in events[:boundary]:
+                if _is_tool_traffic(event):
+                    delete.add(seq)
+                elif _has_tool_parts(event):
+                    rewrite.append((json.dumps(_without_tool_parts(event)), *key, seq))
+
+            # Then whole turns, oldest first, down to half the limit. Events
+            # before the first turn count as one.
+            target = (self.compact_after_events or 0) // 2
+            remaining = len(events) - len(delete)
+            if boundary:
+                bounds = sorted({0, boundary, *(i for i in starts if i < boundary)})
+                for start, end in zip(bounds, bounds[1:]):
+                    if remaining <= target:
+                        break
+                    turn = {seq for seq, _ in events[start:end]} - delete
+                    delete |= turn
+                    remaining -= len(turn)
+
+            conn.executemany(
+                "UPDATE events SET data = ? "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq = ?",
+                [row for row in rewrite if row[-1] not in delete],
+            )
+            conn.executemany(
+                "DELETE FROM events "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq = ?",
+                [(*key, seq) for seq in delete],
+            )
+            conn.execute(
+                "UPDATE sessions SET event_count = ?, compacted_count = ? "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (remaining, remaining, *key),
+            )
+        metrics.increment("session_events_compacted_total", len(delete))
+        logger.debug(
+            "Compacted session %s from %i to %i events",
+            session_id,
+            len(events),
+            remaining,
+        )
+        return len(delete)
+
+    @staticmethod
+    def _load_states(
+        conn: sqlite3.Connection, app_name: str, user_id: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        app_row = conn.execute(
+            "SELECT state FROM app_states WHERE app_name = ?", (app_name,)
+        ).fetchone()
+        user_row = conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?",
+            (app_name, user_id),
+        ).fetchone()
+        return (
+            json.loads(app_row[0]) if app_row else {},
+            json.loads(user_row[0]) if user_row else {},
+        )
+
+    @staticmethod
+    def _update_states(
+        conn: sqlite3.Connection,
+        app_deltas: Dict[str, Dict[str, Any]],
+        user_deltas: Dict[Tuple[str, str], Dict[str, Any]],
+    ) -> None:
+        for app_name, delta in app_deltas.items():
+            if not delta:
+                continue
+            row = conn.execute(
+                "SELECT state FROM app_states WHERE app_name = ?", (app_name,)
+            ).fetchone()
+            state = {**(json.loads(row[0]) if row else {}), **delta}
+            conn.execute(
+                "INSERT OR REPLACE INTO app_states (app_name, state) VALUES (?, ?)",
+                (app_name, json.dumps(state)),
+            )
+        for (app_name, user_id), delta in user_deltas.items():
+            if not delta:
+                continue
+            row = conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?",
+                (app_name, user_id),
+            ).fetchone()
+            state = {**(json.loads(row[0]) if row else {}), **delta}
+            conn.execute(
+                "INSERT OR REPLACE INTO user_states (app_name, user_id, state) "
+                "VALUES (?, ?, ?)",
+                (app_name, user_id, json.dumps(state)),
+            )
+
+    @staticmethod
+    def _session(
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        state: Dict[str, Any],
+        update_time: float,
+        events: List[Event],
+        app_state: Dict[str, Any],
+        user_state: Dict[str, Any],
+    ) -> Session:
+        merged = dict(state)
+        merged.update({State.APP_PREFIX + k: v for k, v in app_state.items()})
+        merged.update({State.USER_PREFIX + k: v for k, v in user_state.items()})
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=merged,
+            events=events,
+            last_update_time=update_time,
+        )
+
+
+def session_lifespan(service: BaseSessionService):
+    """
+    Returns a FastAPI lifespan that closes service when the server stops, so
+    that buffered events are written before a worker exits.
+
+    Args:
+        service: The session service; only a SqliteSessionService is closed.
+
+    Returns:
+        The lifespan, for get_fast_api_app(lifespan=...).
+    """
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app) -> AsyncIterator[None]:
+        try:
+            yield
+        finally:
+            if isinstance(service, SqliteSessionService):
+                await service.flush()
+                service.close()
+
+    return lifespan
+
+
+@contextlib.contextmanager
+def default_session_service(service: BaseSessionService) -> Iterator[None]:
+    """
+    Makes get_fast_api_app() use service when it's given no
+    session_service_uri. It has no parameter for a session service object
+    and builds an InMemorySessionService instead.
+
+    Args:
+        service: The session service.
+    """
+    from google.adk.cli import fast_api
+
+    original = fast_api.InMemorySessionService
+    fast_api.InMemorySessionService = lambda: service
+    try:
+        yield
+    finally:
+        fast_api.InMemorySessionService = original
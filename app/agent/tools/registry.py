@@ -0,0 +1,211 @@
+import inspect
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from google.adk.tools import ToolContext
+from google.adk.tools.function_tool import FunctionTool
+from google.adk.utils.variant_utils import get_google_llm_variant
+from google.genai import types
+
+from .tools import (
+    access_cart_information,
+    check_product_availability,
+    check_product_list,
+    get_product_recommendations,
+    get_purchase_analytics,
+    get_purchase_history,
+    modify_cart,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RegisteredTool(FunctionTool):
+    """
+    FunctionTool whose declaration and call signature are computed once.
+
+    FunctionTool rebuilds the function declaration for every model request;
+    here it is built once per API variant. Calls still go through
+    FunctionTool.run_async, so confirmation and tool_context work as before.
+    """
+
+    def __init__(
+        self, func: Callable[..., Any], stateless: bool = False, **kwargs: Any
+    ):
+        super().__init__(func, **kwargs)
+        # Whether the tool only reads data that is the same in every process
+        # (the catalogue, the segment index), so it may run in another one.
+        self.stateless = stateless
+        parameters = inspect.signature(func).parameters
+        self._params = frozenset(parameters)
+        self._wants_context = "tool_context" in parameters
+        self._mandatory = tuple(self._get_mandatory_args())
+        self._declarations: Dict[Any, Optional[types.FunctionDeclaration]] = {}
+        self._get_declaration()
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        # The declaration depends on the API variant (Vertex AI or Gemini API).
+        variant = get_google_llm_variant()
+        if variant not in self._declarations:
+            self._declarations[variant] = super()._get_declaration()
+        return self._declarations[variant]
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.func)
+
+    def bind(
+        self, args: Dict[str, Any], tool_context: Optional[ToolContext] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Maps call arguments onto the function's parameters.
+
+        Args:
+            args: The arguments sent by the model or MCP client.
+            tool_context: The ADK tool context, passed if the function takes one.
+
+        Returns:
+            The keyword arguments to call the function with, or None when a
+            mandatory argument is missing.
+        """
+        args_to_call = {k: v for k, v in args.items() if k in self._params}
+        if self._wants_context:
+            args_to_call["tool_context"] = tool_context
+        if any(arg not in args_to_call for arg in self._mandatory):
+            return None
+        return args_to_call
+
+
+class ToolRegistry:
+    """
+    The single list of tools shared by root_agent and the MCP servers.
+
+    Tools are wrapped once at registration, MCP schemas are converted once on
+    first use, and calls are dispatched with one dict lookup.
+    """
+
+    def __init__(
+        self,
+        functions: Sequence[Callable[..., Any]] = (),
+        stateless: Sequence[Callable[..., Any]] = (),
+    ):
+        """
+        Args:
+            functions: The tool functions.
+            stateless: The functions, among them, that keep no state in their
+                process, such as carts or customers (see register()).
+        """
+        self._tools: Dict[str, RegisteredTool] = {}
+        self._mcp_tools = None
+        for func in functions:
+            self.register(func, stateless=func in stateless)
+
+    def register(
+        self, func: Callable[..., Any], stateless: bool = False
+    ) -> RegisteredTool:
+        """
+        Adds a tool function to the registry.
+
+        Args:
+            func: The tool function. Its name is the tool name.
+            stateless: Whether the tool gives the same results in any
+                process. Only stateless tools may run on the MCP server's
+                process pool: the carts, customers and purchases of other
+                processes are not the ones in this process's stores.
+
+        Returns:
+            The wrapped tool.
+        """
+        tool = RegisteredTool(func, stateless=stateless)
+        if tool.name in self._tools:
+            raise ValueError(f"Tool '{tool.name}' is already registered")
+        self._tools[tool.name] = tool
+        self._mcp_tools = None
+        return tool
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tools)
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def get(self, name: str) -> Optional[RegisteredTool]:
+        return self._tools.get(name)
+
+    @property
+    def tools(self) -> List[RegisteredTool]:
+        """The ADK tools, for Agent(tools=...)."""
+        return list(self._tools.values())
+
+    @property
+    def functions(self) -> List[Callable[..., Any]]:
+        """The plain tool functions, for frameworks that wrap them themselves."""
+        return [tool.func for tool in self._tools.values()]
+
+    def declarations(self) -> List[types.FunctionDeclaration]:
+        return [tool._get_declaration() for tool in self._tools.values()]
+
+    def mcp_tools(self) -> list:
+        """
+        Returns the MCP tool listing, converting the declarations only once.
+
+        Returns:
+            A list of mcp.types.Tool.
+        """
+        if self._mcp_tools is None:
+            from google.adk.tools.mcp_tool.conversion_utils import (
+                adk_to_mcp_tool_type,
+            )
+
+            self._mcp_tools = [adk_to_mcp_tool_type(t) for t in self._tools.values()]
+        return self._mcp_tools
+
+    async def call(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        tool_context: Optional[ToolContext] = None,
+    ) -> Any:
+        """
+        Runs a tool by name.
+
+        Args:
+            name: The tool name.
+            arguments: The tool arguments.
+            tool_context: The ADK tool context, None outside of an agent.
+
+        Returns:
+            The tool result.
+
+        Raises:
+            KeyError: If no tool has that name.
+        """
+        return await self._tools[name].run_async(
+            args=arguments, tool_context=tool_context
+        )
+
+    def register_fastmcp(self, mcp) -> None:
+        """Registers every tool function with a FastMCP server."""
+        for func in self.functions:
+            mcp.tool(func)
+
+
+registry = ToolRegistry(
+    [
+        check_product_list,
+        get_product_recommendations,
+        check_product_availability,
+        access_cart_information,
+        modify_cart,
+        get_purchase_history,
+        get_purchase_analytics,
+    ],
+    stateless=[
+        check_product_list,
+        get_product_recommendations,
+        check_product_availability,
+    ],
+)
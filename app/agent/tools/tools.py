@@ -1,9 +1,16 @@
 import logging
 from typing import Optional
 
+from ..entities.carts import get_cart_store
+from ..entities.catalog import PRODUCTS, product_department
+from ..entities.repository import DEFAULT_PAGE_SIZE, get_repository
+from ..entities.segments import get_segment_index
+from ..shared_libraries.metrics import instrument
+
 logger = logging.getLogger(__name__)
 
 
+@instrument("tool")
 def check_product_list(department: Optional[str] = None) -> dict:
     """Get a list of products by department or all products.
 
@@ -137,6 +144,23 @@ def check_product_list(department: Optional[str] = None) -> dict:
     return {"department": "all", "total_products": len(products), "products": products}
 
 
+def _with_segment(result: dict) -> dict:
+    """Orders recommendations by what the customer's segment buys and names it."""
+    index = get_segment_index()
+    segment = index.segment(result["customer_id"])
+    if segment is None:
+        return result
+    profile = index.profile(segment)
+    preferred = profile["top_categories"]
+    result["recommendations"] = sorted(
+        result["recommendations"],
+        key=lambda r: product_department(r["product_id"]) not in preferred,
+    )
+    result["customer_segment"] = profile
+    return result
+
+
+@instrument("tool")
 def get_product_recommendations(plant_type: str, customer_id: str) -> dict:
     """Provides product recommendations based on the type of plant and customer profile.
 
@@ -251,7 +275,7 @@ def get_product_recommendations(plant_type: str, customer_id: str) -> dict:
             result["plant_type"] = plant_type
             result["customer_id"] = customer_id
             result["total_recommendations"] = len(result["recommendations"])
-            return result
+            return _with_segment(result)
 
     # Handle general categories
     if any(term in plant_type_lower for term in ["annual", "flower", "bloom"]):
@@ -260,7 +284,7 @@ def get_product_recommendations(plant_type: str, customer_id: str) -> dict:
         result["customer_id"] = customer_id
         result["total_recommendations"] = len(result["recommendations"])
         result["note"] = "General flowering plant recommendations"
-        return result
+        return _with_segment(result)
 
     if any(term in plant_type_lower for term in ["vegetable", "veggie", "edible"]):
         result = recommendation_db["tomatoes"].copy()
@@ -268,7 +292,7 @@ def get_product_recommendations(plant_type: str, customer_id: str) -> dict:
         result["customer_id"] = customer_id
         result["total_recommendations"] = len(result["recommendations"])
         result["note"] = "General vegetable gardening recommendations"
-        return result
+        return _with_segment(result)
 
     # Default general recommendations
     general_recommendations = {
@@ -298,9 +322,10 @@ def get_product_recommendations(plant_type: str, customer_id: str) -> dict:
         "note": "General gardening recommendations - consider providing more specific plant information for better suggestions",
     }
 
-    return general_recommendations
+    return _with_segment(general_recommendations)
 
 
+@instrument("tool")
 def check_product_availability(product_id: str, store_id: str) -> dict:
     """Checks the availability of a product at a specified store or for pickup.
 
@@ -377,10 +402,28 @@ def check_product_availability(product_id: str, store_id: str) -> dict:
     }
 
 
-# Global cart state for simulation (in production, this would be in a database)
-_CART_STATE = {}
-
-
+# The cart a customer starts with when they first look at it.
+_DEFAULT_CART = [
+    {
+        "product_id": "soil-123",
+        "name": "All-Purpose Garden Soil",
+        "description": "Versatile potting soil suitable for most plants.",
+        "quantity": 2,
+        "unit_price": 10.99,
+        "department": "soil",
+    },
+    {
+        "product_id": "seed-101",
+        "name": "Tomato Seeds - Cherry",
+        "description": "Heirloom cherry tomato seeds for sweet, juicy fruits.",
+        "quantity": 1,
+        "unit_price": 3.99,
+        "department": "seeds",
+    },
+]
+
+
+@instrument("tool")
 def access_cart_information(customer_id: str) -> dict:
     """Retrieves the current cart contents for a customer.
 
@@ -392,29 +435,12 @@ def access_cart_information(customer_id: str) -> dict:
     """
     logger.info("Accessing cart information for customer ID: %s", customer_id)
 
-    # Initialize cart if it doesn't exist
-    if customer_id not in _CART_STATE:
-        _CART_STATE[customer_id] = [
-            {
-                "product_id": "soil-123",
-                "name": "All-Purpose Garden Soil",
-                "description": "Versatile potting soil suitable for most plants.",
-                "quantity": 2,
-                "unit_price": 10.99,
-                "department": "soil",
-            },
-            {
-                "product_id": "seed-101",
-                "name": "Tomato Seeds - Cherry",
-                "description": "Heirloom cherry tomato seeds for sweet, juicy fruits.",
-                "quantity": 1,
-                "unit_price": 3.99,
-                "department": "seeds",
-            },
-        ]
-
-    # Get current cart items
-    cart_items = _CART_STATE[customer_id]
+    # Get current cart items, creating the cart if it doesn't exist
+    store = get_cart_store()
+    cart_items = store.get(customer_id)
+    if cart_items is None:
+        with store.edit(customer_id, default=_DEFAULT_CART) as created:
+            cart_items = created
 
     # Calculate totals
     subtotal = sum(item["quantity"] * item["unit_price"] for item in cart_items)
@@ -441,6 +467,7 @@ def access_cart_information(customer_id: str) -> dict:
     return cart_response
 
 
+@instrument("tool")
 def modify_cart(
     customer_id: str, items_to_add: list[dict], items_to_remove: list[dict]
 ) -> dict:
@@ -458,216 +485,120 @@ def modify_cart(
     logger.info("Adding items: %s", items_to_add)
     logger.info("Removing items: %s", items_to_remove)
 
-    # Product database for lookups
-    product_database = {
-        "tool-001": {"name": "Hand Trowel", "price": 12.99, "department": "tools"},
-        "tool-002": {"name": "Pruning Shears", "price": 24.99, "department": "tools"},
-        "tool-003": {"name": "Garden Spade", "price": 34.99, "department": "tools"},
-        "seed-101": {
-            "name": "Tomato Seeds - Cherry",
-            "price": 3.99,
-            "department": "seeds",
-        },
-        "seed-102": {
-            "name": "Sunflower Seeds - Giant",
-            "price": 4.99,
-            "department": "seeds",
-        },
-        "seed-103": {
-            "name": "Petunia Seeds - Mixed Colors",
-            "price": 5.99,
-            "department": "seeds",
-        },
-        "decor-201": {
-            "name": "Terracotta Planter - Large",
-            "price": 18.99,
-            "department": "decor",
-        },
-        "decor-202": {
-            "name": "Solar Garden Lantern",
-            "price": 29.99,
-            "department": "decor",
-        },
-        "decor-203": {
-            "name": "Garden Stepping Stones",
-            "price": 39.99,
-            "department": "decor",
-        },
-        "irrig-301": {
-            "name": "Soaker Hose - 25ft",
-            "price": 19.99,
-            "department": "irrigation",
-        },
-        "irrig-302": {
-            "name": "Copper Watering Can",
-            "price": 42.99,
-            "department": "irrigation",
-        },
-        "soil-456": {
-            "name": "Bloom Booster Potting Mix",
-            "price": 14.99,
-            "department": "soil",
-        },
-        "fert-789": {
-            "name": "Flower Power Fertilizer",
-            "price": 9.99,
-            "department": "fertilizer",
-        },
-        "tool-004": {
-            "name": "Deadheading Snips",
-            "price": 16.99,
-            "department": "tools",
-        },
-        "soil-789": {
-            "name": "Vegetable Garden Soil",
-            "price": 12.99,
-            "department": "soil",
-        },
-        "fert-456": {
-            "name": "Tomato & Vegetable Fertilizer",
-            "price": 11.99,
-            "department": "fertilizer",
-        },
-        "supp-101": {
-            "name": "Tomato Cages - Set of 3",
-            "price": 24.99,
-            "department": "support",
-        },
-        "soil-123": {
-            "name": "All-Purpose Garden Soil",
-            "price": 10.99,
-            "department": "soil",
-        },
-        "fert-321": {
-            "name": "High Nitrogen Fertilizer",
-            "price": 13.99,
-            "department": "fertilizer",
-        },
-        "fert-general": {
-            "name": "General Purpose Plant Food",
-            "price": 8.99,
-            "department": "fertilizer",
-        },
-    }
-
-    # Initialize cart if it doesn't exist
-    if customer_id not in _CART_STATE:
-        _CART_STATE[customer_id] = []
-
-    # Get current cart
-    current_cart = _CART_STATE[customer_id]
-
-    # Track modifications
-    added_items = []
-    removed_items = []
-    errors = []
-
-    # Process removals first
-    for item in items_to_remove:
-        product_id = item.get("product_id")
-        quantity_to_remove = item.get("quantity", 1)
-
-        if not product_id:
-            errors.append("Missing product_id in items_to_remove")
-            continue
-
-        # Find item in cart
-        cart_item = None
-        for cart_item_ref in current_cart:
-            if cart_item_ref["product_id"] == product_id:
-                cart_item = cart_item_ref
-                break
-
-        if not cart_item:
-            errors.append(f"Product {product_id} not found in cart")
-            continue
-
-        # Remove quantity
-        if cart_item["quantity"] <= quantity_to_remove:
-            # Remove entire item
-            current_cart.remove(cart_item)
-            removed_items.append(
-                {
-                    "product_id": product_id,
-                    "quantity": cart_item["quantity"],
-                    "name": cart_item["name"],
-                }
-            )
-        else:
-            # Reduce quantity
-            cart_item["quantity"] -= quantity_to_remove
-            removed_items.append(
-                {
+    # Get the current cart; changes are stored when the block exits, and
+    # concurrent changes from other workers wait until then.
+    with get_cart_store().edit(customer_id) as current_cart:
+        # Track modifications
+        added_items = []
+        removed_items = []
+        errors = []
+
+        # Process removals first
+        for item in items_to_remove:
+            product_id = item.get("product_id")
+            quantity_to_remove = item.get("quantity", 1)
+
+            if not product_id:
+                errors.append("Missing product_id in items_to_remove")
+                continue
+
+            # Find item in cart
+            cart_item = None
+            for cart_item_ref in current_cart:
+                if cart_item_ref["product_id"] == product_id:
+                    cart_item = cart_item_ref
+                    break
+
+            if not cart_item:
+                errors.append(f"Product {product_id} not found in cart")
+                continue
+
+            # Remove quantity
+            if cart_item["quantity"] <= quantity_to_remove:
+                # Remove entire item
+                current_cart.remove(cart_item)
+                removed_items.append(
+                    {
+                        "product_id": product_id,
+                        "quantity": cart_item["quantity"],
+                        "name": cart_item["name"],
+                    }
+                )
+            else:
+                # Reduce quantity
+                cart_item["quantity"] -= quantity_to_remove
+                removed_items.append(
+                    {
+                        "product_id": product_id,
+                        "quantity": quantity_to_remove,
+                        "name": cart_item["name"],
+                    }
+                )
+
+        # Process additions
+        for item in items_to_add:
+            product_id = item.get("product_id")
+            quantity = item.get("quantity", 1)
+
+            if not product_id:
+                errors.append("Missing product_id in items_to_add")
+                continue
+
+            if product_id not in PRODUCTS:
+                errors.append(f"Product {product_id} not found")
+                continue
+
+            # Check availability (simplified - in production would call inventory service)
+            if product_id == "decor-202":  # Out of stock item
+                errors.append(f"Product {product_id} is out of stock")
+                continue
+
+            product_info = PRODUCTS[product_id]
+
+            # Check if item already exists in cart
+            existing_item = None
+            for cart_item in current_cart:
+                if cart_item["product_id"] == product_id:
+                    existing_item = cart_item
+                    break
+
+            if existing_item:
+                # Update quantity
+                existing_item["quantity"] += quantity
+                added_items.append(
+                    {
+                        "product_id": product_id,
+                        "quantity": quantity,
+                        "unit_price": product_info["price"],
+                        "total_price": product_info["price"] * quantity,
+                        "name": product_info["name"],
+                    }
+                )
+            else:
+                # Add new item
+                new_cart_item = {
                     "product_id": product_id,
-                    "quantity": quantity_to_remove,
-                    "name": cart_item["name"],
-                }
-            )
-
-    # Process additions
-    for item in items_to_add:
-        product_id = item.get("product_id")
-        quantity = item.get("quantity", 1)
-
-        if not product_id:
-            errors.append("Missing product_id in items_to_add")
-            continue
-
-        if product_id not in product_database:
-            errors.append(f"Product {product_id} not found")
-            continue
-
-        # Check availability (simplified - in production would call inventory service)
-        if product_id == "decor-202":  # Out of stock item
-            errors.append(f"Product {product_id} is out of stock")
-            continue
-
-        product_info = product_database[product_id]
-
-        # Check if item already exists in cart
-        existing_item = None
-        for cart_item in current_cart:
-            if cart_item["product_id"] == product_id:
-                existing_item = cart_item
-                break
-
-        if existing_item:
-            # Update quantity
-            existing_item["quantity"] += quantity
-            added_items.append(
-                {
-                    "product_id": product_id,
-                    "quantity": quantity,
-                    "unit_price": product_info["price"],
-                    "total_price": product_info["price"] * quantity,
                     "name": product_info["name"],
-                }
-            )
-        else:
-            # Add new item
-            new_cart_item = {
-                "product_id": product_id,
-                "name": product_info["name"],
-                "description": f"{product_info['name']} from {product_info['department']} department",
-                "quantity": quantity,
-                "unit_price": product_info["price"],
-                "department": product_info["department"],
-            }
-            current_cart.append(new_cart_item)
-            added_items.append(
-                {
-                    "product_id": product_id,
+                    "description": f"{product_info['name']} from {product_info['department']} department",
                     "quantity": quantity,
                     "unit_price": product_info["price"],
-                    "total_price": product_info["price"] * quantity,
-                    "name": product_info["name"],
+                    "department": product_info["department"],
                 }
-            )
-
-    # Calculate new totals
-    subtotal = sum(item["quantity"] * item["unit_price"] for item in current_cart)
-    tax = round(subtotal * 0.08, 2)  # 8% tax
-    total = round(subtotal + tax, 2)
+                current_cart.append(new_cart_item)
+                added_items.append(
+                    {
+                        "product_id": product_id,
+                        "quantity": quantity,
+                        "unit_price": product_info["price"],
+                        "total_price": product_info["price"] * quantity,
+                        "name": product_info["name"],
+                    }
+                )
+
+        # Calculate new totals
+        subtotal = sum(item["quantity"] * item["unit_price"] for item in current_cart)
+        tax = round(subtotal * 0.08, 2)  # 8% tax
+        total = round(subtotal + tax, 2)
 
     result = {
         "status": "success" if not errors else "partial_success",
@@ -694,3 +625,71 @@ def modify_cart(
         result["message"] += f" with {len(errors)} errors"
 
     return result
+
+
+@instrument("tool")
+def get_purchase_history(
+    customer_id: str, cursor: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE
+) -> dict:
+    """Retrieves a page of the customer's past orders, newest first.
+
+    The customer profile only carries a purchase summary and the latest
+    orders; use this tool when older orders are needed.
+
+    Args:
+        customer_id (str): The ID of the customer.
+        cursor (str): The next_cursor returned by the previous page, omit for the
+            first page.
+        page_size (int): Number of orders per page (at most 100).
+
+    Returns:
+        dict: The orders of the page and the cursor for the next page, which is
+            null on the last page.
+    """
+    logger.info("Getting purchase history for customer ID: %s", customer_id)
+
+    repository = get_repository()
+    customer = repository.get(customer_id)
+    if customer is None:
+        return {"status": "error", "message": f"Customer {customer_id} not found"}
+    try:
+        purchases, next_cursor = repository.get_purchases(
+            customer_id, cursor, page_size
+        )
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return {
+        "customer_id": customer_id,
+        "order_count": customer.purchase_summary.order_count,
+        "purchases": [purchase.model_dump() for purchase in purchases],
+        "next_cursor": next_cursor,
+    }
+
+
+@instrument("tool")
+def get_purchase_analytics(customer_id: str, department: Optional[str] = None) -> dict:
+    """Retrieves the customer's spending analytics: spend per department, recency,
+    order frequency, top products and loyalty points balance.
+
+    Use this for questions like "how much have I spent on seeds" instead of
+    reading the purchase history.
+
+    Args:
+        customer_id (str): The ID of the customer.
+        department (str): Optional department to report the spend for (tools,
+            seeds, decor, irrigation, soil, fertilizer, support).
+
+    Returns:
+        dict: The customer's purchase analytics.
+    """
+    logger.info("Getting purchase analytics for customer ID: %s", customer_id)
+
+    analytics = get_repository().get_analytics(customer_id)
+    if analytics is None:
+        return {"status": "error", "message": f"Customer {customer_id} not found"}
+    report = analytics.report()
+    if department:
+        department = department.lower()
+        report["department"] = department
+        report["department_spend"] = analytics.spend_by_department.get(department, 0.0)
+    return report
@@ -0,0 +1,108 @@
+"""Compares sequential tool calls with batch_call over streamable HTTP.
+
+Starts the FastMCP server in a subprocess and, for each batch size, times the
+same availability checks issued as sequential call_tool round trips and as
+one batch_call request.
+
+Usage:
+    PYTHONPATH=. python benchmarks/batch_calls.py [--sizes 1 5 20 50]
+        [--repeat 20] [--port 8765]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+
+PRODUCTS = ["tool-001", "seed-101", "decor-201", "irrig-301", "soil-456", "fert-789"]
+
+SERVER = (
+    "import logging; logging.disable(logging.INFO);"
+    "from mcp_server.fast_mcp_server import mcp;"
+    "mcp.run(transport='streamable-http', port={port}, log_level='warning')"
+)
+
+
+def start_server(port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(port=port)],
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("MCP server did not start")
+
+
+def _calls(size: int) -> List[Dict]:
+    return [
+        {
+            "tool": "check_product_availability",
+            "args": {"product_id": PRODUCTS[i % len(PRODUCTS)], "store_id": "london"},
+        }
+        for i in range(size)
+    ]
+
+
+async def run(url: str, sizes: List[int], repeat: int) -> List[Dict]:
+    results = []
+    async with CustomerServicesMCPClient(url) as client:
+        await client.batch(_calls(1))  # Warm up the session and the pools.
+        for size in sizes:
+            calls = _calls(size)
+            sequential, batched = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for call in calls:
+                    await client.check_product_availability(**call["args"])
+                sequential.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                await client.batch(calls)
+                batched.append(time.perf_counter() - start)
+            seq_ms = statistics.median(sequential) * 1e3
+            batch_ms = statistics.median(batched) * 1e3
+            results.append(
+                {
+                    "calls": size,
+                    "sequential_ms": round(seq_ms, 2),
+                    "batch_ms": round(batch_ms, 2),
+                    "speedup": round(seq_ms / batch_ms, 1),
+                }
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 20, 50])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = start_server(args.port)
+    try:
+        url = f"http://127.0.0.1:{args.port}/mcp"
+        print(json.dumps(asyncio.run(run(url, args.sizes, args.repeat)), indent=2))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
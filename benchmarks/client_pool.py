@@ -0,0 +1,99 @@
+"""Compares a pooled client with a connection per request over streamable HTTP.
+
+Starts the FastMCP server in a subprocess and, at each concurrency level, has
+that many workers make availability checks for a fixed duration, once opening
+a new CustomerServicesMCPClient per call and once sharing one pooled client.
+Reports calls/sec and p50/p99 latency.
+
+Usage:
+    PYTHONPATH=. python benchmarks/client_pool.py [--concurrency 1 10 50]
+        [--duration 5] [--pool-size 4] [--port 8767]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.batch_calls import PRODUCTS, start_server
+from benchmarks.load_test import quantile
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+
+
+async def _drive(
+    call: Callable[[int], Awaitable], concurrency: int, duration: float
+) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker(seed: int) -> None:
+        nonlocal errors
+        i = seed
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+            i += concurrency
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    elapsed = time.monotonic() - start
+    latencies.sort()
+    return {
+        "calls_per_sec": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+        "p50_ms": round(quantile(latencies, 0.5) * 1e3, 2) if latencies else None,
+        "p99_ms": round(quantile(latencies, 0.99) * 1e3, 2) if latencies else None,
+    }
+
+
+async def run(url: str, concurrency: int, duration: float, pool_size: int) -> Dict:
+    async def per_request(i: int):
+        async with CustomerServicesMCPClient(url) as client:
+            await client.check_product_availability(PRODUCTS[i % len(PRODUCTS)], "london")
+
+    async with CustomerServicesMCPClient(url, pool_size=pool_size) as pooled:
+
+        async def shared(i: int):
+            await pooled.check_product_availability(PRODUCTS[i % len(PRODUCTS)], "london")
+
+        await shared(0)  # Warm up the server.
+        return {
+            "concurrency": concurrency,
+            "per_request": await _drive(per_request, concurrency, duration),
+            "pooled": await _drive(shared, concurrency, duration),
+            "pool": pooled.client.stats(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    server = start_server(args.port)
+    url = f"http://127.0.0.1:{args.port}/mcp"
+    try:
+        results = [
+            asyncio.run(run(url, concurrency, args.duration, args.pool_size))
+            for concurrency in args.concurrency
+        ]
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmarks CustomerRepository lookups against a large synthetic customer base.
+
+Generates a bulk JSON lines fixture of synthetic customers, loads it into a
+SQLite store and times cold and warm single lookups and batched get_many calls.
+
+Usage:
+    PYTHONPATH=. python benchmarks/customer_repository.py [--customers 100000]
+        [--db /tmp/customers.db] [--fixture /tmp/customers.jsonl]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, Iterator, List
+
+from app.agent.entities.repository import DEFAULT_FIXTURE, CustomerRepository
+
+
+def synthetic_customers(count: int, seed: int = 7) -> Iterator[Dict]:
+    """
+    Yields synthetic customer records based on the fixture customers.
+
+    Args:
+        count: Number of customers to generate.
+        seed: Seed for the random variations.
+
+    Yields:
+        Customer dicts with ids "c000000", "c000001", ...
+    """
+    rng = random.Random(seed)
+    with open(DEFAULT_FIXTURE) as f:
+        templates = json.load(f)
+    for i in range(count):
+        customer = dict(rng.choice(templates))
+        customer["customer_id"] = f"c{i:06d}"
+        customer["account_number"] = f"{rng.randrange(10**9):09d}"
+        customer["email"] = f"customer{i}@example.com"
+        customer["loyalty_points"] = rng.randrange(1000)
+        yield customer
+
+
+def write_fixture(path: str, count: int) -> None:
+    with open(path, "w") as f:
+        for customer in synthetic_customers(count):
+            f.write(json.dumps(customer) + "\n")
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50_us": round(statistics.median(samples) * 1e6, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 2),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 2),
+    }
+
+
+def _time_gets(repository: CustomerRepository, ids: List[str]) -> List[float]:
+    samples = []
+    for customer_id in ids:
+        start = time.perf_counter()
+        repository.get(customer_id)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run(customers: int, lookups: int, db_path: str, fixture_path: str) -> Dict:
+    if not os.path.exists(fixture_path):
+        write_fixture(fixture_path, customers)
+
+    repository = CustomerRepository(db_path, cache_size=customers)
+    start = time.perf_counter()
+    loaded = repository.load_fixture(fixture_path)
+    load_secs = time.perf_counter() - start
+
+    ids = [f"c{i:06d}" for i in random.Random(1).sample(range(loaded), lookups)]
+    cold = _time_gets(repository, ids)
+    warm = _time_gets(repository, ids)
+
+    repository.cache.clear()
+    batch = ids[:500]
+    start = time.perf_counter()
+    repository.get_many(batch)
+    batch_cold = time.perf_counter() - start
+    start = time.perf_counter()
+    repository.get_many(batch)
+    batch_warm = time.perf_counter() - start
+
+    return {
+        "customers": loaded,
+        "load_secs": round(load_secs, 2),
+        "get_cold": _percentiles(cold),
+        "get_warm": _percentiles(warm),
+        "get_many_500_cold_ms": round(batch_cold * 1e3, 2),
+        "get_many_500_warm_ms": round(batch_warm * 1e3, 2),
+        "cache": repository.cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--db", default=None, help="SQLite file, default a temp file")
+    parser.add_argument("--fixture", default=None, help="JSON lines fixture path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = run(
+            args.customers,
+            min(args.lookups, args.customers),
+            args.db or os.path.join(tmp, "customers.db"),
+            args.fixture or os.path.join(tmp, f"customers-{args.customers}.jsonl"),
+        )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Benchmarks building the customer segment index and querying it.
+
+Generates synthetic customers with varied garden profiles and purchase
+summaries, builds the SegmentIndex and times segment lookups and
+nearest-neighbour queries against re-deriving the features from the profile
+JSON on every turn.
+
+Usage:
+    PYTHONPATH=. python benchmarks/customer_segments.py [--customers 100000]
+        [--segments 16]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Callable, Dict, Iterator, List
+
+from app.agent.entities.catalog import DEPARTMENTS
+from app.agent.entities.customer import (
+    Address,
+    Customer,
+    GardenProfile,
+    PurchaseSummary,
+)
+from app.agent.entities.segments import (
+    GARDEN_TYPES,
+    INTERESTS,
+    SIZES,
+    SOIL_TYPES,
+    SegmentIndex,
+)
+
+SUN_EXPOSURES = ("full sun", "partial shade", "shade")
+
+
+def synthetic_customers(count: int, seed: int = 11) -> Iterator[Customer]:
+    rng = random.Random(seed)
+    address = Address(street="1 High St", city="London", state="LDN", zip="E1 6AN")
+    for i in range(count):
+        spend = {c: round(rng.uniform(0, 200), 2) for c in rng.sample(DEPARTMENTS, 3)}
+        yield Customer(
+            account_number=f"{i:09d}",
+            customer_id=f"c{i:06d}",
+            customer_first_name="Sam",
+            customer_last_name=f"Customer{i}",
+            email=f"customer{i}@example.com",
+            phone_number="+44-20-7946-0000",
+            customer_start_date="2020-01-01",
+            years_as_customer=rng.randint(0, 10),
+            billing_address=address,
+            purchase_summary=PurchaseSummary(
+                order_count=rng.randint(0, 300),
+                total_spend=round(sum(spend.values()), 2),
+                category_spend=spend,
+            ),
+            loyalty_points=rng.randint(0, 2000),
+            preferred_store="London Garden Store",
+            communication_preferences={},
+            garden_profile=GardenProfile(
+                type=rng.choice(GARDEN_TYPES),
+                size=rng.choice(list(SIZES)),
+                sun_exposure=rng.choice(SUN_EXPOSURES),
+                soil_type=rng.choice(SOIL_TYPES),
+                interests=rng.sample(INTERESTS, rng.randint(1, 3)),
+            ),
+        )
+
+
+def _time(fn: Callable, args: List) -> Dict[str, float]:
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "p50_us": round(statistics.median(samples) * 1e6, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 2),
+    }
+
+
+def run(customers: int, segments: int, queries: int) -> Dict:
+    population = list(synthetic_customers(customers))
+    start = time.perf_counter()
+    index = SegmentIndex.build(population, n_segments=segments)
+    build_secs = time.perf_counter() - start
+
+    rng = random.Random(5)
+    sample = rng.sample(population, queries)
+    ids = [c.customer_id for c in sample]
+    profiles = [c.to_json() for c in sample]
+
+    def rederive(profile: str) -> int:
+        return index.assign(index.transform(Customer.model_validate_json(profile)))
+
+    return {
+        "customers": customers,
+        "segments": segments,
+        "feature_dim": index.vectors.shape[1],
+        "build_secs": round(build_secs, 2),
+        "index_mib": round((index.vectors.nbytes + index._unit.nbytes) / 2**20, 1),
+        "segment_sizes": [index.profile(s)["size"] for s in range(segments)],
+        "segment_lookup": _time(index.segment, ids),
+        "rederive_from_json": _time(rederive, profiles),
+        "nearest_10_in_segment": _time(lambda i: index.nearest(i, k=10), ids),
+        "nearest_10_global": _time(
+            lambda i: index.nearest(i, k=10, within_segment=False), ids
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--segments", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.customers, args.segments, args.queries), indent=2))
+
+
+if __name__ == "__main__":
+    main()
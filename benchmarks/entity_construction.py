@@ -0,0 +1,96 @@
+"""Compares validated, trusted and lazy construction of Customer profiles.
+
+Serialises synthetic customers the way CustomerRepository stores them and
+times rebuilding them:
+
+- validated: Customer.model_validate_json per document
+- validated_batch: one cached TypeAdapter call per batch with the collector
+  paused (repository.decode_many, used by get_many and iter_customers)
+- trusted: json.loads plus recursive model_construct, skipping validation
+- view: CustomerView read views, unread and with two fields read
+
+Usage:
+    PYTHONPATH=. python benchmarks/entity_construction.py [--customers 10000]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Type, get_args, get_origin
+
+from pydantic import BaseModel
+
+from app.agent.entities.customer import Customer
+from app.agent.entities.repository import decode_many, split_record
+from app.agent.entities.views import CustomerView
+from benchmarks.customer_repository import synthetic_customers
+
+
+def construct_trusted(cls: Type[BaseModel], data: Dict[str, Any]) -> BaseModel:
+    """model_construct for a model and its nested models, without validation."""
+    values = dict(data)
+    for name, field in cls.model_fields.items():
+        value = values.get(name)
+        annotation = field.annotation
+        if value is None:
+            continue
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            values[name] = construct_trusted(annotation, value)
+        elif get_origin(annotation) is list:
+            (item,) = get_args(annotation)
+            if isinstance(item, type) and issubclass(item, BaseModel):
+                values[name] = [construct_trusted(item, v) for v in value]
+    return cls.model_construct(**values)
+
+
+def _read_two_fields(view: CustomerView) -> CustomerView:
+    view.customer_first_name
+    view.garden_profile.type
+    return view
+
+
+def _measure(build: Callable[[], List]) -> Dict[str, float]:
+    build()
+    start = time.perf_counter()
+    built = build()
+    elapsed = time.perf_counter() - start
+    del built
+    tracemalloc.start()
+    built = build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "total_ms": round(elapsed * 1e3, 1),
+        "per_customer_us": round(elapsed / len(built) * 1e6, 2),
+        "held_kib_per_customer": round(held / 1024 / len(built), 2),
+    }
+
+
+def run(customers: int) -> Dict[str, Dict[str, float]]:
+    rows = [
+        split_record(record)[0].model_dump_json()
+        for record in synthetic_customers(customers)
+    ]
+    return {
+        "validated": _measure(lambda: [Customer.model_validate_json(r) for r in rows]),
+        "validated_batch": _measure(lambda: decode_many(Customer, rows)),
+        "trusted": _measure(
+            lambda: [construct_trusted(Customer, json.loads(r)) for r in rows]
+        ),
+        "view_unread": _measure(lambda: [CustomerView(r) for r in rows]),
+        "view_two_fields": _measure(
+            lambda: [_read_two_fields(CustomerView(r)) for r in rows]
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=10_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.customers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
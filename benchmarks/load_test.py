@@ -0,0 +1,247 @@
+"""Load-tests the streamable-HTTP FastMCP server with concurrent clients.
+
+Starts the server locally (or targets --url), then runs N async clients, each
+with its own MCP session, calling a weighted mix of the customer service tools
+for a fixed duration. Reports throughput, p50/p95/p99 latency and error rate
+overall and per tool, and writes them as JSON with the git revision so runs
+can be compared between versions.
+
+Usage:
+    PYTHONPATH=. python benchmarks/load_test.py [--clients 1 10 50]
+        [--duration 20] [--mix check_product_availability=5,modify_cart=1]
+        [--output load.json] [--baseline previous.json]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.batch_calls import PRODUCTS, start_server
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+
+PLANTS = ["Tomatoes", "Petunias", "Sunflowers", "vegetables", "roses"]
+CUSTOMERS = ["123", "456", "789", "1001"]
+DEPARTMENTS = [None, "tools", "seeds", "decor", "irrigation"]
+
+DEFAULT_MIX = {
+    "check_product_list": 2,
+    "get_product_recommendations": 2,
+    "check_product_availability": 4,
+    "access_cart_information": 1,
+    "modify_cart": 1,
+}
+
+# Builds random arguments for each tool.
+ARGUMENTS: Dict[str, Callable[[random.Random], Dict]] = {
+    "check_product_list": lambda rng: {"department": rng.choice(DEPARTMENTS)},
+    "get_product_recommendations": lambda rng: {
+        "plant_type": rng.choice(PLANTS),
+        "customer_id": rng.choice(CUSTOMERS),
+    },
+    "check_product_availability": lambda rng: {
+        "product_id": rng.choice(PRODUCTS),
+        "store_id": "london",
+    },
+    "access_cart_information": lambda rng: {"customer_id": rng.choice(CUSTOMERS)},
+    "modify_cart": lambda rng: {
+        "customer_id": rng.choice(CUSTOMERS),
+        "items_to_add": [{"product_id": rng.choice(PRODUCTS), "quantity": 1}],
+        "items_to_remove": [],
+    },
+}
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, float]:
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ARGUMENTS:
+            raise SystemExit(f"Unknown tool in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def quantile(samples: List[float], q: float) -> Optional[float]:
+    """Nearest-rank quantile of sorted samples."""
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))]
+
+
+def summarise(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    latencies = sorted(latencies)
+    requests = len(latencies) + errors
+
+    def ms(q):
+        value = quantile(latencies, q)
+        return None if value is None else round(value * 1e3, 2)
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": ms(0.5),
+        "p95_ms": ms(0.95),
+        "p99_ms": ms(0.99),
+    }
+
+
+class Level:
+    """Shared state of the clients of one load level."""
+
+    def __init__(self, clients: int, mix: Dict[str, float]):
+        self.clients = clients
+        self.mix = mix
+        self.connected = 0
+        self.all_connected = asyncio.Event()
+        self.go = asyncio.Event()
+        self.deadline = 0.0
+        self.latencies: Dict[str, List[float]] = {name: [] for name in mix}
+        self.errors: Dict[str, int] = {name: 0 for name in mix}
+
+
+async def client_loop(url: str, level: Level, seed: int) -> None:
+    rng = random.Random(seed)
+    names, weights = list(level.mix), list(level.mix.values())
+    async with CustomerServicesMCPClient(url) as client:
+        # Sessions are set up before the clock starts.
+        level.connected += 1
+        if level.connected == level.clients:
+            level.all_connected.set()
+        await level.go.wait()
+        while time.monotonic() < level.deadline:
+            name = rng.choices(names, weights)[0]
+            arguments = {k: v for k, v in ARGUMENTS[name](rng).items() if v is not None}
+            start = time.perf_counter()
+            try:
+                await client.client.call_tool(name, arguments)
+            except Exception:
+                level.errors[name] += 1
+            else:
+                level.latencies[name].append(time.perf_counter() - start)
+
+
+async def run_level(url: str, clients: int, duration: float, mix: Dict) -> Dict:
+    level = Level(clients, mix)
+    tasks = [
+        asyncio.create_task(client_loop(url, level, seed)) for seed in range(clients)
+    ]
+    connecting = asyncio.create_task(level.all_connected.wait())
+    # Go once every client is connected, or with the survivors if some fail.
+    await asyncio.wait([connecting, *tasks], return_when=asyncio.FIRST_COMPLETED)
+    if not connecting.done():
+        await asyncio.wait([connecting], timeout=5)
+    connecting.cancel()
+    start = time.monotonic()
+    level.deadline = start + duration
+    level.go.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.monotonic() - start
+    failed = [r for r in results if isinstance(r, BaseException)]
+    return {
+        "clients": clients,
+        "failed_clients": len(failed),
+        "client_errors": sorted({repr(e) for e in failed})[:5],
+        "elapsed_secs": round(elapsed, 2),
+        "overall": summarise(
+            [x for samples in level.latencies.values() for x in samples],
+            sum(level.errors.values()),
+            elapsed,
+        ),
+        "tools": {
+            name: summarise(level.latencies[name], level.errors[name], elapsed)
+            for name in mix
+        },
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict, baseline: Dict) -> List[Dict]:
+    """Per client level changes in throughput and p99 against a baseline."""
+    previous = {level["clients"]: level["overall"] for level in baseline["levels"]}
+    changes = []
+    for level in report["levels"]:
+        before = previous.get(level["clients"])
+        if before is None:
+            continue
+        after = level["overall"]
+        changes.append(
+            {
+                "clients": level["clients"],
+                "throughput_rps": [before["throughput_rps"], after["throughput_rps"]],
+                "p99_ms": [before["p99_ms"], after["p99_ms"]],
+                "error_rate": [before["error_rate"], after["error_rate"]],
+            }
+        )
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--mix", default=None, help="tool=weight,... (default mix)")
+    parser.add_argument("--url", default=None, help="Target a running server")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", default=None, help="Write the report here")
+    parser.add_argument("--baseline", default=None, help="Report to compare with")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    server = None if args.url else start_server(args.port)
+    url = args.url or f"http://127.0.0.1:{args.port}/mcp"
+    try:
+        levels = [
+            asyncio.run(run_level(url, clients, args.duration, mix))
+            for clients in args.clients
+        ]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "url": url,
+        "duration_secs": args.duration,
+        "mix": mix,
+        "levels": levels,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline_revision"] = baseline.get("revision")
+        report["changes"] = compare(report, baseline)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compares reading the running purchase analytics with rescanning the history.
+
+For customers with growing purchase histories, times
+CustomerRepository.get_analytics() (one row read), rebuilding the same
+aggregate by paging through every stored purchase, and add_purchase(), which
+updates the aggregate incrementally.
+
+Usage:
+    PYTHONPATH=. python benchmarks/purchase_analytics.py [--orders 10 1000 10000]
+"""
+
+import argparse
+import json
+import time
+from typing import Dict
+
+from app.agent.entities.analytics import PurchaseAnalytics
+from app.agent.entities.customer import Purchase
+from app.agent.entities.repository import MAX_PAGE_SIZE, CustomerRepository, split_record
+from benchmarks.purchase_history import customer_record
+
+
+def rescan(repository: CustomerRepository, customer_id: str) -> PurchaseAnalytics:
+    analytics = PurchaseAnalytics(customer_id=customer_id)
+    cursor = None
+    while True:
+        purchases, cursor = repository.get_purchases(customer_id, cursor, MAX_PAGE_SIZE)
+        for purchase in purchases:
+            analytics.add(purchase, earn_points=False)
+        if cursor is None:
+            return analytics
+
+
+def _time_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) / repeat * 1e6, 1)
+
+
+def run(orders: int) -> Dict:
+    repository = CustomerRepository()
+    customer, purchases = split_record(customer_record(orders))
+    repository.upsert(customer, purchases)
+    customer_id = customer.customer_id
+    new_purchase = Purchase(date="2099-01-01", items=purchases[0].items, total_amount=10)
+
+    return {
+        "orders": orders,
+        "get_analytics_us": _time_us(lambda: repository.get_analytics(customer_id), 200),
+        "report_us": _time_us(
+            lambda: repository.get_analytics(customer_id).report(), 200
+        ),
+        "rescan_us": _time_us(lambda: rescan(repository, customer_id), 3),
+        "add_purchase_us": _time_us(
+            lambda: repository.add_purchase(customer_id, new_purchase), 20
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[10, 1000, 10000])
+    args = parser.parse_args()
+    print(json.dumps([run(orders) for orders in args.orders], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compares eager purchase histories with the purchase summary profile.
+
+For customers with thousands of orders, measures the memory held by the
+profile object, the size of the profile JSON put into session state and
+prompts, and the time to parse and serialise it, for an eager profile that
+embeds every order versus the Customer profile that carries a summary.
+
+Usage:
+    PYTHONPATH=. python benchmarks/purchase_history.py [--orders 1000 5000]
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Dict, List
+
+from app.agent.entities.customer import Customer, Purchase
+from app.agent.entities.repository import (
+    DEFAULT_FIXTURE,
+    CustomerRepository,
+    split_record,
+)
+
+PRODUCTS = [
+    ("seed-101", "Tomato Seeds - Cherry"),
+    ("seed-102", "Sunflower Seeds - Giant"),
+    ("tool-001", "Hand Trowel"),
+    ("soil-456", "Bloom Booster Potting Mix"),
+    ("decor-201", "Terracotta Planter - Large"),
+    ("irrig-301", "Soaker Hose - 25ft"),
+]
+
+
+class EagerCustomer(Customer):
+    """The profile shape before summaries: every order embedded."""
+
+    purchase_history: List[Purchase]
+
+
+def customer_record(orders: int, seed: int = 3) -> Dict:
+    rng = random.Random(seed)
+    with open(DEFAULT_FIXTURE) as f:
+        record = json.load(f)[0]
+    history = []
+    for i in range(orders):
+        items = [
+            {"product_id": pid, "name": name, "quantity": rng.randint(1, 4)}
+            for pid, name in rng.sample(PRODUCTS, rng.randint(1, 3))
+        ]
+        history.append(
+            {
+                "date": f"{2010 + i // 365:04d}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                "items": items,
+                "total_amount": round(rng.uniform(5, 120), 2),
+            }
+        )
+    record["purchase_history"] = history
+    return record
+
+
+def _measure(model, raw: str, repeat: int = 5) -> Dict:
+    tracemalloc.start()
+    obj = model.model_validate_json(raw)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        obj = model.model_validate_json(raw)
+    parse = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        profile = obj.to_json()
+    dump = (time.perf_counter() - start) / repeat
+    return {
+        "object_kib": round(held / 1024, 1),
+        "profile_json_kib": round(len(profile) / 1024, 1),
+        "parse_ms": round(parse * 1e3, 3),
+        "to_json_ms": round(dump * 1e3, 3),
+    }
+
+
+def run(orders: int) -> Dict:
+    record = customer_record(orders)
+    eager_raw = EagerCustomer.model_validate(record).model_dump_json()
+    customer, purchases = split_record(record)
+
+    repository = CustomerRepository()
+    repository.upsert(customer, purchases)
+    start = time.perf_counter()
+    repository.get_purchases(customer.customer_id)
+    first_page = time.perf_counter() - start
+
+    return {
+        "orders": orders,
+        "eager": _measure(EagerCustomer, eager_raw),
+        "summary": _measure(Customer, customer.model_dump_json()),
+        "first_page_ms": round(first_page * 1e3, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+    print(json.dumps([run(orders) for orders in args.orders], indent=2))
+
+
+if __name__ == "__main__":
+    main()
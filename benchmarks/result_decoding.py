@@ -0,0 +1,123 @@
+"""Measures client-side decoding of large check_product_list responses.
+
+For catalogs of increasing size, starts from the JSON-RPC response as it
+arrives and times, per response: the transport parsing the message, the old
+client path (fastmcp's call_tool validating the structured content against
+the output schema, then json.loads of the text in _parse_result), and
+mcp_server.results.decode reading only total_products, deferred and in
+strict mode, with and without structured content. A deferred text result
+that is read is decoded in full, like the old client; only an unread one
+is cheaper.
+
+Usage:
+    PYTHONPATH=. python benchmarks/result_decoding.py
+        [--products 100 1000 10000] [--repeat 50]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Dict
+
+from fastmcp import Client
+from fastmcp.utilities.json_schema_type import json_schema_to_type
+from fastmcp.utilities.types import get_cached_typeadapter
+from mcp import types as mcp_types
+
+from mcp_server.results import ProductList, decode
+
+
+def catalog(products: int) -> Dict:
+    return {
+        "department": "all",
+        "total_products": products,
+        "products": [
+            {
+                "product_id": f"prod-{i:05d}",
+                "name": f"Product {i}",
+                "description": "Rich, organic soil blend perfect for vegetables.",
+                "department": "soil",
+                "price": 10.99 + i % 7,
+                "in_stock": bool(i % 3),
+                "stock_quantity": i % 97,
+            }
+            for i in range(products)
+        ],
+    }
+
+
+def wire(payload: Dict, structured: bool) -> str:
+    return mcp_types.CallToolResult(
+        content=[mcp_types.TextContent(type="text", text=json.dumps(payload))],
+        structuredContent=payload if structured else None,
+    ).model_dump_json(by_alias=True, exclude_none=True)
+
+
+async def output_schema() -> Dict:
+    from mcp_server.fast_mcp_server import mcp
+
+    async with Client(mcp) as client:
+        tools = await client.list_tools()
+    return next(t.outputSchema for t in tools if t.name == "check_product_list")
+
+
+def _time(func: Callable[[], object], repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - start) / repeat * 1e6, 1)
+
+
+def run(products: int, repeat: int, schema: Dict) -> Dict:
+    adapter = get_cached_typeadapter(json_schema_to_type(schema)) if schema else None
+    with_structured = wire(catalog(products), structured=True)
+    text_only = wire(catalog(products), structured=False)
+    parse = mcp_types.CallToolResult.model_validate_json
+    parsed = parse(with_structured)
+    parsed_text = parse(text_only)
+
+    def old_client():
+        if adapter is not None:
+            adapter.validate_python(parsed.structuredContent)
+        return json.loads(parsed.content[0].text)["total_products"]
+
+    return {
+        "products": products,
+        "wire_kib": {
+            "structured": round(len(with_structured) / 1024, 1),
+            "text_only": round(len(text_only) / 1024, 1),
+        },
+        "transport_us": {
+            "structured": _time(lambda: parse(with_structured), repeat),
+            "text_only": _time(lambda: parse(text_only), repeat),
+        },
+        "decode_us": {
+            "old_client": _time(old_client, repeat),
+            "structured": _time(
+                lambda: decode(parsed, ProductList)["total_products"], repeat
+            ),
+            "deferred_text_unread": _time(lambda: decode(parsed_text, ProductList), repeat),
+            "deferred_text_read": _time(
+                lambda: decode(parsed_text, ProductList)["total_products"], repeat
+            ),
+            "strict": _time(lambda: decode(parsed, ProductList, strict=True), repeat),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    schema = asyncio.run(output_schema())
+    results = [run(n, args.repeat, schema) for n in args.products]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Measures the cost of serialising and emitting MCP tool responses.
+
+For a small result (one availability check) and large ones (bulk availability
+of many products), times the old call_tool path, print() of the result plus
+stdlib json.dumps, against each serializer with the sampled debug logger, up
+to the JSON-RPC message the transport writes.
+
+Usage:
+    PYTHONPATH=. python benchmarks/serialization.py [--products 1 100 1000 10000]
+        [--repeat 200]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List
+
+from mcp import types as mcp_types
+
+from app.agent.tools.tools import check_product_availability
+from mcp_server.serialization import (
+    PydanticSerializer,
+    SampledLogger,
+    Serializer,
+    build_serializer,
+    tool_response,
+)
+
+PRODUCTS = ["tool-001", "seed-101", "decor-201", "irrig-301", "soil-456", "fert-789"]
+
+
+def make_result(products: int) -> Dict:
+    if products == 1:
+        return check_product_availability("seed-101", "london")
+    return {
+        "store": "london",
+        "results": [
+            check_product_availability(PRODUCTS[i % len(PRODUCTS)], "london")
+            for i in range(products)
+        ],
+    }
+
+
+def _wire(content, structured=None) -> str:
+    # What the transport serialises for the response.
+    return mcp_types.CallToolResult(
+        content=content, structuredContent=structured
+    ).model_dump_json(by_alias=True, exclude_none=True)
+
+
+def _time(func: Callable[[], str], repeat: int) -> Dict:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        wire = func()
+    return {
+        "us": round((time.perf_counter() - start) / repeat * 1e6, 1),
+        "wire_kib": round(len(wire) / 1024, 1),
+    }
+
+
+def run(products: int, repeat: int, devnull) -> Dict:
+    result = make_result(products)
+
+    def old_path() -> str:
+        print("result", result, file=devnull)
+        return _wire([mcp_types.TextContent(type="text", text=json.dumps(result))])
+
+    timings = {"print_and_json": _time(old_path, repeat)}
+    serializers: List[Serializer] = [Serializer(), PydanticSerializer()]
+    if build_serializer("auto").name == "orjson":
+        serializers.append(build_serializer("orjson"))
+    result_log = SampledLogger(logging.getLogger("benchmarks.results"))
+    for serializer in serializers:
+
+        def new_path() -> str:
+            content, structured = tool_response(result, serializer)
+            result_log.debug("Tool %s returned %s", "bench", content[0].text)
+            return _wire(content, structured)
+
+        def text_only() -> str:
+            return _wire(tool_response(result, serializer)[0])
+
+        timings[serializer.name] = _time(new_path, repeat)
+        timings[f"{serializer.name}_text_only"] = _time(text_only, repeat)
+    return {"products": products, **timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--products", type=int, nargs="+", default=[1, 100, 1000, 10000]
+    )
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with open(os.devnull, "w") as devnull:
+        results = [
+            run(n, max(1, args.repeat // max(1, n // 100)), devnull)
+            for n in args.products
+        ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Compares session stores: event append throughput and session load time.
+
+Appends turns of a user message, two tool calls with their responses and an
+answer (6 events) to a few sessions, then loads sessions of each length, with
+the SQLite session service (batched, and with a write per event), ADK's
+SQLAlchemy DatabaseSessionService on SQLite, and ADK's in-memory service.
+Compaction is off, so every session keeps all its events.
+
+Usage:
+    PYTHONPATH=. python benchmarks/sessions.py [--events 100 500]
+        [--sessions 4] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from google.adk.events import Event
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    InMemorySessionService,
+)
+from google.genai import types
+
+from app.agent.shared_libraries.sessions import SqliteSessionService
+
+APP = "customer_services_app"
+
+
+def _event(author: str, part: types.Part) -> Event:
+    role = "model" if author != "user" or part.function_response else "user"
+    return Event(
+        invocation_id="bench",
+        author=author,
+        content=types.Content(role=role, parts=[part]),
+    )
+
+
+def turn(i: int) -> List[Event]:
+    events = [_event("user", types.Part(text=f"Do you have tomato seeds? ({i})"))]
+    for name in ("check_product_list", "check_product_availability"):
+        events.append(
+            _event(
+                "root_agent",
+                types.Part(
+                    function_call=types.FunctionCall(
+                        name=name, args={"product_id": "seed-101", "store_id": "london"}
+                    )
+                ),
+            )
+        )
+        events.append(
+            _event(
+                "root_agent",
+                types.Part(
+                    function_response=types.FunctionResponse(
+                        name=name,
+                        response={
+                            "product_id": "seed-101",
+                            "available": True,
+                            "quantity": 42,
+                            "store": "london",
+                        },
+                    )
+                ),
+            )
+        )
+    events.append(_event("root_agent", types.Part(text="Yes, 42 packs in London.")))
+    return events
+
+
+async def bench(
+    service: BaseSessionService, events: int, sessions: int, repeat: int
+) -> Dict:
+    created = [
+        await service.create_session(
+            app_name=APP, user_id="u1", state={"customer_id": "123"}
+        )
+        for _ in range(sessions)
+    ]
+    turns = [turn(i) for i in range(events // 6)]
+    start = time.perf_counter()
+    for turn_events in turns:
+        for session in created:
+            for event in turn_events:
+                await service.append_event(session, event.model_copy())
+    if isinstance(service, SqliteSessionService):
+        await service.flush()
+    appended = len(turns) * 6 * sessions
+    append_secs = time.perf_counter() - start
+
+    loads = []
+    for i in range(repeat):
+        session = created[i % sessions]
+        start = time.perf_counter()
+        loaded = await service.get_session(
+            app_name=APP, user_id="u1", session_id=session.id
+        )
+        loads.append(time.perf_counter() - start)
+        assert len(loaded.events) == len(turns) * 6
+    return {
+        "events_per_session": len(turns) * 6,
+        "appends_per_sec": round(appended / append_secs),
+        "load_ms": round(statistics.median(loads) * 1e3, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores: Dict[str, Callable[[str], BaseSessionService]] = {
+            "sqlite_batched": lambda path: SqliteSessionService(
+                path, compact_after_events=None
+            ),
+            "sqlite_per_event": lambda path: SqliteSessionService(
+                path, batch_size=1, compact_after_events=None
+            ),
+            "adk_database": lambda path: DatabaseSessionService(f"sqlite:///{path}"),
+            "adk_in_memory": lambda path: InMemorySessionService(),
+        }
+        results = []
+        for events in args.events:
+            for name, factory in stores.items():
+                path = os.path.join(tmp, f"{name}-{events}.db")
+                service = factory(path)
+                result = asyncio.run(bench(service, events, args.sessions, args.repeat))
+                results.append({"store": name, **result})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
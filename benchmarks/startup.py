@@ -0,0 +1,125 @@
+"""Profiles cold-start import time and fails when a module is over budget.
+
+Imports each module in a fresh interpreter with -X importtime, and reports
+its total import time with the packages that took longest, counting each
+module's own time towards its package (google.adk, pydantic, app.agent.tools,
+...). Exits with status 1 if a module's import time is over its budget.
+
+Budgets are per module (BUDGETS_MS). The cheap modules must not pull in
+google.adk, which alone takes seconds, and the agent's budget leaves room for
+it on a slow machine.
+
+Usage:
+    PYTHONPATH=. python benchmarks/startup.py [--module app.agent.config ...]
+        [--budget-ms 500] [--top 10] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+BUDGETS_MS: Dict[str, float] = {
+    "app.agent": 50,
+    "app.agent.config": 500,
+    "app.agent.entities.repository": 750,
+    "app.agent.tools.tools": 1000,
+    "app.agent.agent": 10_000,
+}
+
+# "import time: self [us] | cumulative | imported package", with the
+# package indented by its nesting depth.
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def package(module: str) -> str:
+    """Groups a module with its package, for google.* and app.* one level
+    deeper, e.g. google.adk.agents -> google.adk."""
+    parts = module.split(".")
+    depth = 3 if parts[0] == "app" else 2 if parts[0] == "google" else 1
+    return ".".join(parts[:depth])
+
+
+def profile(module: str) -> Dict:
+    """
+    Imports module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: The module to import.
+
+    Returns:
+        The import time of module, and the own time per package of everything
+        imported, interpreter startup included, in ms.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    by_package: Dict[str, int] = defaultdict(int)
+    for line in process.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, name = match.groups()
+        by_package[package(name)] += int(own)
+        # Everything imported for module is nested under it.
+        if name == module and not indent:
+            total_us = int(cumulative)
+    return {
+        "total_ms": total_us / 1e3,
+        "packages_ms": {name: us / 1e3 for name, us in by_package.items()},
+    }
+
+
+def run(module: str, budget_ms: Optional[float], top: int, repeat: int) -> Dict:
+    # The fastest of a few runs, so a busy machine doesn't fail the budget.
+    best = min((profile(module) for _ in range(repeat)), key=lambda p: p["total_ms"])
+    packages = sorted(best["packages_ms"].items(), key=lambda item: -item[1])
+    return {
+        "module": module,
+        "total_ms": round(best["total_ms"], 1),
+        "budget_ms": budget_ms,
+        "over_budget": budget_ms is not None and best["total_ms"] > budget_ms,
+        "top_packages_ms": {name: round(ms, 1) for name, ms in packages[:top]},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", nargs="+", default=list(BUDGETS_MS))
+    parser.add_argument(
+        "--budget-ms", type=float, help="Budget for every module, instead of BUDGETS_MS"
+    )
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    # Compile everything first, so the runs time imports and not compilation.
+    profile(args.module[0])
+    results = [
+        run(
+            module,
+            args.budget_ms if args.budget_ms is not None else BUDGETS_MS.get(module),
+            args.top,
+            args.repeat,
+        )
+        for module in args.module
+    ]
+    print(json.dumps(results, indent=2))
+    over = [result["module"] for result in results if result["over_budget"]]
+    if over:
+        print(f"Over the import time budget: {', '.join(over)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Compares inline and streamed stream_call responses as they grow.
+
+For bulk availability checks of increasing size, measures on the server the
+time until the first bytes are ready to send and the peak memory allocated
+while answering, once with every item built and serialised into one response
+and once streamed as chunked progress notifications.
+
+Usage:
+    PYTHONPATH=. python benchmarks/streaming.py [--products 100 1000 10000]
+        [--chunk-size 50]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+import tracemalloc
+from typing import Dict
+
+from mcp_server.executor import ToolExecutor
+from mcp_server.streaming import stream_call
+
+PRODUCTS = ["tool-001", "seed-101", "decor-201", "irrig-301", "soil-456", "fert-789"]
+
+
+async def _measure(executor: ToolExecutor, args: Dict, chunk_size: int, stream: bool):
+    first = None
+
+    async def send(progress: float, message: str) -> None:
+        nonlocal first
+        if first is None:
+            first = time.perf_counter()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await stream_call(
+        executor,
+        "check_product_availability",
+        args,
+        chunk_size,
+        send if stream else None,
+    )
+    # The inline response is serialised whole before anything is sent.
+    body = json.dumps(result)
+    done = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "first_bytes_ms": round(((first or done) - start) * 1e3, 2),
+        "total_ms": round((done - start) * 1e3, 2),
+        "peak_kib": round(peak / 1024, 1),
+        "response_kib": round(len(body) / 1024, 1),
+    }
+
+
+async def run(products: int, chunk_size: int) -> Dict:
+    executor = ToolExecutor(thread_workers=2)
+    args = {
+        "product_ids": [PRODUCTS[i % len(PRODUCTS)] for i in range(products)],
+        "store_id": "london",
+    }
+    try:
+        await _measure(executor, {**args, "product_ids": PRODUCTS}, chunk_size, True)
+        return {
+            "products": products,
+            "inline": await _measure(executor, args, chunk_size, False),
+            "streamed": await _measure(executor, args, chunk_size, True),
+        }
+    finally:
+        executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--chunk-size", type=int, default=50)
+    args = parser.parse_args()
+    # The availability tool logs every product.
+    logging.disable(logging.INFO)
+    results = [asyncio.run(run(n, args.chunk_size)) for n in args.products]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
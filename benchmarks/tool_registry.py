@@ -0,0 +1,91 @@
+"""Benchmarks the shared tool registry against per-request tool wrapping.
+
+Times startup (wrapping the tools and building declarations and MCP
+schemas), an MCP list_tools request, the declarations added to every model
+request, and dispatching one tool call. Each is measured the way the code
+did it before the registry and through the registry.
+
+Usage:
+    PYTHONPATH=. python benchmarks/tool_registry.py [--repeat 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Dict
+
+from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.mcp_tool.conversion_utils import adk_to_mcp_tool_type
+
+from app.agent.tools.registry import ToolRegistry, registry
+
+FUNCTIONS = registry.functions
+CALL = ("check_product_availability", {"product_id": "seed-101", "store_id": "london"})
+
+
+def _us(fn: Callable[[], object], repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) / repeat * 1e6, 1)
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    loop = asyncio.new_event_loop()
+    wrapped = [FunctionTool(f) for f in FUNCTIONS]
+
+    def before_dispatch():
+        # server.py built its name -> tool dict inside every call_tool.
+        tools = {tool.name: tool for tool in wrapped}
+        name, args = CALL
+        return loop.run_until_complete(
+            tools[name].run_async(args=args, tool_context=None)
+        )
+
+    def after_dispatch():
+        name, args = CALL
+        return loop.run_until_complete(registry.call(name, args))
+
+    def new_registry():
+        ToolRegistry(FUNCTIONS).mcp_tools()
+
+    try:
+        return {
+            "startup_us": {
+                "before": _us(
+                    lambda: [FunctionTool(f) for f in FUNCTIONS], repeat // 20
+                ),
+                "registry": _us(new_registry, repeat // 20),
+            },
+            "list_tools_us": {
+                "before": _us(
+                    lambda: [adk_to_mcp_tool_type(t) for t in wrapped], repeat // 10
+                ),
+                "registry": _us(registry.mcp_tools, repeat),
+            },
+            "declarations_per_model_request_us": {
+                "before": _us(
+                    lambda: [t._get_declaration() for t in wrapped], repeat // 10
+                ),
+                "registry": _us(registry.declarations, repeat),
+            },
+            "dispatch_us": {
+                "before": _us(before_dispatch, repeat),
+                "registry": _us(after_dispatch, repeat),
+            },
+        }
+    finally:
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
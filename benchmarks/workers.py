@@ -0,0 +1,131 @@
+"""Compares the API server's throughput with 1 and N worker processes.
+
+Starts deploy/workers.py in a subprocess for each worker count and, at each
+concurrency level, has that many clients alternate health checks and session
+creation for a fixed duration. Reports requests/sec, p50/p99 latency and the
+workers' memory: their proportional set size (PSS) counts pages shared
+copy-on-write with the supervisor once, across all processes.
+
+Model calls are not made, so the numbers measure the server rather than the
+LLM; on a machine with one CPU, more workers cannot be faster.
+
+Usage:
+    PYTHONPATH=. python benchmarks/workers.py [--workers 1 4]
+        [--concurrency 10 50] [--duration 5] [--port 8768]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import quantile
+
+WORKERS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "deploy/workers.py")
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, WORKERS, "--workers", str(workers), "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("API server did not start")
+
+
+def memory_mb(pid: int) -> Dict:
+    """Returns the RSS and PSS of the workers forked by pid."""
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        children = [int(child) for child in f.read().split()]
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0}
+    for child in children:
+        with open(f"/proc/{child}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    totals[f"{name.lower()}_mb"] += int(value.split()[0]) / 1024
+    return {name: round(value, 1) for name, value in totals.items()}
+
+
+async def drive(url: str, concurrency: int, duration: float) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client(seed: int, http: httpx.AsyncClient) -> None:
+        nonlocal errors
+        i = seed
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                if i % 2:
+                    response = await http.post(f"/apps/agent/users/u{i}/sessions")
+                else:
+                    response = await http.get("/health")
+                response.raise_for_status()
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+            i += concurrency
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as http:
+        start = time.monotonic()
+        await asyncio.gather(*(client(seed, http) for seed in range(concurrency)))
+        elapsed = time.monotonic() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+        "p50_ms": round(quantile(latencies, 0.5) * 1e3, 2) if latencies else None,
+        "p99_ms": round(quantile(latencies, 0.99) * 1e3, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1]
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    url = f"http://127.0.0.1:{args.port}"
+    results = []
+    for workers in dict.fromkeys(args.workers):
+        server = start_server(workers, args.port)
+        try:
+            runs = [
+                asyncio.run(drive(url, concurrency, args.duration))
+                for concurrency in args.concurrency
+            ]
+            results.append({"workers": workers, **memory_mb(server.pid), "runs": runs})
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,10 @@ import logging
 import sys
 import time
 
-import vertexai
-from vertexai import agent_engines
 from google.api_core.exceptions import NotFound
 
 
 from app.agent.config import Config
-from app.agent.agent import root_agent
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -23,6 +20,10 @@ STAGING_BUCKET = f"gs://{configs.STAGING_BUCKET}"
 
 def init_vertexai():
     """Initialize Vertex AI with project configuration."""
+    # vertexai and the agent take seconds to import, so they are only
+    # imported once an action needs them; --help returns at once.
+    import vertexai
+
     vertexai.init(
         project=configs.CLOUD_PROJECT,
         location=configs.CLOUD_LOCATION,
@@ -34,6 +35,9 @@ def init_vertexai():
 def deploy_agent() -> str:
     """Deploy the agent and return the resource name."""
     logger.info("Starting agent deployment...")
+    from vertexai import agent_engines
+
+    from app.agent.agent import root_agent
 
     try:
         app = agent_engines.AdkApp(
@@ -49,6 +53,7 @@ def deploy_agent() -> str:
                 "pydantic>=2.11.9",
                 "pydantic-settings>=2.10.1",
                 "cloudpickle>=3.1.1",
+                "numpy>=2.3.3",
             ],
             extra_packages=["./app/agent"],
         )
@@ -71,6 +76,7 @@ def deploy_agent() -> str:
 def delete_agent(resource_name: str) -> bool:
     """Delete a deployed agent."""
     logger.info(f"Attempting to delete agent: {resource_name}")
+    from vertexai import agent_engines
 
     try:
         # First check if the agent exists
@@ -98,6 +104,7 @@ def delete_agent(resource_name: str) -> bool:
 async def test_agent(resource_name: str) -> bool:
     """Test a deployed agent with sample queries."""
     logger.info(f"Testing agent: {resource_name}")
+    from vertexai import agent_engines
 
     try:
         # Get the agent instance
@@ -168,6 +175,7 @@ async def test_agent(resource_name: str) -> bool:
 def list_agents():
     """List all deployed agents in the project."""
     logger.info("Listing deployed agents...")
+    from vertexai import agent_engines
 
     try:
         # List all agent engines in the project
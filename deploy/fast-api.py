@@ -1,18 +1,57 @@
 import os
+import sys
 from google.adk.cli.fast_api import get_fast_api_app
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService, InMemorySessionService
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 DEPLOY_DIR = os.path.dirname(os.path.abspath(__file__))
 AGENT_DIR = os.path.join(os.path.dirname(DEPLOY_DIR), "app")
 
-print("AGENT_DIR===", AGENT_DIR)
+# The ADK agent loader imports the agent package as ``agent`` from AGENT_DIR.
+# Import through the same name so we share its module state (e.g. metrics).
+if AGENT_DIR not in sys.path:
+    sys.path.insert(0, AGENT_DIR)
 
-app: FastAPI = get_fast_api_app(
-    agents_dir=AGENT_DIR,
-    web=True,
-    trace_to_cloud=True,
+from agent.agent import root_agent  # noqa: E402
+from agent.config import Config  # noqa: E402
+from agent.shared_libraries.chat import chat_router  # noqa: E402
+from agent.shared_libraries.metrics import metrics  # noqa: E402
+from agent.shared_libraries.sessions import (  # noqa: E402
+    SqliteSessionService,
+    default_session_service,
+    session_lifespan,
 )
 
+print("AGENT_DIR===", AGENT_DIR)
+
+# One session service for ADK's endpoints and /chat. Sessions are stored in
+# SQLite, so they survive restarts and are shared by the workers of
+# deploy/workers.py, unless another database is configured.
+configs = Config()
+if configs.server_settings.session_service_uri:
+    session_service = DatabaseSessionService(
+        db_url=configs.server_settings.session_service_uri
+    )
+elif configs.session_store_settings.db_path:
+    session_service = SqliteSessionService.from_config()
+else:
+    session_service = InMemorySessionService()
+
+with default_session_service(session_service):
+    app: FastAPI = get_fast_api_app(
+        agents_dir=AGENT_DIR,
+        web=True,
+        trace_to_cloud=True,
+        # Buffered session events are written when a worker stops.
+        lifespan=session_lifespan(session_service),
+    )
+
+# ADK's endpoints name the app after the agent's directory.
+runner = Runner(app_name="agent", agent=root_agent, session_service=session_service)
+app.include_router(chat_router(runner))
+
 app.title = "customer-services-agent"
 app.description = "API for interacting with the customer services Agent."
 
@@ -27,6 +66,20 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics_endpoint(format: str = "prometheus"):
+    """Tool and callback latency, call, error and payload metrics.
+
+    Returns the Prometheus text format by default, or a JSON snapshot
+    with ``?format=json``.
+    """
+    if format == "json":
+        return JSONResponse(metrics.snapshot())
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,405 @@
+"""Serves the customer services API from several pre-forked worker processes.
+
+The supervisor loads the app of deploy/fast-api.py, with the agent, tool
+declarations and customer segment index, then forks the workers. Workers
+start at once and share those pages copy-on-write, instead of each importing
+everything again. Each worker runs uvicorn on the one listening socket.
+
+A worker is replaced when it exits, including after max_requests requests.
+On SIGHUP every worker is recycled: replacements start before the old
+workers stop, and the old ones finish their requests first. SIGTERM or
+SIGINT stops all workers gracefully.
+
+Each worker keeps its own in-process state. The state that matters across
+workers, and how it is shared, is described in the README (Production
+server).
+
+Usage:
+    python deploy/workers.py [--workers N] [--host 0.0.0.0] [--port 8080]
+"""
+
+import argparse
+import gc
+import importlib
+import importlib.util
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+DEPLOY_DIR = os.path.dirname(os.path.abspath(__file__))
+FAST_API_APP = os.path.join(DEPLOY_DIR, "fast-api.py")
+
+# A worker that exits this soon after starting has probably failed to start;
+# it is replaced after a delay rather than at once.
+MIN_WORKER_LIFETIME_SECS = 1.0
+
+
+def load_app(path: str = FAST_API_APP) -> Any:
+    """
+    Loads the FastAPI app in path and everything the workers will share.
+
+    fast-api.py imports the agent package as "agent", like ADK's agent loader,
+    so the agent served is the one loaded here. The segment index is built.
+    The SQLite stores, sessions included, are closed afterwards, as forked
+    workers must not share connections; each worker opens its own on first
+    use.
+
+    Args:
+        path: The module defining app.
+
+    Returns:
+        The app.
+    """
+    spec = importlib.util.spec_from_file_location("fast_api", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    importlib.import_module("agent.entities.segments").get_segment_index()
+    importlib.import_module("agent.entities.repository").close_repository()
+    importlib.import_module("agent.entities.carts").close_cart_store()
+    sessions = importlib.import_module("agent.shared_libraries.sessions")
+    if isinstance(module.session_service, sessions.SqliteSessionService):
+        module.session_service.close()
+    return module.app
+
+
+def split_scheduler_limits(
+    workers: int, slot: int = 0, scheduler: Any = None, settings: Any = None
+) -> None:
+    """
+    Gives this worker its share of the LLM scheduler's concurrency and RPM
+    limits, so that all workers together keep to the configured ones.
+
+    The shares are of the configured limits, not the scheduler's current
+    ones, so splitting again doesn't shrink them further. The remainder of
+    a limit goes to the lowest slots, one each, so the shares add up to the
+    limit.
+
+    Args:
+        workers: The number of workers, at most the smaller of the limits
+            (see scheduler_worker_cap).
+        slot: This worker's slot, 0 to workers - 1.
+        scheduler: The scheduler; the served agent's when None.
+        settings: The SchedulerModel with the limits; Config().scheduler_settings
+            when None.
+    """
+    if scheduler is None:
+        scheduler = importlib.import_module("agent.agent").scheduler
+    if settings is None:
+        settings = importlib.import_module("agent.config").Config().scheduler_settings
+    scheduler.max_concurrency = _share(settings.max_concurrency, workers, slot)
+    scheduler.rpm = _share(settings.rpm, workers, slot)
+
+
+def scheduler_worker_cap(settings: Any) -> int:
+    """The most workers the scheduler limits can be split between, so that
+    every worker may send at least one request."""
+    return max(1, min(settings.max_concurrency, settings.rpm))
+
+
+def _share(limit: int, workers: int, slot: int) -> int:
+    share, remainder = divmod(limit, workers)
+    return share + (1 if slot < remainder else 0)
+
+
+class Supervisor:
+    """
+    Runs an ASGI app on a fixed number of forked uvicorn workers sharing one
+    listening socket, and keeps that many running.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        workers: int = 2,
+        limit_concurrency: Optional[int] = None,
+        backlog: int = 2048,
+        max_requests: Optional[int] = None,
+        max_requests_jitter: int = 0,
+        graceful_timeout: float = 30.0,
+        after_fork: Sequence[Callable[[int], None]] = (),
+    ):
+        """
+        Args:
+            app: The ASGI app, loaded before the workers are forked.
+            host: The address to listen on.
+            port: The port to listen on.
+            workers: The number of worker processes; 0 for one per CPU.
+            limit_concurrency: Connections per worker before it answers 503.
+            backlog: The listen backlog shared by the workers.
+            max_requests: Requests a worker serves before it is replaced,
+                plus a random 0..max_requests_jitter; None for no limit.
+            graceful_timeout: Seconds a stopping worker has to finish its
+                requests before it is killed.
+            after_fork: Called in each worker before it starts serving, with
+                the worker's slot: 0 to workers - 1, reused by replacements.
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.limit_concurrency = limit_concurrency
+        self.backlog = backlog
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.after_fork = list(after_fork)
+        # Serving workers, and workers asked to stop, by pid.
+        self._workers: Dict[int, float] = {}
+        self._slots: Dict[int, int] = {}
+        self._retiring: Dict[int, float] = {}
+        self._stopping = False
+        self._recycle = False
+        self._respawn_at = 0.0
+        self.spawned = 0
+
+    @classmethod
+    def from_config(cls, app: Any, **kwargs: Any) -> "Supervisor":
+        """Builds a supervisor from Config().server_settings."""
+        from agent.config import Config
+
+        settings = Config().server_settings
+        options = dict(
+            host=settings.host,
+            port=settings.port,
+            workers=settings.workers,
+            limit_concurrency=settings.limit_concurrency,
+            backlog=settings.backlog,
+            max_requests=settings.max_requests,
+            max_requests_jitter=settings.max_requests_jitter,
+            graceful_timeout=settings.graceful_timeout_secs,
+        )
+        options.update(kwargs)
+        # The limits are split by the number of workers actually started,
+        # overrides included.
+        workers = options["workers"] = options["workers"] or os.cpu_count() or 1
+        after_fork = list(options.pop("after_fork", ()))
+        if settings.split_scheduler_limits and workers > 1:
+            cap = scheduler_worker_cap(Config().scheduler_settings)
+            if workers > cap:
+                logger.warning(
+                    "Starting %i workers instead of %i: the scheduler limits "
+                    "allow one request each at most",
+                    cap,
+                    workers,
+                )
+                workers = options["workers"] = cap
+            if workers > 1:
+                after_fork.append(lambda slot: split_scheduler_limits(workers, slot))
+        return cls(app, after_fork=after_fork, **options)
+
+    def run(self) -> None:
+        """Serves until SIGTERM or SIGINT, then stops the workers."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+
+        previous = {
+            sig: signal.signal(sig, handler)
+            for sig, handler in (
+                (signal.SIGTERM, self._on_stop),
+                (signal.SIGINT, self._on_stop),
+                (signal.SIGHUP, self._on_recycle),
+            )
+        }
+        # Objects loaded so far are never collected, so the collector
+        # doesn't write to, and un-share, their pages in the workers.
+        gc.collect()
+        gc.freeze()
+        logger.info(
+            "Serving on %s:%i with %i workers", self.host, self.port, self.workers
+        )
+        try:
+            while not self._stopping:
+                self._reap()
+                if self._recycle:
+                    self._recycle = False
+                    self._retire(list(self._workers))
+                self._kill_overdue()
+                while (
+                    len(self._workers) < self.workers
+                    and time.monotonic() >= self._respawn_at
+                    and not self._stopping
+                ):
+                    self._spawn(sock)
+                time.sleep(0.05)
+        finally:
+            self._retire(list(self._workers))
+            while self._retiring:
+                self._reap()
+                self._kill_overdue()
+                time.sleep(0.05)
+            sock.close()
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            logger.info("All workers stopped")
+
+    def pids(self) -> List[int]:
+        return list(self._workers)
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _on_recycle(self, signum, frame) -> None:
+        self._recycle = True
+
+    def _spawn(self, sock: socket.socket) -> None:
+        taken = {self._slots[pid] for pid in self._workers}
+        slot = min(set(range(self.workers)) - taken)
+        pid = os.fork()
+        if pid:
+            self._workers[pid] = time.monotonic()
+            self._slots[pid] = slot
+            self.spawned += 1
+            return
+        # The worker. It must never return into the supervisor's loop.
+        status = 1
+        try:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            for hook in self.after_fork:
+                hook(slot)
+            self._serve(sock)
+            status = 0
+        except BaseException:
+            logger.exception("Worker %i failed", os.getpid())
+        finally:
+            os._exit(status)
+
+    def _serve(self, sock: socket.socket) -> None:
+        max_requests = self.max_requests
+        if max_requests is not None and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        config = uvicorn.Config(
+            self.app,
+            limit_concurrency=self.limit_concurrency,
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        uvicorn.Server(config).run(sockets=[sock])
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            code = os.waitstatus_to_exitcode(status)
+            self._slots.pop(pid, None)
+            if self._retiring.pop(pid, None) is not None:
+                logger.info("Worker %i stopped", pid)
+                continue
+            started = self._workers.pop(pid, None)
+            if started is None:
+                continue
+            if code == 0:
+                # Served max_requests.
+                logger.info("Worker %i exited; replacing it", pid)
+            else:
+                logger.warning("Worker %i exited with %i; replacing it", pid, code)
+                if time.monotonic() - started < MIN_WORKER_LIFETIME_SECS:
+                    self._respawn_at = time.monotonic() + MIN_WORKER_LIFETIME_SECS
+
+    def _retire(self, pids: List[int]) -> None:
+        # Replacements are forked by the run loop while these finish.
+        for pid in pids:
+            self._workers.pop(pid, None)
+            self._retiring[pid] = time.monotonic() + self.graceful_timeout + 5
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in list(self._retiring.items()):
+            if now >= deadline:
+                logger.warning("Worker %i did not stop in time; killing it", pid)
+                self._retiring[pid] = float("inf")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+
+def check_shared_state(workers: int) -> None:
+    """
+    Checks the stores that each worker would keep to itself: carts must be
+    shared, the other stores are logged.
+
+    Args:
+        workers: The number of workers.
+
+    Raises:
+        ValueError: If several workers would each have their own carts.
+    """
+    from agent.config import Config
+
+    if workers < 2:
+        return
+    config = Config()
+    if config.cart_store_settings.db_path == ":memory:":
+        raise ValueError(
+            f"{workers} workers would each have their own carts; "
+            "set cart_store_settings.db_path to a file"
+        )
+    if config.customer_store_settings.db_path == ":memory:":
+        logger.warning(
+            "Purchases are only seen by the worker that recorded them; "
+            "set customer_store_settings.db_path"
+        )
+    session_db = config.session_store_settings.db_path
+    if config.server_settings.session_service_uri is None and session_db in (
+        None,
+        ":memory:",
+    ):
+        logger.warning(
+            "Sessions are kept by the worker that created them; "
+            "set session_store_settings.db_path"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = load_app()
+    overrides = {
+        name: value
+        for name, value in (
+            ("workers", args.workers),
+            ("host", args.host),
+            ("port", args.port),
+        )
+        if value is not None
+    }
+    supervisor = Supervisor.from_config(app, **overrides)
+    try:
+        check_shared_state(supervisor.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Measures how much history compaction shrinks the prompts of the eval conversations.
+
+Each eval case is replayed locally: the recorded tool calls are executed
+against the real tools to rebuild the function responses, and the history that
+would be sent on every model call is measured before and after compaction.
+Each request includes the customer context where ADK places it: before the
+last run of user contents, so after the function call in a tool round.
+
+Usage:
+    PYTHONPATH=. python eval/compaction_report.py [--token-budget 2000]
+"""
+
+import argparse
+import glob
+import json
+import os
+from typing import Dict, List
+
+from google.genai import types
+
+from app.agent.config import Config
+from app.agent.entities.carts import CartStore, set_cart_store
+from app.agent.entities.repository import get_repository
+from app.agent.prompts import CUSTOMER_CONTEXT
+from app.agent.shared_libraries.callbacks import ANONYMOUS_PROFILE
+from app.agent.shared_libraries.compaction import HistoryCompactor, estimate_tokens
+from app.agent.tools.registry import registry
+
+EVAL_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_data")
+
+TOOLS = {name: registry.get(name).func for name in registry}
+
+
+def _text(content: Dict) -> str:
+    return "".join(part.get("text") or "" for part in (content or {}).get("parts", []))
+
+
+def _customer_context(case: Dict) -> types.Content:
+    state = (case.get("session_input") or {}).get("state") or {}
+    customer_id = state.get("customer_id")
+    profile = get_repository().get_view(customer_id) if customer_id else None
+    text = CUSTOMER_CONTEXT.format(
+        customer_profile=profile.to_json() if profile else ANONYMOUS_PROFILE
+    )
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _with_context(
+    history: List[types.Content], context: types.Content
+) -> List[types.Content]:
+    """The request contents: history with the context inserted before the
+    last run of user contents, as ADK inserts its dynamic instruction."""
+    index = len(history)
+    while index and history[index - 1].role == "user":
+        index -= 1
+    return history[:index] + [context] + history[index:]
+
+
+def replay_case(case: Dict, compactor: HistoryCompactor) -> Dict[str, int]:
+    """
+    Replays one eval case and sums the prompt tokens of every model call.
+
+    Args:
+        case: An eval case from an eval set file.
+        compactor: The compactor to measure.
+
+    Returns:
+        The number of model calls and the raw and compacted token totals.
+    """
+    # Each case starts from fresh carts, and doesn't change the real ones.
+    store = CartStore(":memory:")
+    previous = set_cart_store(store)
+    try:
+        return _replay(case, compactor)
+    finally:
+        set_cart_store(previous)
+        store.close()
+
+
+def _replay(case: Dict, compactor: HistoryCompactor) -> Dict[str, int]:
+    history: List[types.Content] = []
+    context = _customer_context(case)
+    totals = {"llm_calls": 0, "raw_tokens": 0, "compacted_tokens": 0}
+
+    def measure():
+        request = _with_context(history, context)
+        totals["llm_calls"] += 1
+        totals["raw_tokens"] += estimate_tokens(request)
+        totals["compacted_tokens"] += estimate_tokens(compactor.compact(request))
+
+    for turn in case["conversation"]:
+        history.append(
+            types.Content(role="user", parts=[types.Part(text=_text(turn["user_content"]))])
+        )
+        measure()
+        for i, tool_use in enumerate(turn["intermediate_data"]["tool_uses"]):
+            call_id = f"{turn['invocation_id']}-{i}"
+            args = tool_use.get("args") or {}
+            if tool_use["name"] == "modify_cart":
+                args = {"items_to_add": [], "items_to_remove": [], **args}
+            history.append(
+                types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(
+                            function_call=types.FunctionCall(
+                                id=call_id, name=tool_use["name"], args=args
+                            )
+                        )
+                    ],
+                )
+            )
+            history.append(
+                types.Content(
+                    role="user",
+                    parts=[
+                        types.Part(
+                            function_response=types.FunctionResponse(
+                                id=call_id,
+                                name=tool_use["name"],
+                                response=TOOLS[tool_use["name"]](**args),
+                            )
+                        )
+                    ],
+                )
+            )
+            measure()
+        history.append(
+            types.Content(
+                role="model", parts=[types.Part(text=_text(turn["final_response"]))]
+            )
+        )
+    return totals
+
+
+def main():
+    compaction_settings = Config().compaction_settings
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--token-budget", type=int, default=compaction_settings.token_budget
+    )
+    parser.add_argument(
+        "--keep-recent-turns", type=int, default=compaction_settings.keep_recent_turns
+    )
+    args = parser.parse_args()
+    compactor = HistoryCompactor(
+        token_budget=args.token_budget, keep_recent_turns=args.keep_recent_turns
+    )
+
+    print(
+        f"token_budget={args.token_budget} keep_recent_turns={args.keep_recent_turns}\n"
+    )
+    print(f"{'eval case':<52} {'calls':>6} {'raw':>8} {'compacted':>10} {'saved':>7}")
+    for path in sorted(glob.glob(os.path.join(EVAL_DATA_DIR, "*.test.json"))):
+        with open(path) as f:
+            eval_set = json.load(f)
+        for case in eval_set["eval_cases"]:
+            totals = replay_case(case, compactor)
+            saved = 1 - totals["compacted_tokens"] / max(1, totals["raw_tokens"])
+            name = f"{os.path.basename(path)}:{case['eval_id']}"
+            print(
+                f"{name:<52} {totals['llm_calls']:>6} {totals['raw_tokens']:>8} "
+                f"{totals['compacted_tokens']:>10} {saved:>7.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
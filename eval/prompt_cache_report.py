@@ -0,0 +1,124 @@
+"""Reports prefix versus variable prompt bytes and the prefix cache hit rate.
+
+Runs root_agent locally against a fake model for several customers and turns,
+with the local stand-in context cache, and prints the per-request split between
+the cacheable prefix (system instruction + tool declarations) and the
+per-request contents.
+
+Usage:
+    PYTHONPATH=. python eval/prompt_cache_report.py [--customers 5] [--turns 3]
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from app.agent.agent import compactor, root_agent
+from app.agent.entities.repository import get_repository
+from app.agent.shared_libraries.context_cache import (
+    ContextCache,
+    InMemoryContextCache,
+    PromptPrefixCache,
+    prefix_payload,
+    variable_bytes,
+)
+
+QUESTIONS = [
+    "Do you sell seeds?",
+    "What tools do you have?",
+    "What's in my cart?",
+    "Any recommendations for tomatoes?",
+]
+
+
+class RecordingLlm(BaseLlm):
+    """Fake model that records the request it would have sent."""
+
+    requests: List[Dict] = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        prefix, _ = prefix_payload(llm_request)
+        self.requests.append(
+            {
+                "cached_content": llm_request.config.cached_content,
+                "prefix_bytes_sent": 0 if llm_request.config.cached_content else len(prefix),
+                "variable_bytes": variable_bytes(llm_request),
+            }
+        )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="Happy to help!")])
+        )
+
+
+async def run_report(
+    customer_ids: List[str], turns: int, cache: Optional[ContextCache]
+) -> Dict:
+    """
+    Runs the agent for each customer and returns the prefix statistics.
+
+    Args:
+        customer_ids: Customers to open a session for.
+        turns: User turns per session.
+        cache: The context cache backend, or None for implicit caching only.
+
+    Returns:
+        The PrefixStats summary plus the per-request records.
+    """
+    prefix_cache = PromptPrefixCache(cache)
+    llm = RecordingLlm(model="recording-llm", requests=[])
+    agent = root_agent.clone(
+        update={
+            "model": llm,
+            "before_model_callback": [compactor.callback, prefix_cache.callback],
+        }
+    )
+    runner = InMemoryRunner(agent=agent, app_name="prompt_cache_report")
+
+    for customer_id in customer_ids:
+        session = await runner.session_service.create_session(
+            app_name="prompt_cache_report",
+            user_id=customer_id,
+            state={"customer_id": customer_id},
+        )
+        for question in QUESTIONS[:turns]:
+            async for _ in runner.run_async(
+                user_id=customer_id,
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text=question)]),
+            ):
+                pass
+    await runner.close()
+    return {**prefix_cache.stats.to_dict(), "per_request": llm.requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=3)
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run_report(
+            get_repository().customer_ids(limit=args.customers),
+            args.turns,
+            InMemoryContextCache(),
+        )
+    )
+    per_request = report.pop("per_request")
+    print(f"{'request':>7} {'cached':>7} {'prefix bytes sent':>18} {'variable bytes':>15}")
+    for i, request in enumerate(per_request, 1):
+        print(
+            f"{i:>7} {'yes' if request['cached_content'] else 'no':>7} "
+            f"{request['prefix_bytes_sent']:>18} {request['variable_bytes']:>15}"
+        )
+    print()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import pytest
 from dotenv import find_dotenv, load_dotenv
 from google.adk.evaluation.agent_evaluator import AgentEvaluator
 
+from app.agent.shared_libraries.scheduler import Priority, request_context
+
 pytest_plugins = ("pytest_asyncio",)
 
 
@@ -12,6 +14,13 @@ def load_env():
     load_dotenv(find_dotenv("../.env"))
 
 
+@pytest.fixture(autouse=True)
+def eval_priority():
+    # Eval runs queue behind interactive customer turns in the LLM scheduler.
+    with request_context(Priority.EVAL):
+        yield
+
+
 # AgentEvaluator.migrate_eval_data_to_new_schema(
 #     os.path.join(os.path.dirname(__file__), "eval_data/full_conversation_old.test.json"),
 #     os.path.join(os.path.dirname(__file__), "eval_data/full_conversation.test.json"),
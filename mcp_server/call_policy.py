@@ -0,0 +1,288 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional, Type, TypeVar
+
+from mcp import types as mcp_types
+from mcp.client.session import ClientSession
+from mcp.shared.exceptions import McpError
+
+from app.agent.shared_libraries.scheduler import DeadlineExceeded
+from mcp_server.client_pool import TRANSPORT_ERRORS, PoolUnavailable
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Request _meta field carrying the milliseconds the client will wait for a
+# response. The server stops working on the request once they are up.
+DEADLINE_META = "timeout_ms"
+
+# JSON-RPC server error codes (-32000 to -32099) shared by the client and
+# the server. The server is overloaded and did not run the request.
+SERVER_OVERLOADED = -32001
+# The request's deadline passed before the server finished it.
+DEADLINE_EXCEEDED = -32002
+
+# Errors of a server that is overloaded or going away; the request was not
+# run and may be sent again.
+RETRYABLE_CODES = frozenset({mcp_types.CONNECTION_CLOSED, SERVER_OVERLOADED})
+
+# Absolute deadline (time.monotonic()) of the MCP calls in the current
+# context, set with deadline().
+call_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "call_deadline", default=None
+)
+
+@contextlib.contextmanager
+def deadline(timeout: float):
+    """
+    Gives the enclosed MCP calls, retries included, timeout seconds from now.
+    A deadline set further out than an enclosing one has no effect.
+
+    Args:
+        timeout: Seconds until the enclosed calls expire.
+    """
+    expires = time.monotonic() + timeout
+    current = call_deadline.get()
+    token = call_deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        call_deadline.reset(token)
+
+
+def retryable(error: BaseException) -> bool:
+    """Whether a failed call can be sent again: the connection failed or the
+    server turned the request away. Errors returned by a tool are final."""
+    if isinstance(error, McpError):
+        return error.error.code in RETRYABLE_CODES
+    return isinstance(error, TRANSPORT_ERRORS + (PoolUnavailable,))
+
+
+def request_deadline(meta: Any) -> Optional[float]:
+    """
+    The deadline a client sent with a request.
+
+    Args:
+        meta: The request's _meta, e.g. request_ctx.get().meta.
+
+    Returns:
+        The deadline on the time.monotonic() clock, or None.
+    """
+    timeout_ms = getattr(meta, DEADLINE_META, None)
+    if not isinstance(timeout_ms, (int, float)):
+        return None
+    return time.monotonic() + timeout_ms / 1000
+
+
+async def send_request(
+    session: ClientSession,
+    request: Any,
+    result_type: Type[T],
+    deadline: float,
+    progress_handler: Optional[Callable[..., Awaitable[None]]] = None,
+) -> T:
+    """
+    Sends one request that is given up on at deadline.
+
+    The time left is sent to the server in the request's _meta, and the
+    server stops working on the request when it runs out.
+
+    Args:
+        session: The MCP client session.
+        request: A request such as mcp.types.CallToolRequest.
+        result_type: The expected result, e.g. mcp.types.CallToolResult.
+        deadline: When to give up, on the time.monotonic() clock.
+        progress_handler: Receives the request's progress notifications.
+
+    Returns:
+        The result.
+
+    Raises:
+        DeadlineExceeded: If the deadline passed first, here or on the server.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"Deadline passed before sending {request.method}")
+    params = request.params.model_copy(
+        update={
+            "meta": mcp_types.RequestParams.Meta(
+                **{DEADLINE_META: max(1, int(remaining * 1000))}
+            )
+        }
+    )
+    request = mcp_types.ClientRequest(request.model_copy(update={"params": params}))
+    try:
+        async with asyncio.timeout(remaining) as scope:
+            return await session.send_request(
+                request, result_type, progress_callback=progress_handler
+            )
+    except TimeoutError:
+        if not scope.expired():
+            raise
+    except McpError as e:
+        if e.error.code != DEADLINE_EXCEEDED:
+            raise
+    raise DeadlineExceeded(
+        f"{request.root.method} did not return within {remaining:.3g}s"
+    ) from None
+
+
+class CallPolicy:
+    """
+    Deadlines, retries and hedging of MCP client calls.
+
+    Every call has a deadline: the enclosing deadline() or timeout seconds
+    from now. It covers retries and is sent to the server, which stops work
+    the client no longer waits for.
+
+    Calls that are idempotent (tools in idempotent_tools, and resource reads)
+    are retried when retryable() says the request can be sent again, with
+    jittered exponential backoff, while the deadline leaves time. Other
+    calls, such as modify_cart, are never sent twice.
+
+    With hedge_after, an idempotent call that hasn't returned after that many
+    seconds is sent a second time, on the least loaded session of a pool; the
+    first response wins and the other is dropped. This trades a little extra
+    load for a shorter latency tail.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        retries: int = 2,
+        backoff: float = 0.1,
+        max_backoff: float = 2.0,
+        hedge_after: Optional[float] = None,
+        idempotent_tools: Optional[Iterable[str]] = None,
+    ):
+        """
+        Args:
+            timeout: Seconds a call may take when no deadline() is set.
+            retries: Most times a failed idempotent call is sent again.
+            backoff: Upper bound of the first delay before a retry, doubled
+                for each further retry up to max_backoff.
+            hedge_after: Seconds before a slow idempotent call is hedged;
+                None disables hedging.
+            idempotent_tools: The tools that can be retried and hedged;
+                Config().mcp_client_settings.idempotent_tools when None.
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        if idempotent_tools is None:
+            from app.agent.config import Config
+
+            idempotent_tools = Config().mcp_client_settings.idempotent_tools
+        self.idempotent_tools = frozenset(idempotent_tools)
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadlines_exceeded = 0
+
+    @classmethod
+    def from_config(cls) -> "CallPolicy":
+        """Builds a policy from Config().mcp_client_settings."""
+        from app.agent.config import Config
+
+        settings = Config().mcp_client_settings
+        return cls(
+            timeout=settings.call_timeout_secs,
+            retries=settings.max_retries,
+            backoff=settings.retry_backoff_secs,
+            max_backoff=settings.max_retry_backoff_secs,
+            hedge_after=settings.hedge_after_secs,
+            idempotent_tools=settings.idempotent_tools,
+        )
+
+    def idempotent(self, tool: str) -> bool:
+        return tool in self.idempotent_tools
+
+    def deadline(self) -> float:
+        """The deadline of a call starting now."""
+        expires = time.monotonic() + self.timeout
+        current = call_deadline.get()
+        return expires if current is None else min(current, expires)
+
+    async def run(
+        self, attempt: Callable[[float], Awaitable[T]], idempotent: bool = False
+    ) -> T:
+        """
+        Runs a call under the policy.
+
+        Args:
+            attempt: Sends the call once, giving up at the deadline it is
+                passed (see send_request).
+            idempotent: Whether the call may be retried and hedged.
+
+        Returns:
+            The result of the first attempt that succeeded.
+
+        Raises:
+            DeadlineExceeded: If the deadline passed first.
+        """
+        expires = self.deadline()
+        failures = 0
+        try:
+            while True:
+                try:
+                    if idempotent and self.hedge_after is not None:
+                        return await self._hedged(attempt, expires)
+                    return await attempt(expires)
+                except Exception as e:
+                    if not idempotent or failures >= self.retries or not retryable(e):
+                        raise
+                    delay = random.uniform(
+                        0, min(self.max_backoff, self.backoff * 2**failures)
+                    )
+                    if time.monotonic() + delay >= expires:
+                        raise
+                    failures += 1
+                    self.retried += 1
+                    logger.info("Retrying MCP call in %.2fs after %r", delay, e)
+                    await asyncio.sleep(delay)
+        except DeadlineExceeded:
+            self.deadlines_exceeded += 1
+            raise
+
+    async def _hedged(
+        self, attempt: Callable[[float], Awaitable[T]], expires: float
+    ) -> T:
+        first = asyncio.ensure_future(attempt(expires))
+        attempts = [first]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.hedge_after)
+            if done or time.monotonic() >= expires:
+                return await first
+            self.hedged += 1
+            attempts.append(asyncio.ensure_future(attempt(expires)))
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "deadlines_exceeded": self.deadlines_exceeded,
+        }
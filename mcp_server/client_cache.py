@@ -0,0 +1,170 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class _Flight:
+    __slots__ = ("task", "tags")
+
+    def __init__(self, task: asyncio.Task, tags: Tuple[str, ...]):
+        self.task = task
+        self.tags = tags
+
+
+class ToolCache:
+    """
+    Client-side TTL cache for read-only MCP calls.
+
+    Entries expire after their method's TTL and the least recently used are
+    evicted beyond max_size. Concurrent identical calls share one request
+    (single-flight). Entries and calls in flight can be tagged, e.g. with the
+    customer they belong to, and invalidated by tag after a write; a call in
+    flight when its tag is invalidated is not cached.
+
+    Cached results are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        max_size: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            ttls: Seconds to keep the results of each method. Methods not
+                listed are not cached.
+            max_size: The maximum number of entries.
+            clock: Returns the current time in seconds.
+        """
+        self.ttls = ttls
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = (
+            OrderedDict()
+        )
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls) -> "ToolCache":
+        """Builds a cache with the TTLs in Config().mcp_client_settings."""
+        from app.agent.config import Config
+
+        settings = Config().mcp_client_settings
+        return cls(settings.cache_ttls, settings.cache_max_size)
+
+    async def get_or_call(
+        self,
+        method: str,
+        args: Tuple,
+        fetch: Callable[[], Awaitable[Any]],
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Returns the cached result of method(*args), or calls fetch once for
+        all concurrent callers and caches its result.
+
+        Args:
+            method: The client method.
+            args: Its arguments, which must be hashable.
+            fetch: Makes the call.
+            tags: Tags for invalidate().
+
+        Returns:
+            The result. Exceptions are passed to every waiting caller and not
+            cached.
+        """
+        ttl = self.ttls.get(method, 0)
+        if ttl <= 0:
+            return await fetch()
+        key = (method, args)
+        counts = self._counts.setdefault(
+            method, {"hits": 0, "misses": 0, "coalesced": 0}
+        )
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                counts["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            counts["coalesced"] += 1
+        else:
+            counts["misses"] += 1
+            flight = _Flight(asyncio.ensure_future(fetch()), tuple(tags))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._landed(key, flight, ttl))
+        # Shielded so one caller giving up doesn't cancel the others' call.
+        return await asyncio.shield(flight.task)
+
+    def _landed(self, key: Hashable, flight: _Flight, ttl: float) -> None:
+        if self._flights.get(key) is not flight:
+            return  # Invalidated while in flight.
+        del self._flights[key]
+        if flight.task.cancelled() or flight.task.exception() is not None:
+            return
+        self._entries[key] = (self._clock() + ttl, flight.task.result(), flight.tags)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, tag: Optional[str] = None) -> int:
+        """
+        Drops the entries with a tag, or every entry.
+
+        Args:
+            tag: The tag to drop, None for all.
+
+        Returns:
+            The number of entries and calls in flight dropped.
+        """
+        stale = [
+            key
+            for key, (_, _, tags) in self._entries.items()
+            if tag is None or tag in tags
+        ]
+        for key in stale:
+            del self._entries[key]
+        flying = [
+            key
+            for key, flight in self._flights.items()
+            if tag is None or tag in flight.tags
+        ]
+        for key in flying:
+            # Callers already waiting still get the result; it isn't stored.
+            del self._flights[key]
+        self.invalidations += len(stale) + len(flying)
+        return len(stale) + len(flying)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per method hits, misses, coalesced calls and hit rate, and totals."""
+        methods = {}
+        for method, counts in self._counts.items():
+            requests = sum(counts.values())
+            methods[method] = {
+                **counts,
+                "hit_rate": (
+                    round((counts["hits"] + counts["coalesced"]) / requests, 4)
+                    if requests
+                    else 0.0
+                ),
+            }
+        hits = sum(c["hits"] + c["coalesced"] for c in self._counts.values())
+        requests = sum(sum(c.values()) for c in self._counts.values())
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hit_rate": round(hits / requests, 4) if requests else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "methods": methods,
+        }
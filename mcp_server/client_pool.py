@@ -0,0 +1,313 @@
+import asyncio
+import contextlib
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import anyio
+import httpx
+from fastmcp import Client
+
+logger = logging.getLogger(__name__)
+
+# Failures of the connection itself, as opposed to errors returned by the server.
+TRANSPORT_ERRORS = (
+    OSError,
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+)
+
+
+class PoolBusy(Exception):
+    """Raised when a call finds the pool's wait queue full."""
+
+
+class PoolUnavailable(Exception):
+    """Raised when no session could be connected within the connect timeout."""
+
+
+def config_kwargs() -> Dict[str, Any]:
+    """The ClientPool arguments set in Config().mcp_client_settings."""
+    from app.agent.config import Config
+
+    settings = Config().mcp_client_settings
+    return {
+        "size": settings.pool_size,
+        "max_in_flight_per_session": settings.max_in_flight_per_session,
+        "max_waiting": settings.max_waiting,
+        "request_timeout": settings.request_timeout_secs,
+        "connect_timeout": settings.connect_timeout_secs,
+        "reconnect_delay": settings.reconnect_delay_secs,
+        "max_reconnect_delay": settings.max_reconnect_delay_secs,
+    }
+
+
+class _Connection:
+    __slots__ = ("index", "client", "in_flight", "calls", "reconnecting")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.client: Optional[Client] = None
+        self.in_flight = 0
+        self.calls = 0
+        self.reconnecting: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.client is not None and self.client.is_connected()
+
+
+class ClientPool:
+    """
+    A fixed number of warm MCP sessions shared by concurrent callers.
+
+    Each call goes to the connected session with the fewest calls in flight;
+    sessions carry several concurrent requests each, up to
+    max_in_flight_per_session. Callers beyond that wait, and beyond
+    max_waiting they get PoolBusy, so a burst slows callers down instead of
+    piling up requests on the server.
+
+    A session that fails is closed and reconnected in the background with
+    exponential backoff while the others carry the load. The failed call is
+    not retried, as tools such as modify_cart are not idempotent; calls that
+    find a session already down are sent on another one.
+
+    The pool connects on first use and can be shared for the lifetime of a
+    web service: create it once, call close() on shutdown. It belongs to the
+    event loop it was first used on.
+    """
+
+    def __init__(
+        self,
+        server: Any,
+        size: int = 4,
+        max_in_flight_per_session: int = 16,
+        max_waiting: Optional[int] = 256,
+        request_timeout: Optional[float] = 30.0,
+        connect_timeout: float = 10.0,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+        client_factory: Optional[Callable[[], Client]] = None,
+        **client_kwargs: Any,
+    ):
+        """
+        Args:
+            server: A FastMCP server or URL, as accepted by fastmcp.Client.
+            size: The number of sessions.
+            max_in_flight_per_session: Concurrent calls per session.
+            max_waiting: Callers allowed to wait for a slot; None for no limit.
+            request_timeout: Seconds before a call times out. Without one, a
+                call on a connection that died waits forever.
+            connect_timeout: Seconds a call waits for a session to connect.
+            reconnect_delay: First delay between reconnection attempts,
+                doubled after each failure up to max_reconnect_delay.
+            client_factory: Builds the clients; defaults to fastmcp.Client on
+                server with client_kwargs.
+        """
+        self.server = server
+        self.size = size
+        self.max_in_flight_per_session = max_in_flight_per_session
+        self.max_waiting = max_waiting
+        self.connect_timeout = connect_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        if client_factory is None:
+            client_kwargs.setdefault("timeout", request_timeout)
+
+            def client_factory() -> Client:
+                return Client(server, **client_kwargs)
+
+        self._client_factory = client_factory
+        self._connections = [_Connection(i) for i in range(size)]
+        self._slots = asyncio.Semaphore(size * max_in_flight_per_session)
+        self._changed = asyncio.Condition()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._closed = False
+        self.waiting = 0
+        self.rejected = 0
+        self.reconnects = 0
+        self.failures = 0
+
+    @classmethod
+    def from_config(cls, server: Any, **client_kwargs: Any) -> "ClientPool":
+        """Builds a pool with Config().mcp_client_settings."""
+        return cls(server, **config_kwargs(), **client_kwargs)
+
+    async def __aenter__(self) -> "ClientPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Connects every session; a session that fails keeps reconnecting."""
+        async with self._start_lock:
+            if self._started:
+                return
+            if self._closed:
+                raise RuntimeError("ClientPool is closed")
+            results = await asyncio.gather(
+                *(self._connect(conn) for conn in self._connections),
+                return_exceptions=True,
+            )
+            self._started = True
+            for conn, result in zip(self._connections, results):
+                if isinstance(result, Exception):
+                    logger.warning(
+                        "MCP session %i failed to connect: %r", conn.index, result
+                    )
+                    self._reconnect(conn)
+
+    async def close(self) -> None:
+        self._closed = True
+        for conn in self._connections:
+            if conn.reconnecting is not None:
+                conn.reconnecting.cancel()
+        await asyncio.gather(
+            *(self._disconnect(conn) for conn in self._connections),
+            return_exceptions=True,
+        )
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict] = None, **kwargs):
+        return await self._call(
+            lambda client: client.call_tool(name, arguments, **kwargs)
+        )
+
+    async def call_tool_mcp(self, name: str, arguments: Dict, **kwargs):
+        return await self._call(
+            lambda client: client.call_tool_mcp(name, arguments, **kwargs)
+        )
+
+    async def read_resource(self, uri: str):
+        return await self._call(lambda client: client.read_resource(uri))
+
+    async def list_tools(self):
+        return await self._call(lambda client: client.list_tools())
+
+    async def run(self, request: Callable[[Client], Any]):
+        """Runs request(client) on the least loaded session, for requests
+        sent on the client's session directly."""
+        return await self._call(request)
+
+    @property
+    def session(self):
+        """The MCP session of the first connected client, for requests
+        not covered above such as resources/subscribe."""
+        for conn in self._connections:
+            if conn.healthy:
+                return conn.client.session
+        raise PoolUnavailable("No connected MCP session")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "connected": sum(conn.healthy for conn in self._connections),
+            "in_flight": sum(conn.in_flight for conn in self._connections),
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "calls": [conn.calls for conn in self._connections],
+        }
+
+    async def _call(self, request: Callable[[Client], Any]):
+        if not self._started:
+            await self.start()
+        if self._slots.locked():
+            if self.max_waiting is not None and self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise PoolBusy(f"{self.waiting} calls already waiting for a session")
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            conn = await self._pick()
+            conn.in_flight += 1
+            conn.calls += 1
+            try:
+                return await request(conn.client)
+            except Exception as e:
+                if isinstance(e, TRANSPORT_ERRORS) or not conn.healthy:
+                    self.failures += 1
+                    logger.warning("MCP session %i failed: %r", conn.index, e)
+                    self._reconnect(conn)
+                raise
+            finally:
+                conn.in_flight -= 1
+        finally:
+            self._slots.release()
+
+    async def _pick(self) -> _Connection:
+        async def connected() -> _Connection:
+            async with self._changed:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("ClientPool is closed")
+                    candidates = []
+                    for conn in self._connections:
+                        if conn.healthy:
+                            candidates.append(conn)
+                        else:
+                            # Also picks up sessions that dropped while idle.
+                            self._reconnect(conn)
+                    if candidates:
+                        return min(candidates, key=lambda conn: conn.in_flight)
+                    await self._changed.wait()
+
+        try:
+            return await asyncio.wait_for(connected(), self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise PoolUnavailable(
+                f"No MCP session connected within {self.connect_timeout}s"
+            ) from None
+
+    async def _connect(self, conn: _Connection) -> None:
+        client = self._client_factory()
+        await client.__aenter__()
+        conn.client = client
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _disconnect(self, conn: _Connection) -> None:
+        client, conn.client = conn.client, None
+        if client is not None:
+            # Closing a dead transport raises its connection error again.
+            with contextlib.suppress(Exception):
+                await client.__aexit__(None, None, None)
+
+    def _reconnect(self, conn: _Connection) -> None:
+        if self._closed or conn.reconnecting is not None:
+            return
+        conn.reconnecting = asyncio.get_running_loop().create_task(
+            self._reconnect_loop(conn)
+        )
+
+    async def _reconnect_loop(self, conn: _Connection) -> None:
+        delay = self.reconnect_delay
+        try:
+            await self._disconnect(conn)
+            while not self._closed:
+                try:
+                    await self._connect(conn)
+                except Exception as e:
+                    logger.info(
+                        "MCP session %i reconnect failed, retrying in %.1fs: %r",
+                        conn.index,
+                        delay,
+                        e,
+                    )
+                    await self._disconnect(conn)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                else:
+                    self.reconnects += 1
+                    return
+        finally:
+            conn.reconnecting = None
@@ -13,8 +13,12 @@ async def example_1_browse_products():
         print(f"\n📦 Total products in catalog: {all_products['total_products']}")
         
         departments = ["tools", "seeds", "decor", "irrigation"]
-        for dept in departments:
-            products = await client.check_product_list(department=dept)
+        # One round trip for all departments
+        results = await client.batch([
+            {"tool": "check_product_list", "args": {"department": dept}}
+            for dept in departments
+        ])
+        for dept, products in zip(departments, results):
             print(f"   - {dept.title()}: {len(products['products'])} products")
 
 
@@ -48,12 +52,15 @@ async def example_3_check_availability():
             ("decor-202", "Solar Garden Lantern")
         ]
         
-        for product_id, name in products_to_check:
-            availability = await client.check_product_availability(
-                product_id=product_id,
-                store_id="STORE-001"
-            )
-            
+        results = await client.batch([
+            {
+                "tool": "check_product_availability",
+                "args": {"product_id": product_id, "store_id": "STORE-001"}
+            }
+            for product_id, _ in products_to_check
+        ])
+        
+        for (product_id, name), availability in zip(products_to_check, results):
             status = "✅ Available" if availability['available'] else "❌ Out of Stock"
             qty = availability.get('quantity', 0)
             print(f"\n{status}: {name} (ID: {product_id})")
@@ -165,6 +172,27 @@ async def example_6_error_handling():
             print(f"   Error caught: {result['error']}")
 
 
+async def example_7_pooled_client():
+    print("\n" + "="*80)
+    print("EXAMPLE 7: Pooled Client Shared by Concurrent Requests")
+    print("="*80)
+    
+    # Open once, e.g. at web service startup, and share between requests.
+    client = CustomerServicesMCPClient(mcp, pool_size=4)
+    await client.connect()
+    try:
+        customers = ["123", "456", "789", "1001"]
+        carts = await asyncio.gather(*(
+            client.access_cart_information(customer_id=customer_id)
+            for customer_id in customers
+        ))
+        for customer_id, cart in zip(customers, carts):
+            print(f"   Customer {customer_id}: {cart['item_count']} items, £{cart['total']}")
+        print(f"\n   Calls per session: {client.client.stats()['calls']}")
+    finally:
+        await client.close()
+
+
 async def main():
     print("\n" + "🌟 "*30)
     print("MCP CLIENT - USAGE EXAMPLES")
@@ -176,6 +204,7 @@ async def main():
     await example_4_shopping_workflow()
     await example_5_bulk_operations()
     await example_6_error_handling()
+    await example_7_pooled_client()
     
     print("\n" + "✅ "*30)
     print("ALL EXAMPLES COMPLETED")
@@ -0,0 +1,571 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from fastmcp import Context
+from mcp import types as mcp_types
+from mcp.server.lowlevel.server import request_ctx
+from pydantic import BaseModel, Field
+
+from app.agent.shared_libraries.metrics import metrics
+from app.agent.tools.registry import ToolRegistry, registry
+from mcp_server.call_policy import DeadlineExceeded, request_deadline
+from mcp_server.streaming import (
+    CHUNK_SOURCES,
+    DEFAULT_CHUNK_SIZE,
+    STREAM_CALL,
+    STREAM_CALL_DESCRIPTION,
+    ToolStream,
+    result_chunks,
+    stream_call,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_CALL = "batch_call"
+# Most calls one batch_call request may carry.
+MAX_BATCH_CALLS = 50
+
+BATCH_CALL_DESCRIPTION = """Runs several tool calls concurrently in one request.
+
+Args:
+    calls: The calls to run, each {"tool": <tool name>, "args": {...}}.
+
+Returns:
+    {"results": [...]} with one entry per call, in the order given. Each entry
+    is {"tool", "ok": true, "result"} or {"tool", "ok": false, "error"}; a
+    failed entry doesn't affect the others.
+"""
+
+
+class BatchEntry(BaseModel):
+    """One call in a batch_call request."""
+
+    tool: str
+    args: Dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    calls: List[BatchEntry] = Field(max_length=MAX_BATCH_CALLS)
+
+
+def batch_call_tool() -> mcp_types.Tool:
+    """The MCP listing of the batch_call tool, for the low-level server."""
+    return mcp_types.Tool(
+        name=BATCH_CALL,
+        description=BATCH_CALL_DESCRIPTION,
+        inputSchema=BatchRequest.model_json_schema(),
+    )
+
+
+# Set on the thread pool worker running a tool call to the call's
+# cancellation event; see cancellation_requested().
+_call_cancelled: contextvars.ContextVar[Optional[threading.Event]] = (
+    contextvars.ContextVar("call_cancelled", default=None)
+)
+
+
+class ToolTimeout(TimeoutError):
+    """Raised when a tool call runs longer than its timeout."""
+
+
+def cancellation_requested() -> bool:
+    """
+    Whether the tool call running on this thread has been given up on, as
+    its client cancelled it or went away, or it ran out of time.
+
+    A sync tool can check this between steps of long work and return early,
+    freeing its worker for other calls. Always False outside the executor's
+    thread pool.
+    """
+    cancelled = _call_cancelled.get()
+    return cancelled is not None and cancelled.is_set()
+
+
+def _timed_call(
+    func: Callable[..., Any],
+    kwargs: Dict[str, Any],
+    cancelled: Optional[threading.Event] = None,
+) -> Tuple[float, Any]:
+    # Runs in a pool worker. time.monotonic() is system-wide on Linux, so the
+    # start time is comparable across processes.
+    token = _call_cancelled.set(cancelled)
+    try:
+        return time.monotonic(), func(**kwargs)
+    finally:
+        _call_cancelled.reset(token)
+
+
+class _ToolSlot:
+    __slots__ = ("limit", "semaphore", "waiting", "in_flight")
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit) if limit else None
+        self.waiting = 0
+        self.in_flight = 0
+
+
+class ToolExecutor:
+    """
+    Runs synchronous tools off the event loop, so one slow tool call does not
+    stall every other MCP client.
+
+    Sync tools run on a bounded thread pool, or on a process pool for the
+    CPU-heavy tools listed in process_tools. Async tools still run on the loop.
+    Only tools registered as stateless may be listed in process_tools: a
+    process pool worker has its own repository, cart store and segment
+    index, so a tool that reads or writes carts or purchases there would
+    not see this process's data, nor this process its writes.
+    Each tool can have its own concurrency limit; calls over the limit wait on
+    the loop without holding a pool worker. Queue depth and in-flight gauges
+    and the time each call waited before starting are recorded in metrics.
+
+    Each tool can also have a timeout, and calls within an MCP request give
+    up at the request's deadline. A call that times out or whose request is
+    cancelled (the client cancelled it or disconnected) is given up on: if it
+    is still waiting it never starts, an async tool is cancelled, and a sync
+    tool already running is told through cancellation_requested(). Its slot
+    is freed at once; its worker counts as abandoned until the tool returns.
+    """
+
+    def __init__(
+        self,
+        tools: ToolRegistry = registry,
+        thread_workers: int = 8,
+        process_workers: int = 0,
+        process_tools: Iterable[str] = (),
+        tool_limits: Optional[Dict[str, int]] = None,
+        default_timeout: Optional[float] = None,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+    ):
+        if thread_workers < 1 or process_workers < 0:
+            raise ValueError(
+                "thread_workers must be at least 1 and process_workers at least 0"
+            )
+        self.tools = tools
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.process_tools = (
+            frozenset(process_tools) if process_workers else frozenset()
+        )
+        for name in self.process_tools:
+            tool = tools.get(name)
+            if tool is not None and not tool.stateless:
+                raise ValueError(
+                    f"Tool '{name}' keeps state in its process and can't run "
+                    "on the process pool"
+                )
+        self.tool_limits = dict(tool_limits or {})
+        self.default_timeout = default_timeout
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._slots: Dict[str, _ToolSlot] = {}
+        self._outstanding = {"thread": 0, "process": 0}
+        self._abandoned = {"thread": 0, "process": 0}
+
+    @classmethod
+    def from_config(cls, tools: ToolRegistry = registry) -> "ToolExecutor":
+        """Builds an executor from Config().tool_executor_settings."""
+        from app.agent.config import Config
+
+        settings = Config().tool_executor_settings
+        return cls(
+            tools,
+            thread_workers=settings.thread_workers,
+            process_workers=settings.process_workers,
+            process_tools=settings.process_tools,
+            tool_limits=settings.tool_limits,
+            default_timeout=settings.default_timeout_secs,
+            tool_timeouts=settings.tool_timeouts,
+        )
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Runs a tool by name, off the event loop if it is synchronous.
+
+        The call is given up on when the tool's timeout or the deadline of
+        the MCP request (see mcp_server.call_policy) passes first, or when
+        the request is cancelled.
+
+        Args:
+            name: The tool name.
+            arguments: The tool arguments.
+
+        Returns:
+            The tool result.
+
+        Raises:
+            KeyError: If no tool has that name.
+            ToolTimeout: If the tool's timeout passes first.
+            DeadlineExceeded: If the MCP request's deadline passes first.
+        """
+        return await self._within(
+            name,
+            self._expiry(name),
+            lambda cancelled: self._run(name, arguments, cancelled),
+        )
+
+    def _expiry(self, name: str) -> Tuple[Optional[float], str, Optional[float]]:
+        """
+        When a call to a tool starting now gives up: the sooner of its
+        timeout and the MCP request's deadline.
+
+        Returns:
+            The time.monotonic() expiry, or None for no limit, which limit
+            it is ("timeout" or "deadline") and the tool's timeout.
+        """
+        ctx = request_ctx.get(None)
+        expires = request_deadline(ctx.meta) if ctx is not None else None
+        limit = "deadline"
+        timeout = self.tool_timeouts.get(name, self.default_timeout)
+        if timeout is not None:
+            timeout_expires = time.monotonic() + timeout
+            if expires is None or timeout_expires < expires:
+                expires, limit = timeout_expires, "timeout"
+        return expires, limit, timeout
+
+    async def _within(
+        self,
+        name: str,
+        expiry: Tuple[Optional[float], str, Optional[float]],
+        run: Callable[[threading.Event], Awaitable[Any]],
+    ) -> Any:
+        # Awaits run(cancelled) until the expiry, setting cancelled when the
+        # call is given up on.
+        expires, limit, timeout = expiry
+        cancelled = threading.Event()
+        try:
+            if expires is None:
+                return await run(cancelled)
+            remaining = expires - time.monotonic()
+            if remaining > 0:
+                try:
+                    async with asyncio.timeout(remaining) as scope:
+                        return await run(cancelled)
+                except TimeoutError:
+                    if not scope.expired():
+                        raise
+        except asyncio.CancelledError:
+            cancelled.set()
+            metrics.increment("tool_cancelled_total", tool=name)
+            raise
+        cancelled.set()
+        metrics.increment("tool_timeouts_total", tool=name, limit=limit)
+        logger.warning("Tool %s gave up at its %s", name, limit)
+        if limit == "timeout":
+            raise ToolTimeout(f"Tool '{name}' timed out after {timeout}s")
+        raise DeadlineExceeded(
+            f"Tool '{name}' did not finish within the request deadline"
+        )
+
+    async def _run(
+        self, name: str, arguments: Dict[str, Any], cancelled: threading.Event
+    ) -> Any:
+        tool = self.tools.get(name)
+        if tool is None:
+            raise KeyError(name)
+        kwargs = tool.bind(arguments)
+        if tool.is_async or kwargs is None:
+            # Async tools don't block the loop; missing arguments get
+            # FunctionTool's error message.
+            return await self.tools.call(name, arguments)
+        pool = "process" if name in self.process_tools else "thread"
+        return await self._limited(name, pool, tool.func, kwargs, cancelled)
+
+    async def _limited(
+        self,
+        name: str,
+        pool: str,
+        func: Callable[..., Any],
+        kwargs: Dict[str, Any],
+        cancelled: threading.Event,
+    ) -> Any:
+        # Runs func on the pool within the tool's concurrency limit.
+        slot = self._slot(name)
+        arrived = time.monotonic()
+        slot.waiting += 1
+        self._publish(name, slot)
+        try:
+            if slot.semaphore is not None:
+                await slot.semaphore.acquire()
+        finally:
+            slot.waiting -= 1
+        slot.in_flight += 1
+        self._publish(name, slot)
+        try:
+            started, result = await self._submit(pool, func, kwargs, cancelled)
+        finally:
+            slot.in_flight -= 1
+            if slot.semaphore is not None:
+                slot.semaphore.release()
+            self._publish(name, slot)
+        metrics.record("tool_queue", name, max(0.0, started - arrived))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the current load of the executor.
+
+        Returns:
+            Per-tool limit, waiting and in-flight counts, and the number of
+            calls submitted to each pool but not yet finished, of which
+            abandoned ones were given up on while running.
+        """
+        return {
+            "tools": {
+                name: {
+                    "limit": slot.limit,
+                    "waiting": slot.waiting,
+                    "in_flight": slot.in_flight,
+                }
+                for name, slot in self._slots.items()
+            },
+            "pools": {
+                "thread": {
+                    "workers": self.thread_workers,
+                    "outstanding": self._outstanding["thread"],
+                    "abandoned": self._abandoned["thread"],
+                },
+                "process": {
+                    "workers": self.process_workers,
+                    "outstanding": self._outstanding["process"],
+                    "abandoned": self._abandoned["process"],
+                },
+            },
+        }
+
+    async def batch(
+        self, calls: Sequence[Dict[str, Any] | BatchEntry]
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs several tool calls concurrently.
+
+        The calls share the executor's pools and per-tool limits with every
+        other request.
+
+        Args:
+            calls: {"tool": name, "args": {...}} entries.
+
+        Returns:
+            One result entry per call, in order, as described in
+            BATCH_CALL_DESCRIPTION.
+
+        Raises:
+            ValueError: If there are more than MAX_BATCH_CALLS calls.
+        """
+        if len(calls) > MAX_BATCH_CALLS:
+            raise ValueError(
+                f"A batch may hold at most {MAX_BATCH_CALLS} calls, got {len(calls)}"
+            )
+        metrics.increment("tool_batch_calls_total", len(calls))
+        return list(await asyncio.gather(*(self._batch_entry(c) for c in calls)))
+
+    async def run_sync(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs a plain function on the thread pool."""
+        _, result = await self._submit("thread", functools.partial(func, *args), {})
+        return result
+
+    async def stream(
+        self, name: str, arguments: Dict[str, Any], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> ToolStream:
+        """
+        Runs a tool as a stream of item chunks.
+
+        Tools with a chunk source in CHUNK_SOURCES produce each chunk on the
+        thread pool as it is consumed, within the tool's concurrency limit
+        like a call. The tool's timeout and the request's deadline apply to
+        the whole stream: a chunk still being produced when they pass is
+        given up on, and the iteration raises. Other tools run to completion
+        first and the list in their result is split into chunks.
+
+        Args:
+            name: The tool name.
+            arguments: The tool arguments.
+            chunk_size: Items per chunk.
+
+        Returns:
+            An async iterator of item lists.
+
+        Raises:
+            KeyError: If no tool has that name.
+            ToolTimeout: While iterating, if the tool's timeout passes first.
+            DeadlineExceeded: While iterating, if the MCP request's deadline
+                passes first.
+        """
+        if name not in self.tools:
+            raise KeyError(name)
+        source = CHUNK_SOURCES.get(name)
+        if source is None:
+            chunks = result_chunks(await self.call(name, arguments), chunk_size)
+            return ToolStream(chunks, self.run_sync)
+
+        expiry = self._expiry(name)
+
+        async def run_chunk(func: Callable[..., Any], *args: Any) -> Any:
+            # Chunk sources are generators, which can't be sent to another
+            # process.
+            return await self._within(
+                name,
+                expiry,
+                lambda cancelled: self._limited(
+                    name, "thread", functools.partial(func, *args), {}, cancelled
+                ),
+            )
+
+        return ToolStream(source(arguments, chunk_size), run_chunk)
+
+    def register_fastmcp(self, mcp) -> None:
+        """
+        Registers every tool with a FastMCP server, running through this
+        executor instead of on FastMCP's event loop, plus batch_call.
+        """
+        for func in self.tools.functions:
+            mcp.tool(self._fastmcp_wrapper(func))
+
+        async def batch_call(calls: List[BatchEntry]) -> dict:
+            return {"results": await self.batch(calls)}
+
+        mcp.tool(batch_call, description=BATCH_CALL_DESCRIPTION)
+
+        async def stream_call_fastmcp(
+            tool: str,
+            ctx: Context,
+            args: Optional[Dict[str, Any]] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+        ) -> dict:
+            meta = ctx.request_context.meta
+            send = None
+            if meta is not None and meta.progressToken is not None:
+
+                async def send(progress: float, message: str) -> None:
+                    await ctx.report_progress(progress, message=message)
+
+            return await stream_call(self, tool, args or {}, chunk_size, send)
+
+        mcp.tool(
+            stream_call_fastmcp, name=STREAM_CALL, description=STREAM_CALL_DESCRIPTION
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+        self._threads = self._processes = None
+
+    def _fastmcp_wrapper(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        # functools.wraps keeps the signature and docstring FastMCP builds the
+        # tool schema from.
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            return await self.call(name, kwargs)
+
+        return wrapper
+
+    async def _batch_entry(self, entry: Dict[str, Any] | BatchEntry) -> Dict:
+        tool = entry.get("tool") if isinstance(entry, dict) else entry.tool
+        try:
+            entry = BatchEntry.model_validate(entry)
+            if entry.tool == BATCH_CALL or entry.tool not in self.tools:
+                raise LookupError(f"Tool '{entry.tool}' not found")
+            result = await self.call(entry.tool, entry.args)
+        except Exception as e:
+            return {"tool": tool, "ok": False, "error": str(e)}
+        return {"tool": tool, "ok": True, "result": result}
+
+    def _slot(self, name: str) -> _ToolSlot:
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slots[name] = _ToolSlot(self.tool_limits.get(name))
+        return slot
+
+    def _pool(self, pool: str) -> Executor:
+        if pool == "process":
+            if self._processes is None:
+                # spawn, as forking a process that runs threads is unsafe.
+                self._processes = ProcessPoolExecutor(
+                    self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                self.thread_workers, thread_name_prefix="mcp-tool"
+            )
+        return self._threads
+
+    async def _submit(
+        self,
+        pool: str,
+        func: Callable[..., Any],
+        kwargs: Dict[str, Any],
+        cancelled: Optional[threading.Event] = None,
+    ) -> Tuple[float, Any]:
+        loop = asyncio.get_running_loop()
+        if pool == "process" or cancelled is None:
+            # An Event can't be sent to another process.
+            future = self._pool(pool).submit(_timed_call, func, kwargs)
+        else:
+            future = self._pool(pool).submit(_timed_call, func, kwargs, cancelled)
+        self._outstanding[pool] += 1
+        self._publish_pool(pool)
+        # The call counts as outstanding until its worker is done with it, even
+        # if it was given up on before.
+        abandoned = [False]
+
+        def done(_) -> None:
+            try:
+                loop.call_soon_threadsafe(self._finished, pool, abandoned)
+            except RuntimeError:
+                # The loop closed while the worker ran.
+                pass
+
+        future.add_done_callback(done)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # cancel() only fails once the worker has started the call.
+            if not future.cancel():
+                abandoned[0] = True
+                self._abandoned[pool] += 1
+                self._publish_pool(pool)
+            raise
+
+    def _finished(self, pool: str, abandoned: List[bool]) -> None:
+        self._outstanding[pool] -= 1
+        if abandoned[0]:
+            self._abandoned[pool] -= 1
+        self._publish_pool(pool)
+
+    def _publish(self, name: str, slot: _ToolSlot) -> None:
+        metrics.set_gauge("tool_queue_depth", slot.waiting, tool=name)
+        metrics.set_gauge("tool_in_flight", slot.in_flight, tool=name)
+
+    def _publish_pool(self, pool: str) -> None:
+        workers = self.process_workers if pool == "process" else self.thread_workers
+        # Calls beyond the worker count are queued inside the pool.
+        metrics.set_gauge(
+            "tool_pool_queue_depth",
+            max(0, self._outstanding[pool] - workers),
+            pool=pool,
+        )
+        metrics.set_gauge("tool_pool_abandoned", self._abandoned[pool], pool=pool)
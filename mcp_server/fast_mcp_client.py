@@ -2,24 +2,113 @@
 
 import asyncio
 import json
-from typing import Optional, Any, Dict, List
+from collections.abc import Mapping
+from typing import Optional, Any, AsyncIterator, Dict, List, Union
+import mcp.types
 from fastmcp import FastMCP, Client
+from fastmcp.exceptions import ToolError
+
+from mcp_server.results import (
+    Availability,
+    Cart,
+    CartUpdate,
+    Profile,
+    ProductList,
+    PurchaseAnalytics,
+    PurchaseHistory,
+    Recommendations,
+    decode,
+    text_content,
+)
+
+from mcp_server.call_policy import CallPolicy, send_request
+from mcp_server.client_cache import ToolCache
+from mcp_server.client_pool import ClientPool, config_kwargs
 
 
 class CustomerServicesMCPClient:
+    """
+    Customer services MCP client.
+
+    With pool_size, calls are spread over that many warm sessions instead of
+    one (see ClientPool). A pooled client can be kept for the lifetime of a
+    web service: call connect() on startup and close() on shutdown.
+    
+    With a cache, check_product_list, get_product_recommendations and
+    get_version results are reused for their TTL and identical concurrent
+    calls share one request. A customer's recommendations are dropped after
+    modify_cart for that customer. Cached results are shared and must not be
+    modified.
+    
+    Results are typed by the TypedDicts in mcp_server.results. They are
+    decoded lazily: structured content is used as the transport decoded it,
+    and JSON text is only parsed when first read. With strict=True every
+    result is validated and a malformed payload raises MalformedResult.
+    
+    Calls follow a CallPolicy: each has a deadline, which the server is told
+    so it can stop work the client no longer waits for, and gives up with
+    DeadlineExceeded when it passes. Use call_policy.deadline() for a
+    shorter one. Read-only tools and resource reads are retried when the
+    server turns them away, and hedged if the policy says so; modify_cart,
+    batch and stream are sent once.
+    """
 
-    def __init__(self, server: FastMCP):
+    def __init__(
+        self,
+        server: Union[FastMCP, str],
+        pool_size: Optional[int] = None,
+        cache: Optional[ToolCache] = None,
+        strict: bool = False,
+        policy: Optional[CallPolicy] = None,
+        **pool_kwargs
+    ):
         self.server = server
-        self.client: Optional[Client] = None
+        self.strict = strict
+        self.policy = policy or CallPolicy()
+        self.pool_size = pool_size
+        self.cache = cache
+        self.pool_kwargs = pool_kwargs
+        self.client: Optional[Union[Client, ClientPool]] = None
+        self.last_stream_summary: Optional[Dict[str, Any]] = None
+        # Profiles of subscribed customers, kept until the server reports a change.
+        self.profiles: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.profile_updates = 0
         
     async def __aenter__(self):
-        self.client = Client(self.server)
-        await self.client.__aenter__()
+        await self.connect()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.client:
-            await self.client.__aexit__(exc_type, exc_val, exc_tb)
+        await self.close()
+    
+    async def connect(self):
+        if self.pool_size:
+            client = ClientPool(
+                self.server,
+                size=self.pool_size,
+                message_handler=self._on_message,
+                **self.pool_kwargs
+            )
+        else:
+            client = Client(self.server, message_handler=self._on_message)
+        await client.__aenter__()
+        self.client = client
+    
+    async def close(self):
+        client, self.client = self.client, None
+        if client:
+            await client.__aexit__(None, None, None)
+    
+    @classmethod
+    def pooled(cls, server: Union[FastMCP, str]) -> "CustomerServicesMCPClient":
+        """A pooled client sized by Config().mcp_client_settings."""
+        kwargs = config_kwargs()
+        return cls(
+            server,
+            pool_size=kwargs.pop("size"),
+            policy=CallPolicy.from_config(),
+            **kwargs
+        )
     
     async def list_tools(self) -> List[Dict[str, Any]]:
         if not self.client:
@@ -53,135 +142,332 @@ class CustomerServicesMCPClient:
                     print(f"     {req_marker}{param_name} ({param_type}): {param_desc}")
         print("\n" + "="*80 + "\n")
     
-    async def check_product_list(self, department: Optional[str] = None) -> Dict[str, Any]:
+    async def check_product_list(self, department: Optional[str] = None) -> ProductList:
         if not self.client:
             raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
         args = {}
         if department is not None:
             args["department"] = department
-            
-        result = await self.client.call_tool("check_product_list", args)
-        return self._parse_result(result)
+        
+        async def fetch():
+            return await self._call_tool("check_product_list", args, ProductList)
+        
+        return await self._cached("check_product_list", (department,), fetch)
     
     async def get_product_recommendations(
         self, 
         plant_type: str, 
         customer_id: str
-    ) -> Dict[str, Any]:
+    ) -> Recommendations:
         if not self.client:
             raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        result = await self.client.call_tool(
+        async def fetch():
+            return await self._call_tool(
+                "get_product_recommendations",
+                {
+                    "plant_type": plant_type,
+                    "customer_id": customer_id
+                },
+                Recommendations
+            )
+        
+        return await self._cached(
             "get_product_recommendations",
-            {
-                "plant_type": plant_type,
-                "customer_id": customer_id
-            }
+            (plant_type, customer_id),
+            fetch,
+            tags=(f"customer:{customer_id}",)
         )
-        return self._parse_result(result)
     
     async def check_product_availability(
         self, 
         product_id: str, 
         store_id: str
-    ) -> Dict[str, Any]:
+    ) -> Availability:
         if not self.client:
             raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        result = await self.client.call_tool(
+        return await self._call_tool(
             "check_product_availability",
             {
                 "product_id": product_id,
                 "store_id": store_id
-            }
+            },
+            Availability
         )
-        return self._parse_result(result)
     
-    async def access_cart_information(self, customer_id: str) -> Dict[str, Any]:
+    async def access_cart_information(self, customer_id: str) -> Cart:
         if not self.client:
             raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        result = await self.client.call_tool(
+        return await self._call_tool(
             "access_cart_information",
-            {"customer_id": customer_id}
+            {"customer_id": customer_id},
+            Cart
         )
-        return self._parse_result(result)
     
     async def modify_cart(
         self,
         customer_id: str,
         items_to_add: Optional[List[Dict[str, Any]]] = None,
         items_to_remove: Optional[List[Dict[str, Any]]] = None
-    ) -> Dict[str, Any]:
+    ) -> CartUpdate:
         if not self.client:
             raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        result = await self.client.call_tool(
-            "modify_cart",
-            {
-                "customer_id": customer_id,
-                "items_to_add": items_to_add or [],
-                "items_to_remove": items_to_remove or []
-            }
+        try:
+            return await self._call_tool(
+                "modify_cart",
+                {
+                    "customer_id": customer_id,
+                    "items_to_add": items_to_add or [],
+                    "items_to_remove": items_to_remove or []
+                },
+                CartUpdate
+            )
+        finally:
+            # Even a failed call may have changed the cart.
+            self._invalidate_customer(customer_id)
+    
+    async def get_purchase_history(
+        self,
+        customer_id: str,
+        cursor: Optional[str] = None,
+        page_size: int = 20
+    ) -> PurchaseHistory:
+        if not self.client:
+            raise RuntimeError("Client not connected. Use 'async with' context manager.")
+        
+        arguments = {"customer_id": customer_id, "page_size": page_size}
+        if cursor:
+            arguments["cursor"] = cursor
+        return await self._call_tool("get_purchase_history", arguments, PurchaseHistory)
+    
+    async def batch(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Runs several tool calls in one round trip; the server runs them
+        concurrently.
+
+        Args:
+            calls: {"tool": name, "args": {...}} entries, at most 50.
+
+        Returns:
+            The result of each call in order. A call that failed on the
+            server is returned as {"error": message}.
+        """
+        if not self.client:
+            raise RuntimeError("Client not connected. Use 'async with' context manager.")
+        
+        try:
+            result = await self._call_tool("batch_call", {"calls": calls})
+        finally:
+            for call in calls:
+                if call.get("tool") == "modify_cart":
+                    self._invalidate_customer(call.get("args", {}).get("customer_id"))
+        if "results" not in result:
+            raise RuntimeError(result.get("error", "batch_call failed"))
+        return [
+            entry["result"] if entry["ok"] else {"error": entry["error"]}
+            for entry in result["results"]
+        ]
+    
+    async def stream(
+        self,
+        tool: str,
+        args: Optional[Dict[str, Any]] = None,
+        chunk_size: int = 50
+    ) -> AsyncIterator[List[Any]]:
+        """
+        Runs a tool through stream_call and yields its items chunk by chunk,
+        as the server sends them.
+
+        Args:
+            tool: The tool to run.
+            args: The tool arguments.
+            chunk_size: Items per chunk.
+
+        Yields:
+            Lists of items. After the iteration, self.last_stream_summary holds
+            the rest of the tool result.
+        """
+        if not self.client:
+            raise RuntimeError("Client not connected. Use 'async with' context manager.")
+        
+        chunks: asyncio.Queue = asyncio.Queue()
+        
+        async def on_progress(progress: float, total: Optional[float], message: Optional[str]):
+            chunks.put_nowait(message)
+        
+        call = asyncio.create_task(
+            self._call_tool(
+                "stream_call",
+                {"tool": tool, "args": args or {}, "chunk_size": chunk_size},
+                progress_handler=on_progress,
+            )
         )
-        return self._parse_result(result)
+        try:
+            while True:
+                next_chunk = asyncio.ensure_future(chunks.get())
+                await asyncio.wait({next_chunk, call}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_chunk.done():
+                    next_chunk.cancel()
+                    break
+                yield json.loads(next_chunk.result())["items"]
+            # Progress callbacks run before the response is delivered, so any
+            # chunk still queued arrived before the call finished.
+            while not chunks.empty():
+                yield json.loads(chunks.get_nowait())["items"]
+            result = await call
+        finally:
+            call.cancel()
+        if "summary" not in result:
+            raise RuntimeError(result.get("error", "stream_call failed"))
+        if not result["streamed"] and result["items"]:
+            yield result["items"]
+        self.last_stream_summary = result["summary"]
     
     async def get_version(self) -> str:
         if not self.client:
             raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        result = await self.client.read_resource("config://version")
+        async def fetch():
+            result = await self._read_resource("config://version")
+            
+            if isinstance(result, list) and len(result) > 0:
+                first_item = result[0]
+                if hasattr(first_item, 'text'):
+                    return first_item.text
+            
+            return str(result)
         
-        if isinstance(result, list) and len(result) > 0:
-            first_item = result[0]
-            if hasattr(first_item, 'text'):
-                return first_item.text
+        return await self._cached("get_version", (), fetch)
+    
+    async def get_user_profile(self, user_id: str) -> Profile:
+        """
+        Reads a customer profile resource. Profiles subscribed to with
+        subscribe_profile() are only read again after the server reports a
+        change.
+
+        Returns:
+            {"customer_id", "version", "etag", "profile"}.
+        """
+        if not self.client:
+            raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        return str(result)
+        uri = f"users://{user_id}/profile"
+        cached = self.profiles.get(uri)
+        if cached is not None:
+            return cached
+        
+        updates = self.profile_updates
+        result = await self._read_resource(uri)
+        profile = decode(result, Profile, self.strict)
+        # Don't keep a read that a change notification overtook.
+        if uri in self.profiles and updates == self.profile_updates:
+            self.profiles[uri] = profile
+        return profile
     
-    async def get_user_profile(self, user_id: int) -> Dict[str, Any]:
+    async def subscribe_profile(self, user_id: str) -> None:
         if not self.client:
             raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        result = await self.client.read_resource(f"users://{user_id}/profile")
+        uri = f"users://{user_id}/profile"
+        await self.client.session.subscribe_resource(uri)
+        self.profiles.setdefault(uri, None)
+    
+    async def unsubscribe_profile(self, user_id: str) -> None:
+        if not self.client:
+            raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        if isinstance(result, list) and len(result) > 0:
-            first_item = result[0]
-            if hasattr(first_item, 'text'):
-                try:
-                    return json.loads(first_item.text)
-                except json.JSONDecodeError:
-                    return {"raw_result": first_item.text}
+        uri = f"users://{user_id}/profile"
+        await self.client.session.unsubscribe_resource(uri)
+        self.profiles.pop(uri, None)
+    
+    async def _on_message(self, message: Any) -> None:
+        if isinstance(message, mcp.types.ServerNotification) and isinstance(
+            message.root, mcp.types.ResourceUpdatedNotification
+        ):
+            uri = str(message.root.params.uri)
+            if uri in self.profiles:
+                self.profiles[uri] = None
+                self.profile_updates += 1
+    
+    async def get_purchase_analytics(
+        self, customer_id: str, department: Optional[str] = None
+    ) -> PurchaseAnalytics:
+        if not self.client:
+            raise RuntimeError("Client not connected. Use 'async with' context manager.")
         
-        return result
+        arguments = {"customer_id": customer_id}
+        if department:
+            arguments["department"] = department
+        return await self._call_tool("get_purchase_analytics", arguments, PurchaseAnalytics)
     
-    def _parse_result(self, result: Any) -> Dict[str, Any]:
-        if hasattr(result, 'content'):
-            content = result.content
-            if isinstance(content, list) and len(content) > 0:
-                first_item = content[0]
-                if hasattr(first_item, 'text'):
-                    try:
-                        return json.loads(first_item.text)
-                    except json.JSONDecodeError:
-                        return {"raw_result": first_item.text}
-        
-        if isinstance(result, str):
-            try:
-                return json.loads(result)
-            except json.JSONDecodeError:
-                return {"raw_result": result}
-        
-        elif isinstance(result, list) and len(result) > 0:
-            first_item = result[0]
-            if hasattr(first_item, 'text'):
-                try:
-                    return json.loads(first_item.text)
-                except json.JSONDecodeError:
-                    return {"raw_result": first_item.text}
-        
-        return result
+    async def get_customer_analytics(self, customer_id: str) -> PurchaseAnalytics:
+        if not self.client:
+            raise RuntimeError("Client not connected. Use 'async with' context manager.")
+        
+        result = await self._read_resource(f"customers://{customer_id}/analytics")
+        return decode(result, PurchaseAnalytics, self.strict)
+    
+    async def _cached(self, method: str, args: tuple, fetch, tags: tuple = ()) -> Any:
+        if self.cache is None:
+            return await fetch()
+        return await self.cache.get_or_call(method, args, fetch, tags)
+    
+    def _invalidate_customer(self, customer_id: Optional[str]) -> None:
+        if self.cache is not None and customer_id is not None:
+            self.cache.invalidate(f"customer:{customer_id}")
+    
+    async def _call_tool(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        model: Optional[type] = None,
+        progress_handler=None
+    ) -> Any:
+        # The raw MCP result: fastmcp's call_tool would also validate the
+        # structured content against the tool's output schema.
+        request = mcp.types.CallToolRequest(
+            params=mcp.types.CallToolRequestParams(name=name, arguments=arguments)
+        )
+        result = await self._request(
+            request,
+            mcp.types.CallToolResult,
+            self.policy.idempotent(name),
+            progress_handler
+        )
+        if result.isError:
+            raise ToolError(text_content(result))
+        return decode(result, model, self.strict)
+    
+    async def _read_resource(self, uri: str) -> List[Any]:
+        request = mcp.types.ReadResourceRequest(
+            params=mcp.types.ReadResourceRequestParams(uri=uri)
+        )
+        result = await self._request(request, mcp.types.ReadResourceResult, True)
+        return result.contents
+    
+    async def _request(
+        self,
+        request: Any,
+        result_type: type,
+        idempotent: bool,
+        progress_handler=None
+    ) -> Any:
+        async def attempt(deadline: float):
+            def send(client: Client):
+                return send_request(
+                    client.session, request, result_type, deadline, progress_handler
+                )
+            
+            if isinstance(self.client, ClientPool):
+                # Each attempt, hedges included, goes to the least loaded session.
+                return await self.client.run(send)
+            return await send(self.client)
+        
+        return await self.policy.run(attempt, idempotent)
     
     @staticmethod
     def pretty_print(data: Any, title: Optional[str] = None):
@@ -190,7 +476,7 @@ class CustomerServicesMCPClient:
             print(f"  {title}")
             print("="*80)
         
-        print(json.dumps(data, indent=2, default=str))
+        print(json.dumps(data, indent=2, default=lambda o: dict(o) if isinstance(o, Mapping) else str(o)))
         print()
 
 
@@ -255,7 +541,7 @@ async def demo_all_features():
         version = await client.get_version()
         print(f"Server Version: {version}")
         
-        user_profile = await client.get_user_profile(user_id=42)
+        user_profile = await client.get_user_profile(user_id="123")
         client.pretty_print(user_profile, "User Profile")
         
         print("\n" + "✅ "*20)
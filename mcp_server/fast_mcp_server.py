@@ -1,27 +1,26 @@
 from fastmcp import FastMCP
 
-# Import and register your existing tools directly
-from app.agent.tools.tools import (
-    check_product_list,
-    get_product_recommendations,
-    check_product_availability,
-    access_cart_information,
-    modify_cart,
-)
+# The same tools as root_agent and the stdio server
+from app.agent.tools.registry import registry
 
+from app.agent.entities.repository import get_repository
 
-mcp = FastMCP(name="customer-services-mcp-server")
+from mcp_server import serialization
+from mcp_server.executor import ToolExecutor
+from mcp_server.profiles import ProfileHub
+
+
+serializer, _, _ = serialization.from_config()
+mcp = FastMCP(name="customer-services-mcp-server", tool_serializer=serializer.dumps)
 
 
 # ============================================================================
 # TOOLS - Register existing functions as MCP tools
 # ============================================================================
 
-mcp.tool(check_product_list)
-mcp.tool(get_product_recommendations)
-mcp.tool(check_product_availability)
-mcp.tool(access_cart_information)
-mcp.tool(modify_cart)
+# Sync tools run on the executor's pools, not on FastMCP's event loop.
+executor = ToolExecutor.from_config(registry)
+executor.register_fastmcp(mcp)
 
 
 # ============================================================================
@@ -34,11 +33,25 @@ def get_version():
     return "2.0.1"
 
 
-# Dynamic resource template
-@mcp.resource("users://{user_id}/profile")
-def get_profile(user_id: int):
-    # Fetch profile for user_id...
-    return {"name": f"User {user_id}", "status": "active"}
+# Cached profiles; subscribers are notified when one changes.
+profiles = ProfileHub()
+profiles.register(mcp._mcp_server)
+
+
+@mcp.resource("users://{user_id}/profile", mime_type="application/json")
+def get_profile(user_id: str):
+    profile = profiles.read(user_id)
+    if profile is None:
+        raise ValueError(f"Customer {user_id} not found")
+    return profile
+
+
+@mcp.resource("customers://{customer_id}/analytics")
+def get_customer_analytics(customer_id: str):
+    analytics = get_repository().get_analytics(customer_id)
+    if analytics is None:
+        raise ValueError(f"Customer {customer_id} not found")
+    return analytics.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+"""A customer services MCP server whose tool calls can be slow or fail.
+
+For testing client deadlines, retries and hedging (mcp_server.call_policy)
+against the real tools.
+
+Usage:
+    PYTHONPATH=. python mcp_server/fault_injection.py
+        [--slow-rate 0.1] [--delay 2] [--failure-rate 0.1] [--tools ...]
+        [--seed 0] [--port 8000]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from fastmcp import FastMCP
+from mcp import types as mcp_types
+from mcp.server.lowlevel import Server
+from mcp.shared.exceptions import McpError
+
+from app.agent.tools.registry import ToolRegistry, registry
+from mcp_server.call_policy import (
+    DEADLINE_EXCEEDED,
+    SERVER_OVERLOADED,
+    request_deadline,
+)
+from mcp_server.executor import ToolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class FaultInjector:
+    """
+    Makes a server's tool calls slow or fail at random.
+
+    A failed call is answered with a SERVER_OVERLOADED error before the tool
+    runs, as an overloaded server would. A slow call waits delay seconds
+    before the tool runs. The wait ends early at the request's deadline, with
+    a DEADLINE_EXCEEDED error counted in expired, or if the client cancels the
+    request, counted in cancelled.
+
+    The rates can be changed while the server runs.
+    """
+
+    def __init__(
+        self,
+        slow_rate: float = 0.0,
+        delay: float = 1.0,
+        failure_rate: float = 0.0,
+        tools: Optional[Iterable[str]] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            slow_rate: Fraction of calls delayed.
+            delay: Seconds a slow call is delayed.
+            failure_rate: Fraction of calls failed.
+            tools: The tools to inject faults into; defaults to all.
+            seed: Seeds the random choices, for repeatable runs.
+        """
+        self.slow_rate = slow_rate
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.tools = frozenset(tools) if tools is not None else None
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.slowed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.expired = 0
+
+    def install(self, server: Server) -> None:
+        """Wraps the tools/call handler of a low-level server, such as
+        FastMCP's _mcp_server."""
+        handler = server.request_handlers[mcp_types.CallToolRequest]
+
+        async def call_tool(request: mcp_types.CallToolRequest) -> Any:
+            deadline = request_deadline(server.request_context.meta)
+            await self._inject(request.params.name, deadline)
+            return await handler(request)
+
+        server.request_handlers[mcp_types.CallToolRequest] = call_tool
+
+    async def _inject(self, tool: str, deadline: Optional[float]) -> None:
+        if self.tools is not None and tool not in self.tools:
+            return
+        self.calls += 1
+        if self._random.random() < self.failure_rate:
+            self.failed += 1
+            raise McpError(
+                mcp_types.ErrorData(
+                    code=SERVER_OVERLOADED,
+                    message=f"Injected failure calling {tool}",
+                )
+            )
+        if self._random.random() < self.slow_rate:
+            self.slowed += 1
+            delay = self.delay
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+            try:
+                await asyncio.sleep(max(0.0, delay))
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            if delay < self.delay:
+                self.expired += 1
+                raise McpError(
+                    mcp_types.ErrorData(
+                        code=DEADLINE_EXCEEDED,
+                        message=f"{tool} did not finish within the request deadline",
+                    )
+                )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "slowed": self.slowed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "expired": self.expired,
+        }
+
+
+def create_fault_server(
+    injector: FaultInjector, tools: ToolRegistry = registry
+) -> FastMCP:
+    """
+    Builds a FastMCP server with the customer service tools behind injector.
+
+    Args:
+        injector: Decides which calls are slow or fail.
+        tools: The tools to serve.
+
+    Returns:
+        The server.
+    """
+    mcp = FastMCP(name="customer-services-fault-injection")
+    ToolExecutor(tools).register_fastmcp(mcp)
+    injector.install(mcp._mcp_server)
+    return mcp
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slow-rate", type=float, default=0.1)
+    parser.add_argument("--delay", type=float, default=2.0)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--tools", nargs="+")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    injector = FaultInjector(
+        slow_rate=args.slow_rate,
+        delay=args.delay,
+        failure_rate=args.failure_rate,
+        tools=args.tools,
+        seed=args.seed,
+    )
+    create_fault_server(injector).run(transport="streamable-http", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+from mcp.server.lowlevel import Server
+from mcp.server.session import ServerSession
+
+from app.agent.entities.repository import CustomerRepository, LRUCache, get_repository
+
+logger = logging.getLogger(__name__)
+
+PROFILE_URI = "users://{customer_id}/profile"
+
+
+def profile_uri(customer_id: str) -> str:
+    return PROFILE_URI.format(customer_id=customer_id)
+
+
+def etag(profile_json: str) -> str:
+    """A strong validator of the stored profile JSON."""
+    return hashlib.blake2b(profile_json.encode(), digest_size=8).hexdigest()
+
+
+class ProfileHub:
+    """
+    Serves users://{customer_id}/profile from a cache and pushes
+    notifications/resources/updated to the sessions subscribed to a profile
+    when the repository changes it.
+
+    Each response carries the profile's etag, a hash of its stored JSON, and
+    a version that increases with every change seen by this process. A write
+    invalidates the cached entry at once; the notifications of all the
+    changes made before the event loop gets to them go out in one fan-out,
+    one message per subscribed session and changed profile.
+    """
+
+    def __init__(
+        self,
+        repository: Optional[CustomerRepository] = None,
+        cache_size: int = 10_000,
+    ):
+        self._repository = repository
+        self.cache = LRUCache(cache_size)
+        self.fanouts = 0
+        self.notifications = 0
+        self._versions: Dict[str, int] = {}
+        self._subscribers: Dict[str, Set[ServerSession]] = {}
+        self._pending: Set[str] = set()
+        self._scheduled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def _listen(self) -> CustomerRepository:
+        # Listens to the repository from the first read or subscription.
+        if self._repository is None:
+            self._repository = get_repository()
+        if not self._listening:
+            self._listening = True
+            self._repository.add_listener(self.invalidate)
+        return self._repository
+
+    def read(self, customer_id: str) -> Optional[str]:
+        """
+        Returns the profile resource as JSON text.
+
+        Args:
+            customer_id: The customer whose profile to read.
+
+        Returns:
+            {"customer_id", "version", "etag", "profile"} as JSON, or None for
+            an unknown customer.
+        """
+        text = self.cache.get(customer_id)
+        if text is not None:
+            return text
+        repository = self._listen()
+        with self._lock:
+            version = self._versions.get(customer_id, 1)
+        view = repository.get_view(customer_id)
+        if view is None:
+            return None
+        profile = view.to_json()
+        # The stored JSON is embedded as is rather than decoded and re-encoded.
+        text = (
+            f'{{"customer_id":{json.dumps(customer_id)},"version":{version},'
+            f'"etag":"{etag(profile)}","profile":{profile}}}'
+        )
+        with self._lock:
+            # A write during the read has already invalidated this version.
+            if self._versions.get(customer_id, 1) == version:
+                self.cache.put(customer_id, text)
+        return text
+
+    def invalidate(self, customer_ids: List[str]) -> None:
+        """
+        Repository listener: drops the cached profiles and schedules the
+        notifications of their subscribers. Safe to call from any thread.
+        """
+        with self._lock:
+            for customer_id in customer_ids:
+                self.cache.pop(customer_id)
+                self._versions[customer_id] = self._versions.get(customer_id, 1) + 1
+                if self._subscribers.get(profile_uri(customer_id)):
+                    self._pending.add(customer_id)
+            if not self._pending or self._scheduled or self._loop is None:
+                return
+            self._scheduled = True
+            loop = self._loop
+        try:
+            loop.call_soon_threadsafe(self._start_fan_out)
+        except RuntimeError:
+            # The server's loop has closed; nobody is left to notify.
+            with self._lock:
+                self._scheduled = False
+
+    def subscribe(self, uri: str, session: ServerSession) -> None:
+        self._listen()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.setdefault(uri, set()).add(session)
+
+    def unsubscribe(self, uri: str, session: ServerSession) -> None:
+        with self._lock:
+            sessions = self._subscribers.get(uri)
+            if sessions is not None:
+                sessions.discard(session)
+                if not sessions:
+                    del self._subscribers[uri]
+
+    def subscriber_count(self, uri: Optional[str] = None) -> int:
+        with self._lock:
+            if uri is not None:
+                return len(self._subscribers.get(uri, ()))
+            return sum(len(sessions) for sessions in self._subscribers.values())
+
+    def _start_fan_out(self) -> None:
+        task = asyncio.get_running_loop().create_task(self._fan_out())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fan_out(self) -> None:
+        with self._lock:
+            changed, self._pending = self._pending, set()
+            self._scheduled = False
+            targets = [
+                (uri, session)
+                for uri in map(profile_uri, changed)
+                for session in self._subscribers.get(uri, ())
+            ]
+        if not targets:
+            return
+        self.fanouts += 1
+        results = await asyncio.gather(
+            *(session.send_resource_updated(uri) for uri, session in targets),
+            return_exceptions=True,
+        )
+        for (uri, session), result in zip(targets, results):
+            if isinstance(result, Exception):
+                # The session has gone away without unsubscribing.
+                logger.debug("Dropping subscriber of %s: %r", uri, result)
+                self.unsubscribe(uri, session)
+            else:
+                self.notifications += 1
+
+    def register(self, server: Server) -> None:
+        """
+        Adds the subscribe and unsubscribe handlers to a low-level server and
+        advertises resource subscriptions in its capabilities.
+
+        Args:
+            server: The low-level server, e.g. FastMCP's _mcp_server.
+        """
+
+        @server.subscribe_resource()
+        async def subscribe(uri) -> None:
+            self.subscribe(str(uri), server.request_context.session)
+
+        @server.unsubscribe_resource()
+        async def unsubscribe(uri) -> None:
+            self.unsubscribe(str(uri), server.request_context.session)
+
+        get_capabilities = server.get_capabilities
+
+        # The low-level server always reports subscribe=False.
+        def with_subscribe(*args, **kwargs):
+            capabilities = get_capabilities(*args, **kwargs)
+            if capabilities.resources is not None:
+                capabilities.resources.subscribe = True
+            return capabilities
+
+        server.get_capabilities = with_subscribe
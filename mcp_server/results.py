@@ -0,0 +1,238 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+import pydantic
+import pydantic_core
+from mcp import types as mcp_types
+from pydantic import ConfigDict, with_config
+from typing_extensions import NotRequired, TypedDict
+
+from app.agent.entities.customer import type_adapter
+
+# Result shapes of the customer service tools. Strict decoding validates a
+# payload against them; fields the server adds later are kept.
+_OPEN = ConfigDict(extra="allow")
+
+
+@with_config(_OPEN)
+class Product(TypedDict):
+    product_id: str
+    name: str
+    price: float
+    description: NotRequired[str]
+    department: NotRequired[str]
+    category: NotRequired[str]
+    in_stock: NotRequired[bool]
+    stock_quantity: NotRequired[int]
+
+
+@with_config(_OPEN)
+class ProductList(TypedDict):
+    department: str
+    total_products: int
+    products: List[Product]
+
+
+@with_config(_OPEN)
+class Recommendations(TypedDict):
+    plant_type: str
+    customer_id: str
+    recommendations: List[Product]
+    total_recommendations: int
+    note: NotRequired[str]
+    customer_segment: NotRequired[Dict[str, Any]]
+
+
+@with_config(_OPEN)
+class Availability(TypedDict):
+    available: bool
+    product_id: str
+    store: str
+    quantity: NotRequired[int]
+    total_quantity: NotRequired[int]
+    reserved: NotRequired[int]
+    status: NotRequired[str]
+    message: NotRequired[str]
+
+
+@with_config(_OPEN)
+class CartItem(TypedDict):
+    product_id: str
+    name: str
+    quantity: int
+    unit_price: float
+    description: NotRequired[str]
+    department: NotRequired[str]
+
+
+@with_config(_OPEN)
+class Cart(TypedDict):
+    customer_id: str
+    items: List[CartItem]
+    item_count: int
+    unique_items: int
+    subtotal: float
+    tax: float
+    total: float
+    currency: str
+    last_updated: NotRequired[str]
+
+
+@with_config(_OPEN)
+class CartSummary(TypedDict):
+    subtotal: float
+    tax: float
+    total: float
+    currency: str
+    item_count: int
+    unique_items: int
+
+
+@with_config(_OPEN)
+class CartUpdate(TypedDict):
+    status: str
+    customer_id: str
+    modifications: Dict[str, Any]
+    cart_summary: CartSummary
+    message: str
+    errors: Optional[List[Any]]
+
+
+@with_config(_OPEN)
+class PurchaseHistory(TypedDict):
+    customer_id: str
+    order_count: int
+    purchases: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+@with_config(_OPEN)
+class PurchaseAnalytics(TypedDict):
+    customer_id: str
+    order_count: int
+    total_spend: float
+    spend_by_department: Dict[str, float]
+    loyalty_points_balance: int
+
+
+@with_config(_OPEN)
+class Profile(TypedDict):
+    customer_id: str
+    version: int
+    etag: str
+    profile: Dict[str, Any]
+
+
+class MalformedResult(ValueError):
+    """Raised in strict mode when a payload is missing, not JSON or the
+    wrong shape."""
+
+
+class DeferredResult(Mapping):
+    """
+    Read-only mapping over a JSON payload whose decoding is deferred until
+    it is first read. The first access, even of one key, decodes the whole
+    payload; only a result that is never read, or only passed on with
+    to_json(), skips decoding.
+    """
+
+    __slots__ = ("_text", "_data")
+
+    def __init__(self, text: str):
+        self._text = text
+        self._data: Optional[Dict[str, Any]] = None
+
+    @property
+    def decoded(self) -> bool:
+        return self._data is not None
+
+    def _decode(self) -> Dict[str, Any]:
+        if self._data is None:
+            try:
+                data = pydantic_core.from_json(self._text)
+            except ValueError:
+                data = None
+            # The previous client's fallback for non-JSON text.
+            self._data = data if isinstance(data, dict) else {"raw_result": self._text}
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        return self._decode()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._decode())
+
+    def __len__(self) -> int:
+        return len(self._decode())
+
+    def __repr__(self) -> str:
+        if self._data is None:
+            return f"DeferredResult(<{len(self._text)} chars, not decoded>)"
+        return f"DeferredResult({self._data!r})"
+
+    def to_json(self) -> str:
+        return self._text
+
+
+def _is_error(payload: Dict[str, Any]) -> bool:
+    # Tools report failures such as unknown customers in the payload.
+    return "error" in payload or payload.get("status") == "error"
+
+
+def _payload(result: Any) -> Any:
+    """The structured content or the text of a tool result or resource read."""
+    structured = getattr(result, "structuredContent", None)
+    if structured is None:
+        structured = getattr(result, "structured_content", None)
+    if structured is not None:
+        return structured
+    content = getattr(result, "content", result)
+    if isinstance(content, list) and content:
+        content = content[0]
+    text = getattr(content, "text", content)
+    return text if isinstance(text, str) else None
+
+
+def decode(result: Any, model: Optional[Type] = None, strict: bool = False) -> Any:
+    """
+    Decodes a tool result or resource read.
+
+    Structured content, which the transport has already decoded, is used as
+    is. Otherwise the JSON text is wrapped in a DeferredResult, decoded in
+    full when first read.
+
+    Args:
+        result: A CallToolResult (mcp or fastmcp) or the contents of a
+            resource read.
+        model: The TypedDict of the payload, e.g. ProductList.
+        strict: Decode and validate the payload now and raise
+            MalformedResult if it isn't a JSON object of the model's shape.
+            Error payloads ({"error": ...}) are returned without validation.
+
+    Returns:
+        The payload as a dict or DeferredResult, read like the model.
+    """
+    payload = _payload(result)
+    if not strict:
+        if isinstance(payload, str):
+            return DeferredResult(payload)
+        return payload if payload is not None else {"raw_result": result}
+
+    if isinstance(payload, str):
+        try:
+            payload = pydantic_core.from_json(payload)
+        except ValueError as e:
+            raise MalformedResult(f"Result is not JSON: {e}") from None
+    if not isinstance(payload, dict):
+        raise MalformedResult(f"Expected a JSON object, got {type(payload).__name__}")
+    if model is None or _is_error(payload):
+        return payload
+    try:
+        return type_adapter(model).validate_python(payload, strict=True)
+    except pydantic.ValidationError as e:
+        raise MalformedResult(f"Malformed {model.__name__}: {e}") from None
+
+
+def text_content(result: mcp_types.CallToolResult) -> str:
+    content = result.content[0] if result.content else None
+    return getattr(content, "text", "")
@@ -0,0 +1,177 @@
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pydantic_core
+from mcp import types as mcp_types
+
+logger = logging.getLogger(__name__)
+
+
+class Serializer:
+    """Encodes tool results as JSON text for MCP responses."""
+
+    name = "json"
+
+    def dumps(self, value: Any) -> str:
+        return json.dumps(value, default=str, separators=(",", ":"))
+
+
+class PydanticSerializer(Serializer):
+    """pydantic-core's Rust encoder, available wherever pydantic is."""
+
+    name = "pydantic"
+
+    def dumps(self, value: Any) -> str:
+        return pydantic_core.to_json(value, fallback=str).decode()
+
+
+class OrjsonSerializer(Serializer):
+    """orjson, when it is installed."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, value: Any) -> str:
+        return self._orjson.dumps(value, default=str, option=self._option).decode()
+
+
+def build_serializer(name: str = "auto") -> Serializer:
+    """
+    Returns the serializer for a configured name.
+
+    Args:
+        name: "json" (stdlib), "pydantic", "orjson", or "auto" for orjson when
+            it is installed and pydantic otherwise.
+
+    Returns:
+        The serializer.
+    """
+    if name == "auto":
+        try:
+            return OrjsonSerializer()
+        except ImportError:
+            return PydanticSerializer()
+    if name == "json":
+        return Serializer()
+    if name == "pydantic":
+        return PydanticSerializer()
+    if name == "orjson":
+        return OrjsonSerializer()
+    raise ValueError(f"Unknown serializer '{name}'")
+
+
+# The (unstructured, structured) content pair returned to the low-level server.
+ToolResponse = Tuple[List[mcp_types.TextContent], Optional[Dict[str, Any]]]
+
+
+def tool_response(
+    result: Any, serializer: Serializer, structured: bool = True
+) -> ToolResponse:
+    """
+    Builds the content of a low-level server call_tool response.
+
+    Dict results are also returned as structured content, so clients can use
+    them without parsing the text.
+
+    Args:
+        result: The tool result.
+        serializer: Encodes the text content.
+        structured: Whether to add the structured content.
+
+    Returns:
+        The (unstructured, structured) pair the low-level server accepts.
+    """
+    text = mcp_types.TextContent(type="text", text=serializer.dumps(result))
+    return [text], result if structured and isinstance(result, dict) else None
+
+
+class SampledLogger:
+    """
+    Debug logging for hot paths: records are sampled, rate limited and
+    truncated, and skipped entirely unless DEBUG is enabled for the logger.
+
+    Goes through the logging module, whose handlers write to stderr, so it is
+    safe on a stdio transport where stdout carries the protocol.
+    """
+
+    def __init__(
+        self,
+        log: logging.Logger,
+        sample_rate: float = 0.01,
+        max_per_second: float = 5.0,
+        max_chars: int = 2000,
+    ):
+        self.log = log
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self.max_chars = max_chars
+        self.suppressed = 0
+        self._capacity = max(1.0, max_per_second)
+        self._tokens = self._capacity
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def debug(self, message: str, *args: Any) -> bool:
+        """
+        Logs a %-style message if the call is sampled. String arguments longer
+        than max_chars, such as serialised tool results, are truncated.
+
+        Returns:
+            Whether the record was logged.
+        """
+        if not self.log.isEnabledFor(logging.DEBUG):
+            return False
+        if random.random() >= self.sample_rate or not self._take():
+            self.suppressed += 1
+            return False
+        self.log.debug(message, *(self._truncate(arg) for arg in args))
+        return True
+
+    def _truncate(self, arg: Any) -> Any:
+        if isinstance(arg, str) and len(arg) > self.max_chars:
+            return f"{arg[: self.max_chars]}... ({len(arg)} chars)"
+        return arg
+
+    def _take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._refilled) * self.max_per_second,
+            )
+            self._refilled = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def from_config() -> Tuple[Serializer, SampledLogger, bool]:
+    """
+    Builds the serializer and result logger from Config().mcp_response_settings.
+
+    Returns:
+        The serializer, the result logger and whether to send structured content.
+    """
+    from app.agent.config import Config
+
+    settings = Config().mcp_response_settings
+    return (
+        build_serializer(settings.serializer),
+        SampledLogger(
+            logging.getLogger("mcp_server.results"),
+            settings.debug_sample_rate,
+            settings.debug_max_per_second,
+            settings.debug_max_chars,
+        ),
+        settings.structured_content,
+    )
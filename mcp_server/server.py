@@ -1,6 +1,5 @@
 import asyncio
-
-import json
+import logging
 
 from mcp import types as mcp_types
 from mcp.server import NotificationOptions
@@ -8,77 +7,87 @@ from mcp.server.lowlevel import Server
 from mcp.server.models import InitializationOptions
 import mcp.server.stdio
 
-from google.adk.tools.function_tool import FunctionTool
-from google.adk.tools.mcp_tool.conversion_utils import adk_to_mcp_tool_type
+from app.agent.tools.registry import registry
 
-from app.agent.tools.tools import (
-    check_product_list as ft_check_product_list,
-    get_product_recommendations as ft_get_product_recommendations,
-    check_product_availability as ft_check_product_availability,
-    access_cart_information as ft_access_cart_information,
-    modify_cart as ft_modify_cart,
+from mcp_server import serialization
+from mcp_server.executor import BATCH_CALL, ToolExecutor, batch_call_tool
+from mcp_server.serialization import Serializer, ToolResponse, tool_response
+from mcp_server.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    STREAM_CALL,
+    stream_call,
+    stream_call_tool,
 )
 
+# stdout carries the stdio protocol, so diagnostics go to the logger (stderr).
+logger = logging.getLogger(__name__)
+
+
+def _progress_sender(request_context):
+    # Chunks go out as progress notifications, only if the client asked for them.
+    meta = request_context.meta
+    if meta is None or meta.progressToken is None:
+        return None
+
+    async def send(progress: float, message: str) -> None:
+        await request_context.session.send_progress_notification(
+            meta.progressToken,
+            progress,
+            message=message,
+            related_request_id=request_context.request_id,
+        )
+
+    return send
 
-def create_mcp_server():
-    check_product_list = FunctionTool(ft_check_product_list)
-    get_product_recommendations = FunctionTool(ft_get_product_recommendations)
-    check_product_availability = FunctionTool(ft_check_product_availability)
-    access_cart_information = FunctionTool(ft_access_cart_information)
-    modify_cart = FunctionTool(ft_modify_cart)
+
+def create_mcp_server(
+    executor: ToolExecutor | None = None, serializer: Serializer | None = None
+):
+    # Converted once here, not on every list_tools request.
+    mcp_tools = registry.mcp_tools() + [batch_call_tool(), stream_call_tool()]
+    # Sync tools run on the executor's pools, not on the server's event loop.
+    executor = executor or ToolExecutor.from_config(registry)
+    default_serializer, result_log, structured = serialization.from_config()
+    serializer = serializer or default_serializer
 
     app = Server("customer-services-mcp-server")
 
     @app.list_tools()
     async def list_tools() -> list[mcp_types.Tool]:
-        mcp_tools = [
-            adk_to_mcp_tool_type(check_product_list),
-            adk_to_mcp_tool_type(get_product_recommendations),
-            adk_to_mcp_tool_type(check_product_availability),
-            adk_to_mcp_tool_type(access_cart_information),
-            adk_to_mcp_tool_type(modify_cart),
-        ]
         return mcp_tools
 
     @app.call_tool()
-    async def call_tool(name: str, arguments: dict) -> list[mcp_types.TextContent]:
-        tools = {
-            check_product_list.name: check_product_list,
-            get_product_recommendations.name: get_product_recommendations,
-            check_product_availability.name: check_product_availability,
-            access_cart_information.name: access_cart_information,
-            modify_cart.name: modify_cart,
-        }
-
-        if name in tools:
-            try:
-                result = await tools[name].run_async(
-                    args=arguments,
-                    tool_context=None,
-                )
-                print("result", result)
-                return [mcp_types.TextContent(type="text", text=json.dumps(result))]
-            except Exception as e:
-                return [
-                    mcp_types.TextContent(
-                        type="text", text=json.dumps({"error": str(e)})
-                    )
-                ]
-        else:
-            return [
-                mcp_types.TextContent(
-                    type="text", text=json.dumps({"error": f"Tool '{name}' not found"})
+    async def call_tool(name: str, arguments: dict) -> ToolResponse:
+        try:
+            if name == BATCH_CALL:
+                result = {"results": await executor.batch(arguments["calls"])}
+            elif name == STREAM_CALL:
+                result = await stream_call(
+                    executor,
+                    arguments["tool"],
+                    arguments.get("args", {}),
+                    arguments.get("chunk_size", DEFAULT_CHUNK_SIZE),
+                    _progress_sender(app.request_context),
                 )
-            ]
+            elif name in registry:
+                result = await executor.call(name, arguments)
+            else:
+                result = {"error": f"Tool '{name}' not found"}
+        except Exception as e:
+            result = {"error": str(e)}
+        response = tool_response(result, serializer, structured)
+        result_log.debug("Tool %s returned %s", name, response[0][0].text)
+        return response
 
     return app
 
 
 async def run_mcp_server():
-    app = create_mcp_server()
+    executor = ToolExecutor.from_config(registry)
+    app = create_mcp_server(executor)
 
     async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        print("MCP Stdio Server: Starting handshake with client...")
+        logger.info("MCP Stdio Server: Starting handshake with client...")
         await app.run(
             read_stream,
             write_stream,
@@ -92,17 +101,17 @@ async def run_mcp_server():
                 ),
             ),
         )
-        print("MCP Stdio Server: Run loop finished or client disconnected.")
+        logger.info("MCP Stdio Server: Run loop finished or client disconnected.")
+    executor.shutdown()
+
 
 if __name__ == "__main__":
-    print("Launching MCP Server to expose ADK tools via stdio...")
+    logger.info("Launching MCP Server to expose ADK tools via stdio...")
     try:
         asyncio.run(run_mcp_server())
     except KeyboardInterrupt:
-        print("\nMCP Server (stdio) stopped by user.")
+        logger.info("MCP Server (stdio) stopped by user.")
     except Exception as e:
-        print(f"MCP Server (stdio) encountered an error: {e}")
+        logger.error("MCP Server (stdio) encountered an error: %s", e)
     finally:
-        print("MCP Server (stdio) process exiting.")
-
-
+        logger.info("MCP Server (stdio) process exiting.")
@@ -0,0 +1,182 @@
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Generator, Iterator, List, Optional
+
+from mcp import types as mcp_types
+from pydantic import BaseModel, Field
+
+from app.agent.tools.tools import check_product_availability, get_purchase_history
+
+logger = logging.getLogger(__name__)
+
+STREAM_CALL = "stream_call"
+DEFAULT_CHUNK_SIZE = 50
+MAX_CHUNK_SIZE = 500
+
+STREAM_CALL_DESCRIPTION = """Runs a tool and streams its items back in chunks.
+
+Each chunk is sent as a progress notification whose message is
+{"seq": n, "items": [...]}, so a client that sets a progress token gets the
+first items before the rest are built. check_product_availability also takes
+"product_ids" to check many products in one stream.
+
+Args:
+    tool: The tool to run.
+    args: The tool arguments.
+    chunk_size: Items per chunk.
+
+Returns:
+    {"tool", "streamed": true, "chunks", "items", "summary"}, where summary
+    holds the result fields other than the streamed list. Without a progress
+    token the items are returned inline instead, with "streamed": false.
+"""
+
+# A chunk source yields lists of items and returns the rest of the result.
+ChunkSource = Generator[List[Any], None, Dict[str, Any]]
+
+
+class StreamRequest(BaseModel):
+    tool: str
+    args: Dict[str, Any] = Field(default_factory=dict)
+    chunk_size: int = Field(default=DEFAULT_CHUNK_SIZE, ge=1, le=MAX_CHUNK_SIZE)
+
+
+def stream_call_tool() -> mcp_types.Tool:
+    """The MCP listing of the stream_call tool, for the low-level server."""
+    return mcp_types.Tool(
+        name=STREAM_CALL,
+        description=STREAM_CALL_DESCRIPTION,
+        inputSchema=StreamRequest.model_json_schema(),
+    )
+
+
+def purchase_history_chunks(args: Dict[str, Any], chunk_size: int) -> ChunkSource:
+    """Pages through the purchase history, one page per chunk."""
+    cursor = args.get("cursor")
+    while True:
+        page = get_purchase_history(args["customer_id"], cursor, chunk_size)
+        if "purchases" not in page:
+            return page
+        yield page["purchases"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return {
+                "customer_id": page["customer_id"],
+                "order_count": page["order_count"],
+            }
+
+
+def availability_chunks(args: Dict[str, Any], chunk_size: int) -> ChunkSource:
+    """Checks "product_ids" (or a single "product_id") a chunk at a time."""
+    product_ids = args.get("product_ids") or [args["product_id"]]
+    store_id = args["store_id"]
+    for start in range(0, len(product_ids), chunk_size):
+        yield [
+            check_product_availability(product_id, store_id)
+            for product_id in product_ids[start : start + chunk_size]
+        ]
+    return {"store": store_id, "product_count": len(product_ids)}
+
+
+def result_chunks(result: Dict[str, Any], chunk_size: int) -> ChunkSource:
+    """Splits the first list in a finished tool result into chunks."""
+    field = next((k for k, v in result.items() if isinstance(v, list)), None)
+    if field is None:
+        return result
+    items = result[field]
+    for start in range(0, len(items), chunk_size):
+        yield items[start : start + chunk_size]
+    return {k: v for k, v in result.items() if k != field}
+
+
+# Tools whose items are produced lazily, chunk by chunk. Other tools are run
+# to completion and their result is split with result_chunks.
+CHUNK_SOURCES: Dict[str, Callable[[Dict[str, Any], int], ChunkSource]] = {
+    "get_purchase_history": purchase_history_chunks,
+    "check_product_availability": availability_chunks,
+}
+
+
+class ToolStream:
+    """
+    Async iterator over the chunks of a chunk source.
+
+    Each chunk is produced by run(), so a source that does I/O or computation
+    per chunk stays off the event loop. summary is set once the iteration ends.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterator[List[Any]],
+        run: Callable[..., Awaitable[Any]],
+    ):
+        self._chunks = chunks
+        self._run = run
+        self.summary: Optional[Dict[str, Any]] = None
+
+    def __aiter__(self) -> "ToolStream":
+        return self
+
+    async def __anext__(self) -> List[Any]:
+        if self.summary is not None:
+            raise StopAsyncIteration
+        done, value = await self._run(_next_chunk, self._chunks)
+        if done:
+            self.summary = value or {}
+            raise StopAsyncIteration
+        return value
+
+
+def _next_chunk(chunks: ChunkSource):
+    try:
+        return False, next(chunks)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+async def stream_call(
+    executor,
+    tool: str,
+    args: Dict[str, Any],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    send: Optional[Callable[[float, str], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs a stream_call request.
+
+    Args:
+        executor: The ToolExecutor that runs the tool.
+        tool: The tool name.
+        args: The tool arguments.
+        chunk_size: Items per chunk.
+        send: Sends one progress notification given the items sent so far and
+            the chunk message. None when the client set no progress token.
+
+    Returns:
+        The stream_call result described in STREAM_CALL_DESCRIPTION.
+    """
+    if tool not in executor.tools:
+        raise ValueError(f"Tool '{tool}' not found")
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+    stream = await executor.stream(tool, args, chunk_size)
+    if send is None:
+        items = [item async for chunk in stream for item in chunk]
+        return {
+            "tool": tool,
+            "streamed": False,
+            "items": items,
+            "summary": stream.summary,
+        }
+
+    chunks = sent = 0
+    async for chunk in stream:
+        sent += len(chunk)
+        await send(sent, json.dumps({"seq": chunks, "items": chunk}))
+        chunks += 1
+    return {
+        "tool": tool,
+        "streamed": True,
+        "chunks": chunks,
+        "items": sent,
+        "summary": stream.summary,
+    }
@@ -0,0 +1,90 @@
+import asyncio
+import datetime
+
+from fastmcp import Client
+
+from app.agent.entities.analytics import PurchaseAnalytics
+from app.agent.entities.customer import Product, Purchase
+from app.agent.entities.repository import (
+    DEFAULT_FIXTURE,
+    CustomerRepository,
+    set_repository,
+)
+from app.agent.tools.tools import get_purchase_analytics
+
+
+def repository():
+    repo = CustomerRepository()
+    repo.load_fixture(DEFAULT_FIXTURE)
+    return repo
+
+
+def test_analytics_are_built_on_load():
+    report = repository().get_analytics("789").report(today=datetime.date(2024, 3, 15))
+
+    assert report["order_count"] == 3
+    assert report["total_spend"] == 127.91
+    assert report["spend_by_department"]["tools"] == 34.99
+    assert report["days_since_last_order"] == 30
+    assert report["top_products"][0]["product_id"] == "seed-101"
+    assert report["loyalty_points_balance"] == 268
+
+
+def test_spend_is_by_catalogue_department():
+    repo = repository()
+    customer = repo.get("123")
+    report = repo.get_analytics("123").report()
+
+    # Trowels, gloves and pruners are tools although their ids say otherwise.
+    assert report["spend_by_department"]["tools"] > 0
+    assert "other" not in report["spend_by_department"]
+    assert report["spend_by_department"] == customer.purchase_summary.category_spend
+    # Without a stored history, the analytics come from the summary.
+    from_summary = PurchaseAnalytics.for_customer(customer)
+    assert from_summary.spend_by_department == report["spend_by_department"]
+    assert from_summary.order_count == report["order_count"]
+
+
+def test_add_purchase_updates_analytics_incrementally():
+    repo = repository()
+    purchase = Purchase(
+        date="2024-05-01",
+        items=[Product(product_id="seed-102", name="Sunflower Seeds - Giant", quantity=2)],
+        total_amount=9.98,
+    )
+
+    customer = repo.add_purchase("789", purchase)
+    analytics = repo.get_analytics("789")
+
+    purchases, _ = repo.get_purchases("789", page_size=100)
+    rebuilt = PurchaseAnalytics(customer_id="789")
+    for p in reversed(purchases):
+        rebuilt.add(p, earn_points=False)
+    assert analytics.spend_by_department == rebuilt.spend_by_department
+    assert analytics.order_count == 4
+    assert analytics.last_order_date == "2024-05-01"
+    assert analytics.loyalty_points_balance == 268 + 9
+    assert customer.loyalty_points == analytics.loyalty_points_balance
+    assert repo.get("789").loyalty_points == 277
+
+
+def test_tool_and_resource():
+    from mcp_server.fast_mcp_server import mcp
+
+    set_repository(repository())
+    try:
+        seeds = get_purchase_analytics("789", department="Seeds")
+        assert seeds["department_spend"] == 37.29
+        assert get_purchase_analytics("missing")["status"] == "error"
+        empty = get_purchase_analytics("1001")
+        assert empty["order_count"] == 0
+        assert empty["days_since_last_order"] is None
+
+        async def read():
+            async with Client(mcp) as client:
+                return await client.read_resource("customers://789/analytics")
+
+        contents = asyncio.run(read())
+        assert '"total_spend":127.91' in contents[0].text.replace(" ", "")
+    finally:
+        set_repository(None)
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+from mcp import types as mcp_types
+from mcp.server.lowlevel.server import request_ctx
+from mcp.shared.context import RequestContext
+from mcp.shared.exceptions import McpError
+
+from app.agent.config import McpClientModel
+from app.agent.shared_libraries.compaction import HistoryCompactor
+from app.agent.shared_libraries.scheduler import LlmScheduler
+from app.agent.tools.registry import ToolRegistry
+from mcp_server.call_policy import CallPolicy, DeadlineExceeded, deadline
+from mcp_server.executor import ToolExecutor
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+from mcp_server.fault_injection import FaultInjector, create_fault_server
+
+
+def slow_lookup(order_id: str) -> dict:
+    """Looks up an order in a slow backend.
+
+    Args:
+        order_id: The order to look up.
+    """
+    time.sleep(0.3)
+    return {"order_id": order_id}
+
+
+def test_idempotent_calls_are_retried_and_writes_are_not():
+    injector = FaultInjector(failure_rate=1.0)
+    mcp = create_fault_server(injector)
+    policy = CallPolicy(retries=2, backoff=0.01)
+
+    async def run():
+        async with CustomerServicesMCPClient(mcp, policy=policy) as client:
+            with pytest.raises(McpError):
+                await client.check_product_list()
+            assert injector.calls == 3
+
+            with pytest.raises(McpError):
+                await client.modify_cart(
+                    "123", items_to_add=[{"product_id": "seed-101", "quantity": 1}]
+                )
+            assert injector.calls == 4
+
+            injector.failure_rate = 0.5
+            injector._random.seed(7)
+            policy.retries = 5
+            return await asyncio.gather(
+                *(
+                    client.check_product_availability("seed-101", "london")
+                    for _ in range(10)
+                )
+            )
+
+    results = asyncio.run(run())
+    assert all(result["product_id"] == "seed-101" for result in results)
+    assert injector.failed > 5
+    assert policy.retried == injector.failed - 2
+
+
+def test_deadline_is_sent_to_the_server_and_cancels_its_work():
+    injector = FaultInjector(slow_rate=1.0, delay=5.0)
+    mcp = create_fault_server(injector)
+    policy = CallPolicy(timeout=10.0)
+
+    async def run():
+        async with CustomerServicesMCPClient(mcp, policy=policy) as client:
+            start = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                with deadline(0.2):
+                    await client.check_product_list()
+            elapsed = time.monotonic() - start
+            await asyncio.sleep(0.05)
+            return elapsed
+
+    assert asyncio.run(run()) < 1.0
+    assert injector.expired == 1
+    assert policy.deadlines_exceeded == 1
+    assert policy.retried == 0
+
+
+def test_executor_abandons_calls_past_the_request_deadline():
+    executor = ToolExecutor(ToolRegistry([slow_lookup]), tool_limits={"slow_lookup": 1})
+
+    async def call(timeout_ms):
+        token = request_ctx.set(
+            RequestContext(
+                request_id=1,
+                meta=mcp_types.RequestParams.Meta(timeout_ms=timeout_ms),
+                session=None,
+                lifespan_context=None,
+            )
+        )
+        try:
+            return await executor.call("slow_lookup", {"order_id": "o1"})
+        finally:
+            request_ctx.reset(token)
+
+    async def run():
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            await call(100)
+        assert time.monotonic() - start < 0.2
+        with pytest.raises(DeadlineExceeded):
+            await call(0)
+        assert executor.stats()["tools"]["slow_lookup"]["in_flight"] == 0
+        return await call(1000)
+
+    try:
+        assert asyncio.run(run()) == {"order_id": "o1"}
+    finally:
+        executor.shutdown()
+
+
+def test_hedged_reads_cut_the_latency_tail():
+    injector = FaultInjector(slow_rate=0.3, delay=1.0, seed=1)
+    mcp = create_fault_server(injector)
+    policy = CallPolicy(hedge_after=0.05)
+
+    async def run():
+        latencies = []
+        async with CustomerServicesMCPClient(mcp, pool_size=2, policy=policy) as client:
+            for _ in range(10):
+                start = time.monotonic()
+                await client.check_product_availability("seed-101", "london")
+                latencies.append(time.monotonic() - start)
+            await asyncio.sleep(0.05)
+        return latencies
+
+    latencies = asyncio.run(run())
+    assert injector.slowed >= 2
+    assert policy.hedge_wins == injector.slowed
+    assert max(latencies) < 0.5
+    # The losing requests stopped on the server when the client closed.
+    assert injector.cancelled == injector.slowed
+
+
+def test_idempotent_tools_and_deadlines_are_shared():
+    configured = frozenset(McpClientModel().idempotent_tools)
+    assert CallPolicy().idempotent_tools == configured
+    assert HistoryCompactor().idempotent_tools == configured
+
+    async def queued():
+        scheduler = LlmScheduler(max_concurrency=1)
+        async with scheduler.slot():
+            with pytest.raises(DeadlineExceeded):
+                async with scheduler.slot(deadline=time.monotonic()):
+                    pass
+
+    asyncio.run(queued())
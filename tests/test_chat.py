@@ -0,0 +1,160 @@
+import asyncio
+import json
+from typing import AsyncGenerator
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.agent.shared_libraries.chat import chat_router
+from app.agent.shared_libraries.metrics import metrics
+
+
+def check_stock(product_id: str) -> dict:
+    """Checks the stock of a product.
+
+    Args:
+        product_id: The product to check.
+    """
+    return {"product_id": product_id, "quantity": 42}
+
+
+class ScriptedLlm(BaseLlm):
+    """Calls check_stock, then streams its answer in chunks."""
+
+    delay: float = 0.05
+    fail: bool = False
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        answered = any(
+            part.function_response
+            for content in llm_request.contents
+            for part in content.parts or []
+        )
+        if not answered:
+            call = types.FunctionCall(
+                name="check_stock", args={"product_id": "seed-101"}
+            )
+            yield LlmResponse(
+                content=types.Content(
+                    role="model", parts=[types.Part(function_call=call)]
+                )
+            )
+            return
+        chunks = ["We have ", "42 packs ", "in stock."]
+        for chunk in chunks:
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text=chunk)]),
+                partial=True,
+            )
+            await asyncio.sleep(self.delay)
+        yield LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text="".join(chunks))]
+            )
+        )
+
+
+def client(llm, session_service=None):
+    agent = LlmAgent(name="shop_agent", model=llm, tools=[check_stock])
+    runner = Runner(
+        app_name="shop",
+        agent=agent,
+        session_service=session_service or InMemorySessionService(),
+    )
+    app = FastAPI()
+    app.include_router(chat_router(runner))
+    return TestClient(app)
+
+
+def events(response):
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        kind, data = block.split("\n")
+        parsed.append(
+            (kind.removeprefix("event: "), json.loads(data.removeprefix("data: ")))
+        )
+    return parsed
+
+
+def test_chat_streams_the_turn_with_its_timings():
+    metrics.reset()
+    with client(ScriptedLlm(model="scripted")) as http:
+        response = http.post("/chat", json={"user_id": "u1", "message": "Seeds?"})
+        sent = events(response)
+        session_id = sent[-1][1]["session_id"]
+        again = http.post(
+            "/chat",
+            json={"user_id": "u1", "session_id": session_id, "message": "Thanks"},
+        )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [kind for kind, _ in sent] == [
+        "tool_call",
+        "tool_result",
+        "token",
+        "token",
+        "token",
+        "message",
+        "done",
+    ]
+    assert sent[0][1] == {"name": "check_stock", "args": {"product_id": "seed-101"}}
+    assert "".join(data["text"] for kind, data in sent if kind == "token") == (
+        "We have 42 packs in stock."
+    )
+    timings = sent[-1][1]
+    assert timings["first_tool_call_ms"] >= 50
+    assert timings["first_token_ms"] >= timings["first_tool_call_ms"] + 50
+    assert timings["turn_ms"] >= timings["first_token_ms"] + 100
+    assert events(again)[-1][1]["session_id"] == session_id
+
+    assert metrics.get("chat", "turn").calls == 2
+    assert metrics.get("chat", "time_to_first_token").calls == 2
+    assert metrics.get("chat", "time_to_first_tool_call").calls == 1
+    assert metrics.counter("chat_turns_total", outcome="ok") == 2
+
+
+def test_chat_reports_errors_as_an_event():
+    metrics.reset()
+    with client(ScriptedLlm(model="scripted", fail=True)) as http:
+        sent = events(http.post("/chat", json={"user_id": "u1", "message": "Seeds?"}))
+
+    assert [kind for kind, _ in sent] == ["error"]
+    assert sent[0][1]["message"] == "model unavailable"
+    assert sent[0][1]["first_token_ms"] is None
+    assert metrics.get("chat", "turn").errors == 1
+    assert metrics.counter("chat_turns_total", outcome="error") == 1
+
+
+def test_clients_cannot_set_the_customer_in_session_state():
+    sessions = InMemorySessionService()
+    with client(ScriptedLlm(model="scripted", delay=0), sessions) as http:
+        for key in ("customer_id", "customer_profile"):
+            response = http.post(
+                "/chat",
+                json={"user_id": "u1", "message": "Hi", "state": {key: "999"}},
+            )
+            assert response.status_code == 422
+        sent = events(
+            http.post(
+                "/chat",
+                json={"user_id": "u1", "message": "Hi", "state": {"tier": "gold"}},
+            )
+        )
+
+    session = asyncio.run(
+        sessions.get_session(
+            app_name="shop", user_id="u1", session_id=sent[-1][1]["session_id"]
+        )
+    )
+    assert session.state["customer_id"] == "u1"
+    assert session.state["tier"] == "gold"
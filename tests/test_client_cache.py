@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from mcp_server.client_cache import ToolCache
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_fetch(calls, value, delay=0.0):
+    async def fetch():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return {"value": value}
+
+    return fetch
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = ToolCache({"list": 10}, clock=clock)
+    calls = []
+
+    async def run():
+        first = await cache.get_or_call("list", (None,), counting_fetch(calls, 1))
+        assert (
+            await cache.get_or_call("list", (None,), counting_fetch(calls, 2)) is first
+        )
+        clock.now = 11
+        return await cache.get_or_call("list", (None,), counting_fetch(calls, 3))
+
+    assert asyncio.run(run()) == {"value": 3}
+    assert calls == [1, 3]
+    assert cache.stats()["methods"]["list"]["hits"] == 1
+    # Methods without a TTL are not cached.
+    asyncio.run(cache.get_or_call("cart", ("1",), counting_fetch(calls, 4)))
+    assert "cart" not in cache.stats()["methods"]
+
+
+def test_concurrent_calls_share_one_request():
+    cache = ToolCache({"list": 10})
+    calls = []
+
+    async def run():
+        fetch = counting_fetch(calls, 1, delay=0.05)
+        return await asyncio.gather(
+            *(cache.get_or_call("list", (None,), fetch) for _ in range(10))
+        )
+
+    results = asyncio.run(run())
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    stats = cache.stats()
+    assert stats["methods"]["list"] == {
+        "hits": 0,
+        "misses": 1,
+        "coalesced": 9,
+        "hit_rate": 0.9,
+    }
+
+
+def test_errors_are_shared_but_not_cached():
+    cache = ToolCache({"list": 10})
+    calls = []
+
+    async def failing():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def run():
+        results = await asyncio.gather(
+            *(cache.get_or_call("list", (), failing) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_call("list", (), failing)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_size_bound_and_invalidation_by_tag():
+    cache = ToolCache({"recs": 10}, max_size=2)
+    calls = []
+
+    async def run():
+        for customer in ["1", "2", "3"]:
+            await cache.get_or_call(
+                "recs", (customer,), counting_fetch(calls, customer), (f"c:{customer}",)
+            )
+        assert cache.stats()["evictions"] == 1
+
+        # A call in flight when its tag is invalidated is not cached.
+        flight = asyncio.ensure_future(
+            cache.get_or_call(
+                "recs", ("4",), counting_fetch(calls, "4", 0.02), ("c:4",)
+            )
+        )
+        await asyncio.sleep(0)
+        assert cache.invalidate("c:4") == 1
+        assert cache.invalidate("c:3") == 1
+        await flight
+        await cache.get_or_call("recs", ("4",), counting_fetch(calls, "4b"), ("c:4",))
+
+    asyncio.run(run())
+    assert calls == ["1", "2", "3", "4", "4b"]
+    assert cache.stats()["size"] == 2
+
+
+def test_client_caches_reads_and_invalidates_after_modify_cart():
+    from mcp_server.fast_mcp_server import mcp
+
+    cache = ToolCache(
+        {"check_product_list": 60, "get_product_recommendations": 60, "get_version": 60}
+    )
+
+    async def run():
+        async with CustomerServicesMCPClient(mcp, cache=cache) as client:
+            products = await asyncio.gather(
+                *(client.check_product_list("seeds") for _ in range(5))
+            )
+            assert all(p is products[0] for p in products)
+            assert await client.get_version() == await client.get_version()
+
+            await client.get_product_recommendations("Tomatoes", "123")
+            await client.get_product_recommendations("Tomatoes", "456")
+            await client.get_product_recommendations("Tomatoes", "123")
+            await client.modify_cart(
+                "123", items_to_add=[{"product_id": "seed-101", "quantity": 1}]
+            )
+            await client.get_product_recommendations("Tomatoes", "123")
+            await client.get_product_recommendations("Tomatoes", "456")
+
+    asyncio.run(run())
+    methods = cache.stats()["methods"]
+    assert methods["check_product_list"]["misses"] == 1
+    assert methods["check_product_list"]["coalesced"] == 4
+    assert methods["get_version"] == {
+        "hits": 1,
+        "misses": 1,
+        "coalesced": 0,
+        "hit_rate": 0.5,
+    }
+    assert methods["get_product_recommendations"]["misses"] == 3
+    assert methods["get_product_recommendations"]["hits"] == 2
+    assert cache.stats()["invalidations"] == 1
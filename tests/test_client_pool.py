@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from fastmcp import Client, FastMCP
+
+from mcp_server.client_pool import ClientPool, PoolBusy
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+
+
+def sleepy_server():
+    mcp = FastMCP("sleepy")
+    state = {"in_flight": 0, "peak": 0}
+
+    @mcp.tool
+    async def nap(seconds: float = 0.1) -> dict:
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(seconds)
+        state["in_flight"] -= 1
+        return {"slept": seconds}
+
+    return mcp, state
+
+
+def test_calls_are_spread_over_sessions_with_bounded_concurrency():
+    mcp, state = sleepy_server()
+
+    async def run():
+        async with ClientPool(mcp, size=2, max_in_flight_per_session=2) as pool:
+            results = await asyncio.gather(*(pool.call_tool("nap") for _ in range(8)))
+            return results, pool.stats()
+
+    results, stats = asyncio.run(run())
+    assert all(r.data == {"slept": 0.1} for r in results)
+    assert stats["calls"] == [4, 4]
+    assert stats["connected"] == 2
+    assert state["peak"] == 4
+
+
+def test_full_wait_queue_rejects_calls():
+    mcp, _ = sleepy_server()
+
+    async def run():
+        async with ClientPool(
+            mcp, size=1, max_in_flight_per_session=1, max_waiting=1
+        ) as pool:
+            results = await asyncio.gather(
+                *(pool.call_tool("nap") for _ in range(3)), return_exceptions=True
+            )
+            return results, pool.stats()
+
+    results, stats = asyncio.run(run())
+    assert sum(isinstance(r, PoolBusy) for r in results) == 1
+    assert stats["rejected"] == 1
+
+
+def test_dropped_sessions_reconnect():
+    mcp, _ = sleepy_server()
+    attempts = []
+
+    def flaky_client():
+        attempts.append(None)
+        if len(attempts) == 2:
+            return Client("http://127.0.0.1:9/mcp")
+        return Client(mcp)
+
+    async def run():
+        pool = ClientPool(
+            mcp, size=2, client_factory=flaky_client, reconnect_delay=0.01
+        )
+        async with pool:
+            # The second session failed to connect and is retried.
+            await pool.call_tool("nap", {"seconds": 0})
+            for _ in range(100):
+                if pool.stats()["connected"] == 2:
+                    break
+                await asyncio.sleep(0.01)
+            assert pool.stats()["reconnects"] == 1
+
+            # A session that drops is replaced; calls go to the other one.
+            await pool._connections[0].client.__aexit__(None, None, None)
+            assert (await pool.call_tool("nap", {"seconds": 0})).data
+            for _ in range(100):
+                if pool.stats()["connected"] == 2:
+                    break
+                await asyncio.sleep(0.01)
+            return pool.stats()
+
+    stats = asyncio.run(run())
+    assert stats["connected"] == 2
+    assert stats["reconnects"] == 2
+
+
+def test_pooled_customer_services_client():
+    from mcp_server.fast_mcp_server import mcp
+
+    async def run():
+        async with CustomerServicesMCPClient(mcp, pool_size=3) as client:
+            carts = await asyncio.gather(
+                *(client.access_cart_information("123") for _ in range(9))
+            )
+            return carts, client.client.stats()
+
+    carts, stats = asyncio.run(run())
+    assert all(cart["customer_id"] == "123" for cart in carts)
+    assert sum(stats["calls"]) == 9
+    assert min(stats["calls"]) > 0
+
+
+def test_closed_pool_rejects_calls():
+    mcp, _ = sleepy_server()
+
+    async def run():
+        pool = ClientPool(mcp, size=1)
+        await pool.call_tool("nap", {"seconds": 0})
+        await pool.close()
+        with pytest.raises(RuntimeError):
+            await pool.call_tool("nap", {"seconds": 0})
+
+    asyncio.run(run())
@@ -0,0 +1,160 @@
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+from pydantic import ValidationError
+
+from app.agent.config import CompactionModel
+from app.agent.shared_libraries.compaction import HistoryCompactor, estimate_tokens
+from app.agent.tools.tools import access_cart_information, check_product_list
+
+
+def user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def model(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def tool_turn(call_id, name, args, response):
+    return [
+        types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(id=call_id, name=name, args=args)
+                )
+            ],
+        ),
+        types.Content(
+            role="user",
+            parts=[
+                types.Part(
+                    function_response=types.FunctionResponse(
+                        id=call_id, name=name, response=response
+                    )
+                )
+            ],
+        ),
+    ]
+
+
+def responses(contents):
+    return [
+        part.function_response
+        for content in contents
+        for part in content.parts
+        if part.function_response
+    ]
+
+
+def conversation():
+    cart = access_cart_information("123")
+    return [
+        user("What's in my cart?"),
+        *tool_turn("c1", "access_cart_information", {"customer_id": "123"}, cart),
+        model("You have soil and seeds."),
+        user("What seeds do you sell?"),
+        *tool_turn("c2", "check_product_list", {"department": "seeds"}, check_product_list("seeds")),
+        model("We sell tomato, sunflower and petunia seeds."),
+        user("Show me all products."),
+        *tool_turn("c3", "check_product_list", {}, check_product_list()),
+        model("Here is the full catalog."),
+        user("And the seeds again?"),
+        *tool_turn("c4", "check_product_list", {"department": "seeds"}, check_product_list("seeds")),
+        model("Same three seeds."),
+        user("Check my cart again."),
+        *tool_turn("c5", "access_cart_information", {"customer_id": "123"}, cart),
+        model("Still soil and seeds."),
+    ]
+
+
+def test_superseded_results_are_stubbed_within_budget():
+    contents = conversation()
+    compacted = HistoryCompactor(token_budget=100_000).compact(contents)
+    by_id = {r.id: r.response for r in responses(compacted)}
+
+    # Only the latest cart read and the latest identical product lookup survive.
+    assert "superseded" in by_id["c1"]
+    assert "items" in by_id["c5"]
+    assert "superseded" in by_id["c2"]
+    assert "products" in by_id["c4"]
+    assert "products" in by_id["c3"]
+    # The input history is untouched.
+    assert "items" in responses(contents)[0].response
+
+
+def test_budget_shrinks_then_collapses_old_turns_but_keeps_recent_ones():
+    contents = conversation()
+    full = HistoryCompactor(token_budget=100_000).compact(contents)
+    compactor = HistoryCompactor(token_budget=estimate_tokens(full) // 3, keep_recent_turns=2)
+
+    compacted = compactor.compact(contents)
+
+    assert estimate_tokens(compacted) < estimate_tokens(full)
+    remaining = {r.id: r.response for r in responses(compacted)}
+    assert "products" in remaining["c4"]
+    assert "items" in remaining["c5"]
+    assert "c1" not in remaining
+    # Every remaining function call still has its response.
+    calls = {
+        part.function_call.id
+        for content in compacted
+        for part in content.parts
+        if part.function_call
+    }
+    assert calls == set(remaining)
+    assert compacted[-1].parts[0].text == "Still soil and seeds."
+
+
+def test_tiny_budget_drops_oldest_turns():
+    contents = conversation()
+    compacted = HistoryCompactor(token_budget=1, keep_recent_turns=1).compact(contents)
+
+    assert compacted[0].parts[0].text == "Check my cart again."
+
+
+def test_current_turn_is_kept_without_recent_turns():
+    contents = conversation()
+    compacted = HistoryCompactor(token_budget=1, keep_recent_turns=0).compact(contents)
+
+    assert compacted[0].parts[0].text == "Check my cart again."
+    with pytest.raises(ValidationError):
+        CompactionModel(keep_recent_turns=0)
+
+
+def test_tool_round_with_customer_context_keeps_the_current_turn():
+    # ADK places the customer context (the dynamic instruction) before the
+    # last run of user contents: before the question on the first model call
+    # of a turn, and between the function call and its response after that.
+    context = user("The profile of the current customer is: {...}")
+    contents = [
+        *conversation(),
+        user("What's in my cart now?"),
+        tool_turn("c6", "access_cart_information", {"customer_id": "123"}, {})[0],
+        context,
+        tool_turn("c6", "access_cart_information", {"customer_id": "123"}, {})[1],
+    ]
+
+    for keep_recent_turns in (1, 2):
+        compacted = HistoryCompactor(
+            token_budget=1, keep_recent_turns=keep_recent_turns
+        ).compact(contents)
+        if keep_recent_turns == 1:
+            assert compacted[0].parts[0].text == "What's in my cart now?"
+        else:
+            assert compacted[0].parts[0].text == "Check my cart again."
+        assert compacted[-2] is context
+        assert compacted[-3].parts[0].function_call.id == "c6"
+        assert responses(compacted)[-1].id == "c6"
+
+
+def test_callback_compacts_request_in_place():
+    request = LlmRequest(contents=conversation())
+    before = estimate_tokens(request.contents)
+
+    HistoryCompactor(token_budget=200).callback(
+        callback_context=None, llm_request=request
+    )
+
+    assert estimate_tokens(request.contents) < before
@@ -0,0 +1,26 @@
+import json
+import os
+
+from app.agent.entities.carts import CartStore, get_cart_store, set_cart_store
+from app.agent.shared_libraries.compaction import HistoryCompactor
+from eval.compaction_report import EVAL_DATA_DIR, replay_case
+
+
+def test_replay_uses_its_own_carts():
+    with open(os.path.join(EVAL_DATA_DIR, "full_conversation.test.json")) as f:
+        case = json.load(f)["eval_cases"][0]
+    store = CartStore()
+    with store.edit("123") as cart:
+        cart.append({"product_id": "kept-1", "name": "Kept", "quantity": 1})
+    set_cart_store(store)
+    try:
+        totals = replay_case(case, HistoryCompactor(token_budget=500))
+        assert get_cart_store() is store
+        assert store.get("123") == [
+            {"product_id": "kept-1", "name": "Kept", "quantity": 1}
+        ]
+    finally:
+        set_cart_store(None)
+
+    assert totals["llm_calls"] > len(case["conversation"])
+    assert 0 < totals["compacted_tokens"] <= totals["raw_tokens"]
@@ -0,0 +1,112 @@
+import asyncio
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from app.agent.prompts import STATIC_INSTRUCTION, customer_context
+from app.agent.shared_libraries.context_cache import (
+    GeminiContextCache,
+    InMemoryContextCache,
+    PromptPrefixCache,
+)
+from eval.prompt_cache_report import run_report
+
+
+class FakeContext:
+    def __init__(self, state):
+        self.state = state
+
+
+def request(system_instruction, text):
+    return LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+        config=types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            tools=[
+                types.Tool(
+                    function_declarations=[types.FunctionDeclaration(name="modify_cart")]
+                )
+            ],
+        ),
+    )
+
+
+def test_customer_data_is_not_part_of_the_static_prefix():
+    profile = '{"customer_id": "123", "customer_first_name": "Alex"}'
+
+    assert "Alex" in customer_context(FakeContext({"customer_profile": profile}))
+    assert "customer_profile" not in STATIC_INSTRUCTION.parts[0].text
+    assert "Alex" not in STATIC_INSTRUCTION.parts[0].text
+
+
+def test_cache_hit_replaces_prefix_with_cached_content():
+    cache = InMemoryContextCache()
+    prefix_cache = PromptPrefixCache(cache)
+    first = request("static instruction", "hello")
+    second = request("static instruction", "a different customer")
+    other = request("another instruction", "hello")
+
+    async def main():
+        for llm_request in (first, second, other):
+            await prefix_cache.callback(callback_context=None, llm_request=llm_request)
+
+    asyncio.run(main())
+
+    assert first.config.cached_content == second.config.cached_content
+    assert second.config.system_instruction is None
+    assert second.config.tools is None
+    assert other.config.cached_content != first.config.cached_content
+    assert len(cache.created) == 2
+    assert prefix_cache.stats.hits == 1
+
+
+def test_agent_prefix_is_stable_across_customers_and_turns():
+    report = asyncio.run(
+        run_report(["123", "456", "789"], turns=2, cache=InMemoryContextCache())
+    )
+
+    assert report["requests"] == 6
+    assert report["distinct_prefixes"] == 1
+    assert report["cache_hit_rate"] == 5 / 6
+    assert all(r["cached_content"] for r in report["per_request"])
+    assert all(r["prefix_bytes_sent"] == 0 for r in report["per_request"])
+
+
+class FakeCaches:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    async def create(self, model, config):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise RuntimeError("prefix too small")
+        return types.CachedContent(name=f"cachedContents/{self.calls}")
+
+
+class FakeClient:
+    def __init__(self, caches):
+        self.aio = type("Aio", (), {"caches": caches})()
+
+
+def test_concurrent_misses_create_one_entry_and_failures_are_not_retried():
+    fields = {"system_instruction": "instruction", "tools": []}
+
+    async def run(cache):
+        return await asyncio.gather(
+            *(cache.get_or_create("key", "gemini-2.5-flash", fields) for _ in range(5))
+        )
+
+    caches = FakeCaches()
+    results = asyncio.run(run(GeminiContextCache(FakeClient(caches))))
+    assert caches.calls == 1
+    assert {name for name, _ in results} == {"cachedContents/1"}
+
+    failing = FakeCaches(fail=True)
+    cache = GeminiContextCache(FakeClient(failing), failure_ttl_seconds=60)
+    assert asyncio.run(run(cache)) == [(None, False)] * 5
+    assert asyncio.run(run(cache)) == [(None, False)] * 5
+    # The failed create isn't retried until failure_ttl_seconds have passed.
+    assert failing.calls == 1
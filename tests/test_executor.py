@@ -0,0 +1,238 @@
+import asyncio
+import time
+
+import pytest
+
+from app.agent.shared_libraries.metrics import metrics
+from app.agent.tools.registry import ToolRegistry, registry
+from mcp_server.executor import ToolExecutor, ToolTimeout, cancellation_requested
+
+
+def slow_lookup(order_id: str) -> dict:
+    """Looks up an order in a slow backend.
+
+    Args:
+        order_id: The order to look up.
+    """
+    time.sleep(0.3)
+    return {"order_id": order_id}
+
+
+def quick_lookup(product_id: str) -> dict:
+    """Looks up a product.
+
+    Args:
+        product_id: The product to look up.
+    """
+    return {"product_id": product_id}
+
+
+def patient_lookup(order_id: str) -> dict:
+    """Looks up an order, giving up when the call is cancelled.
+
+    Args:
+        order_id: The order to look up.
+    """
+    for _ in range(300):
+        if cancellation_requested():
+            return {"order_id": order_id, "cancelled": True}
+        time.sleep(0.01)
+    return {"order_id": order_id}
+
+
+async def slow_then_quick(call):
+    """One slow call and five quick ones from concurrent clients."""
+    start = time.monotonic()
+
+    async def client(name, arguments):
+        result = await call(name, arguments)
+        return result, time.monotonic() - start
+
+    slow = client("slow_lookup", {"order_id": "o1"})
+    quick = [client("quick_lookup", {"product_id": f"p{i}"}) for i in range(5)]
+    results = await asyncio.gather(slow, *quick)
+    return results[0], results[1:]
+
+
+def test_concurrent_clients_are_not_head_of_line_blocked():
+    tools = ToolRegistry([slow_lookup, quick_lookup])
+
+    # Run on the loop, every call queues behind the slow one.
+    _, blocked = asyncio.run(slow_then_quick(tools.call))
+    assert min(latency for _, latency in blocked) > 0.2
+
+    executor = ToolExecutor(tools, thread_workers=4)
+    try:
+        (slow, slow_latency), quick = asyncio.run(slow_then_quick(executor.call))
+    finally:
+        executor.shutdown()
+    assert slow == {"order_id": "o1"}
+    assert slow_latency >= 0.3
+    assert [result for result, _ in quick] == [
+        {"product_id": f"p{i}"} for i in range(5)
+    ]
+    assert max(latency for _, latency in quick) < 0.1
+
+
+def test_per_tool_limit_and_queue_depth():
+    metrics.reset()
+    executor = ToolExecutor(
+        ToolRegistry([slow_lookup, quick_lookup]),
+        thread_workers=4,
+        tool_limits={"slow_lookup": 1},
+    )
+
+    async def run():
+        calls = [executor.call("slow_lookup", {"order_id": f"o{i}"}) for i in range(3)]
+        tasks = [asyncio.create_task(call) for call in calls]
+        await asyncio.sleep(0.05)
+        depth = metrics.gauge("tool_queue_depth", tool="slow_lookup")
+        stats = executor.stats()["tools"]["slow_lookup"]
+        # The limit doesn't hold back other tools.
+        start = time.monotonic()
+        await executor.call("quick_lookup", {"product_id": "p1"})
+        quick = time.monotonic() - start
+        await asyncio.gather(*tasks)
+        return depth, stats, quick
+
+    start = time.monotonic()
+    try:
+        depth, stats, quick = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert time.monotonic() - start >= 0.9
+    assert depth == 2
+    assert stats == {"limit": 1, "waiting": 2, "in_flight": 1}
+    assert quick < 0.1
+    assert metrics.gauge("tool_queue_depth", tool="slow_lookup") == 0
+    assert metrics.get("tool_queue", "slow_lookup").calls == 3
+
+
+def test_missing_arguments_and_unknown_tools():
+    executor = ToolExecutor(ToolRegistry([quick_lookup]), thread_workers=1)
+    try:
+        missing = asyncio.run(executor.call("quick_lookup", {}))
+        assert "mandatory input parameters" in missing["error"]
+        try:
+            asyncio.run(executor.call("nope", {}))
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("unknown tools raise KeyError")
+    finally:
+        executor.shutdown()
+
+
+def test_batch_runs_concurrently_in_order_with_per_entry_errors():
+    executor = ToolExecutor(ToolRegistry([slow_lookup, quick_lookup]), thread_workers=4)
+    calls = [
+        {"tool": "slow_lookup", "args": {"order_id": "o1"}},
+        {"tool": "slow_lookup", "args": {"order_id": "o2"}},
+        {"tool": "nope", "args": {}},
+        {"tool": "batch_call", "args": {"calls": []}},
+        {"args": {}},
+        {"tool": "quick_lookup", "args": {"product_id": "p1"}},
+    ]
+    start = time.monotonic()
+    try:
+        results = asyncio.run(executor.batch(calls))
+    finally:
+        executor.shutdown()
+    assert time.monotonic() - start < 0.55
+
+    assert [entry["ok"] for entry in results] == [True, True, False, False, False, True]
+    assert results[0]["result"] == {"order_id": "o1"}
+    assert results[1]["result"] == {"order_id": "o2"}
+    assert results[2] == {"tool": "nope", "ok": False, "error": "Tool 'nope' not found"}
+    assert results[4]["tool"] is None
+    assert results[5] == {
+        "tool": "quick_lookup",
+        "ok": True,
+        "result": {"product_id": "p1"},
+    }
+
+
+def test_batch_call_through_the_client():
+    from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+    from mcp_server.fast_mcp_server import mcp
+
+    async def run():
+        async with CustomerServicesMCPClient(mcp) as client:
+            return await client.batch(
+                [
+                    {"tool": "check_product_list", "args": {"department": "seeds"}},
+                    {"tool": "check_product_availability", "args": {}},
+                    {"tool": "access_cart_information", "args": {"customer_id": "123"}},
+                ]
+            )
+
+    products, missing, cart = asyncio.run(run())
+    assert products["department"] == "seeds"
+    assert "mandatory input parameters" in missing["error"]
+    assert "items" in cart
+
+
+def test_timed_out_calls_free_their_slot_and_count_as_abandoned():
+    metrics.reset()
+    executor = ToolExecutor(
+        ToolRegistry([slow_lookup]),
+        tool_limits={"slow_lookup": 1},
+        tool_timeouts={"slow_lookup": 0.05},
+    )
+
+    async def run():
+        start = time.monotonic()
+        with pytest.raises(ToolTimeout):
+            await executor.call("slow_lookup", {"order_id": "o1"})
+        elapsed = time.monotonic() - start
+        stats = executor.stats()
+        await asyncio.sleep(0.35)
+        return elapsed, stats, executor.stats()["pools"]["thread"]
+
+    try:
+        elapsed, during, after = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert elapsed < 0.2
+    assert during["tools"]["slow_lookup"]["in_flight"] == 0
+    assert during["pools"]["thread"]["abandoned"] == 1
+    assert after == {"workers": 8, "outstanding": 0, "abandoned": 0}
+    assert (
+        metrics.counter("tool_timeouts_total", tool="slow_lookup", limit="timeout") == 1
+    )
+
+
+def test_cancelled_calls_are_stopped_cooperatively():
+    metrics.reset()
+    executor = ToolExecutor(
+        ToolRegistry([patient_lookup, quick_lookup]), thread_workers=1
+    )
+
+    async def run():
+        call = asyncio.create_task(executor.call("patient_lookup", {"order_id": "o1"}))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        # The only worker is soon free for the next call.
+        start = time.monotonic()
+        await executor.call("quick_lookup", {"product_id": "p1"})
+        return time.monotonic() - start
+
+    try:
+        elapsed = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert elapsed < 0.2
+    assert metrics.counter("tool_cancelled_total", tool="patient_lookup") == 1
+    assert metrics.gauge("tool_pool_abandoned", pool="thread") == 0
+
+
+def test_only_stateless_tools_run_on_the_process_pool():
+    executor = ToolExecutor(
+        registry, process_workers=1, process_tools=["get_product_recommendations"]
+    )
+    assert executor.process_tools == {"get_product_recommendations"}
+
+    with pytest.raises(ValueError, match="modify_cart"):
+        ToolExecutor(registry, process_workers=1, process_tools=["modify_cart"])
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from google.adk.tools.function_tool import FunctionTool
+
+from app.agent.shared_libraries.metrics import Histogram, MetricsRegistry, metrics
+from app.agent.tools.tools import check_product_list, modify_cart
+
+
+def test_histogram_quantiles_use_bucket_upper_bounds():
+    histogram = Histogram((0.001, 0.01, 0.1))
+    for _ in range(98):
+        histogram.observe(0.0005)
+    histogram.observe(0.05)
+    histogram.observe(5.0)
+
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.001
+    assert histogram.quantile(0.99) == 0.1
+    assert histogram.quantile(1.0) == float("inf")
+    assert histogram.cumulative()[-1] == (float("inf"), 100)
+
+
+def test_instrument_records_calls_errors_and_payload():
+    registry = MetricsRegistry(payload_sample_rate=1.0)
+
+    @registry.instrument("tool")
+    def echo(value):
+        if value is None:
+            raise ValueError("boom")
+        return {"value": value}
+
+    echo("abc")
+    with pytest.raises(ValueError):
+        echo(None)
+
+    stats = registry.get("tool", "echo")
+    assert stats.calls == 2
+    assert stats.errors == 1
+    assert stats.latency.count == 2
+    assert stats.payload.count == 1
+    assert stats.payload.total == len('{"value":"abc"}')
+
+
+def test_payload_sizes_are_only_serialised_when_sampled():
+    registry = MetricsRegistry(payload_sample_rate=0.0)
+
+    @registry.instrument("tool")
+    def lookup(value):
+        return {"value": value}
+
+    @registry.instrument("tool")
+    def render(value):
+        return value
+
+    lookup("abc")
+    render("abc")
+
+    assert registry.get("tool", "lookup").payload.count == 0
+    # Already serialised results are measured without serialising them.
+    assert registry.get("tool", "render").payload.total == 3
+
+
+def test_instrument_supports_coroutines():
+    registry = MetricsRegistry()
+
+    @registry.instrument("callback", name="before_model")
+    async def callback():
+        await asyncio.sleep(0)
+
+    asyncio.run(callback())
+
+    stats = registry.get("callback", "before_model")
+    assert stats.calls == 1
+    assert stats.payload.count == 0
+
+
+def test_instrumented_tools_keep_their_declarations():
+    declaration = FunctionTool(modify_cart)._get_declaration()
+
+    assert declaration.name == "modify_cart"
+    assert set(declaration.parameters.properties) == {
+        "customer_id",
+        "items_to_add",
+        "items_to_remove",
+    }
+    assert "shopping cart" in declaration.description
+
+
+def test_tool_calls_are_recorded_in_process_registry():
+    before = metrics.get("tool", "check_product_list")
+    before_calls = before.calls if before else 0
+
+    check_product_list("seeds")
+
+    assert metrics.get("tool", "check_product_list").calls == before_calls + 1
+
+
+def test_render_prometheus():
+    registry = MetricsRegistry()
+    registry.record("tool", "modify_cart", 0.002, payload_bytes=300)
+    registry.increment("requests", status="ok")
+    registry.set_gauge("queue_depth", 3, tool="modify_cart")
+
+    text = registry.render_prometheus()
+
+    assert (
+        'customer_services_latency_seconds_bucket{kind="tool",name="modify_cart",le="0.0025"} 1'
+        in text
+    )
+    assert 'customer_services_calls_total{kind="tool",name="modify_cart"} 1' in text
+    assert 'customer_services_requests{status="ok"} 1' in text
+    assert 'customer_services_queue_depth{tool="modify_cart"} 3' in text
+    lines = text.splitlines()
+    for metric, metric_type in (
+        ("customer_services_requests", "counter"),
+        ("customer_services_queue_depth", "gauge"),
+    ):
+        type_line = lines.index(f"# TYPE {metric} {metric_type}")
+        assert lines[type_line + 1].startswith(metric + "{")
+
+
+def test_render_prometheus_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.record("tool", 'say "hi"\\now', 0.001)
+    registry.increment("tool_errors_total", error='bad "input"\nat line 2')
+
+    text = registry.render_prometheus()
+
+    assert 'name="say \\"hi\\"\\\\now"' in text
+    assert 'error="bad \\"input\\"\\nat line 2"' in text
+    # Every sample is still on one line.
+    assert all(
+        line.startswith("#") or line.startswith("customer_services_")
+        for line in text.splitlines()
+    )
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+from fastmcp import FastMCP
+
+from app.agent.entities.customer import Purchase
+from app.agent.entities.repository import DEFAULT_FIXTURE, CustomerRepository
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+from mcp_server.profiles import ProfileHub, etag
+
+CLIENTS = 20
+
+
+def profile_server(repo):
+    hub = ProfileHub(repo)
+    mcp = FastMCP("profiles")
+    hub.register(mcp._mcp_server)
+
+    @mcp.resource("users://{user_id}/profile", mime_type="application/json")
+    def get_profile(user_id: str):
+        return hub.read(user_id)
+
+    return mcp, hub
+
+
+def counting_repository(tmp_path):
+    repo = CustomerRepository(str(tmp_path / "customers.db"))
+    repo.load_fixture(DEFAULT_FIXTURE)
+    repo.lookups = 0
+    get_view = repo.get_view
+
+    def counted(customer_id):
+        repo.lookups += 1
+        return get_view(customer_id)
+
+    repo.get_view = counted
+    return repo
+
+
+def test_read_is_cached_and_versioned(tmp_path):
+    repo = counting_repository(tmp_path)
+    hub = ProfileHub(repo)
+
+    first = json.loads(hub.read("789"))
+    assert json.loads(hub.read("789")) == first
+    assert repo.lookups == 1
+    assert first["version"] == 1
+    assert first["etag"] == etag(repo.get_view("789").to_json())
+    assert first["profile"]["customer_id"] == "789"
+    assert hub.read("nobody") is None
+
+    repo.add_purchase("789", Purchase(date="2024-06-01", items=[], total_amount=9.99))
+    second = json.loads(hub.read("789"))
+    assert second["version"] == 2
+    assert second["etag"] != first["etag"]
+    assert second["profile"]["loyalty_points"] > first["profile"]["loyalty_points"]
+
+
+def test_subscribers_see_one_change_in_one_fan_out(tmp_path):
+    repo = counting_repository(tmp_path)
+    mcp, hub = profile_server(repo)
+
+    async def run():
+        clients = [CustomerServicesMCPClient(mcp) for _ in range(CLIENTS)]
+        for client in clients:
+            await client.__aenter__()
+        try:
+            assert clients[0].client.initialize_result.capabilities.resources.subscribe
+            for client in clients:
+                await client.subscribe_profile("789")
+            before = await asyncio.gather(*(c.get_user_profile("789") for c in clients))
+            assert {p["version"] for p in before} == {1}
+            assert hub.subscriber_count("users://789/profile") == CLIENTS
+
+            # Reads while subscribed don't go back to the server.
+            await asyncio.gather(*(c.get_user_profile("789") for c in clients))
+            lookups = repo.lookups
+
+            purchase = Purchase(date="2024-06-01", items=[], total_amount=9.99)
+            await asyncio.to_thread(repo.add_purchase, "789", purchase)
+            for _ in range(100):
+                if all(c.profile_updates for c in clients):
+                    break
+                await asyncio.sleep(0.01)
+            after = await asyncio.gather(*(c.get_user_profile("789") for c in clients))
+            return before, after, lookups
+        finally:
+            for client in clients:
+                await client.__aexit__(None, None, None)
+
+    before, after, lookups = asyncio.run(run())
+    assert lookups == 1
+    assert hub.fanouts == 1
+    assert hub.notifications == CLIENTS
+    # Every client re-read once, served from one repository lookup.
+    assert repo.lookups == lookups + 1
+    assert {p["version"] for p in after} == {2}
+    assert {p["etag"] for p in after} != {before[0]["etag"]}
+
+
+def test_unsubscribed_sessions_are_not_notified(tmp_path):
+    repo = counting_repository(tmp_path)
+    mcp, hub = profile_server(repo)
+
+    async def run():
+        async with CustomerServicesMCPClient(mcp) as client:
+            await client.subscribe_profile("123")
+            await client.unsubscribe_profile("123")
+            repo.add_purchase("123", Purchase(date="2024-06-01", items=[], total_amount=1))
+            await asyncio.sleep(0.05)
+            return client.profile_updates
+
+    assert asyncio.run(run()) == 0
+    assert hub.fanouts == 0
+    assert hub.subscriber_count() == 0
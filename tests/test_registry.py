@@ -0,0 +1,94 @@
+import asyncio
+
+from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.mcp_tool.conversion_utils import adk_to_mcp_tool_type
+from mcp import types as mcp_types
+
+from app.agent.agent import root_agent
+from app.agent.tools.registry import RegisteredTool, ToolRegistry, registry
+from app.agent.tools.tools import check_product_availability
+from mcp_server.fast_mcp_server import mcp
+from mcp_server.server import create_mcp_server
+
+
+def test_agent_and_both_servers_share_the_registry():
+    names = list(registry)
+
+    assert [tool.name for tool in root_agent.tools] == names
+    # The MCP servers add batch_call and stream_call on top of the shared tools.
+    names += ["batch_call", "stream_call"]
+    assert sorted(asyncio.run(mcp.get_tools())) == sorted(names)
+
+    server = create_mcp_server()
+    handler = server.request_handlers[mcp_types.ListToolsRequest]
+    listed = asyncio.run(handler(mcp_types.ListToolsRequest(method="tools/list")))
+    assert [tool.name for tool in listed.root.tools] == names
+
+
+def test_declarations_and_schemas_match_function_tool_and_are_cached():
+    for name in registry:
+        tool = registry.get(name)
+        assert tool._get_declaration() == FunctionTool(tool.func)._get_declaration()
+        assert tool._get_declaration() is tool._get_declaration()
+    expected = [adk_to_mcp_tool_type(FunctionTool(f)) for f in registry.functions]
+    assert registry.mcp_tools() == expected
+    assert registry.mcp_tools() is registry.mcp_tools()
+
+
+def test_dispatch():
+    result = asyncio.run(
+        registry.call(
+            "check_product_availability",
+            {"product_id": "seed-101", "store_id": "london", "ignored": 1},
+        )
+    )
+    assert result["product_id"] == "seed-101"
+
+    missing = asyncio.run(registry.call("check_product_availability", {}))
+    assert "mandatory input parameters" in missing["error"]
+
+    try:
+        asyncio.run(registry.call("nope", {}))
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("unknown tools raise KeyError")
+
+
+def test_duplicate_registration_is_rejected():
+    local = ToolRegistry([check_product_availability])
+    try:
+        local.register(check_product_availability)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("duplicate names are rejected")
+
+
+class FakeToolContext:
+    def __init__(self, tool_confirmation=None):
+        self.tool_confirmation = tool_confirmation
+        self.hints = []
+
+    def request_confirmation(self, hint=None, payload=None):
+        self.hints.append(hint)
+
+
+def test_calls_keep_function_tool_confirmation_and_context():
+    def remove_item(product_id: str, tool_context) -> dict:
+        """Removes an item."""
+        return {"removed": product_id, "context": tool_context}
+
+    tool = RegisteredTool(remove_item, require_confirmation=True)
+    context = FakeToolContext()
+    result = asyncio.run(
+        tool.run_async(args={"product_id": "seed-101"}, tool_context=context)
+    )
+    assert "requires confirmation" in result["error"]
+    assert len(context.hints) == 1
+
+    confirmed = FakeToolContext(tool_confirmation=type("C", (), {"confirmed": True}))
+    result = asyncio.run(
+        tool.run_async(args={"product_id": "seed-101"}, tool_context=confirmed)
+    )
+    assert result == {"removed": "seed-101", "context": confirmed}
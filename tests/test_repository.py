@@ -0,0 +1,191 @@
+import json
+import multiprocessing
+import threading
+
+from app.agent.entities.customer import Customer, Purchase
+from app.agent.entities.repository import (
+    DEFAULT_FIXTURE,
+    CustomerRepository,
+    LRUCache,
+    set_repository,
+)
+from app.agent.shared_libraries.callbacks import (
+    ANONYMOUS_PROFILE,
+    before_agent,
+    validate_customer_id,
+)
+from app.agent.tools.tools import get_purchase_history
+
+
+def repository(tmp_path, cache_size=10):
+    repo = CustomerRepository(str(tmp_path / "customers.db"), cache_size=cache_size)
+    repo.load_fixture(DEFAULT_FIXTURE)
+    return repo
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+
+
+def test_get_and_get_many(tmp_path):
+    repo = repository(tmp_path)
+
+    assert repo.get("123").customer_first_name == "Alex"
+    assert repo.get("456").customer_first_name == "Priya"
+    assert repo.get("missing") is None
+    found = repo.get_many(["123", "789", "missing", "123"])
+    assert set(found) == {"123", "789"}
+    # The second lookup of 123 is served from the cache.
+    assert repo.get("123") is found["123"]
+
+
+def test_jsonl_fixture_and_upsert_invalidate_cache(tmp_path):
+    fixture = tmp_path / "customers.jsonl"
+    with open(DEFAULT_FIXTURE) as f:
+        base = json.load(f)[0]
+    with open(fixture, "w") as f:
+        for i in range(2000):
+            f.write(json.dumps({**base, "customer_id": f"c{i}"}) + "\n")
+    repo = CustomerRepository(cache_size=100)
+
+    assert repo.load_fixture(str(fixture)) == 2000
+    assert len(repo.get_many(f"c{i}" for i in range(2000))) == 2000
+    assert len(repo.cache) == 100
+
+    repo.get("c1")
+    repo.upsert(repo.get("c1").model_copy(update={"loyalty_points": 1}))
+    assert repo.get("c1").loyalty_points == 1
+
+
+class FakeCallbackContext:
+    def __init__(self, state):
+        self.state = state
+
+
+def test_before_agent_and_validation_use_repository(tmp_path):
+    set_repository(repository(tmp_path))
+    try:
+        context = FakeCallbackContext({"customer_id": "456"})
+        before_agent(context)
+        assert context.state["customer_id"] == "456"
+        assert Customer.model_validate_json(context.state["customer_profile"]).email == (
+            "priya.shah@example.com"
+        )
+        assert validate_customer_id("456", context.state) == (True, None)
+        assert validate_customer_id("123", context.state)[0] is False
+
+        for state in ({}, {"customer_id": "unknown"}):
+            anonymous = FakeCallbackContext(state)
+            before_agent(anonymous)
+            assert anonymous.state["customer_profile"] == ANONYMOUS_PROFILE
+            assert validate_customer_id("123", anonymous.state) == (
+                False,
+                "No customer profile selected. Please select a profile.",
+            )
+    finally:
+        set_repository(None)
+
+
+def test_purchase_history_is_summarised_and_paged(tmp_path):
+    repo = repository(tmp_path)
+    summary = repo.get("789").purchase_summary
+
+    assert summary.order_count == 3
+    assert summary.last_order_date == "2024-02-14"
+    assert [p.date for p in summary.recent_orders] == [
+        "2024-02-14",
+        "2023-06-30",
+        "2022-03-11",
+    ]
+    assert summary.category_spend["tools"] == 34.99
+    assert "purchase_history" not in repo.get("789").to_json()
+
+    first, cursor = repo.get_purchases("789", page_size=2)
+    rest, end = repo.get_purchases("789", cursor, page_size=2)
+    assert [p.date for p in first + rest] == ["2024-02-14", "2023-06-30", "2022-03-11"]
+    assert end is None
+
+    purchase = Purchase(date="2024-06-01", items=[], total_amount=9.99)
+    assert repo.add_purchase("789", purchase).purchase_summary.order_count == 4
+    assert repo.get("789").purchase_summary.recent_orders[0] == purchase
+    assert repo.get_purchases("789", page_size=1)[0] == [purchase]
+
+
+def add_purchases(path, times):
+    repo = CustomerRepository(path)
+    for _ in range(times):
+        repo.add_purchase("789", Purchase(date="2024-06-01", items=[], total_amount=1))
+
+
+def test_purchases_from_several_workers_are_not_lost(tmp_path):
+    repo = repository(tmp_path)
+    cached = repo.get("789")
+    path = str(tmp_path / "customers.db")
+
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=add_purchases, args=(path, 10)) for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    # The cached profile is dropped after the other processes' writes.
+    customer = repo.get("789")
+    assert customer is not cached
+    assert customer.purchase_summary.order_count == 43
+    assert repo.get_analytics("789").order_count == 43
+    assert customer.loyalty_points == repo.get_analytics("789").loyalty_points_balance
+
+
+def test_read_racing_a_write_does_not_cache_the_old_row(tmp_path, monkeypatch):
+    repo = repository(tmp_path)
+    loaded, written = threading.Event(), threading.Event()
+    decode = Customer.model_validate_json
+
+    def slow_decode(data):
+        # The reader has run its SELECT; the write commits before it decodes.
+        if threading.current_thread().name == "reader":
+            loaded.set()
+            written.wait(10)
+        return decode(data)
+
+    monkeypatch.setattr(Customer, "model_validate_json", slow_decode)
+    results = []
+    reader = threading.Thread(
+        target=lambda: results.append(repo.get("789")), name="reader"
+    )
+    reader.start()
+    assert loaded.wait(10)
+    repo.add_purchase("789", Purchase(date="2024-06-01", items=[], total_amount=1))
+    written.set()
+    reader.join(10)
+
+    assert results[0].purchase_summary.order_count == 3
+    assert repo.get("789").purchase_summary.order_count == 4
+
+
+def test_get_purchase_history_tool(tmp_path):
+    set_repository(repository(tmp_path))
+    try:
+        page = get_purchase_history("123", page_size=2)
+        assert page["order_count"] == 3
+        assert len(page["purchases"]) == 2
+        last = get_purchase_history("123", cursor=page["next_cursor"])
+        assert len(last["purchases"]) == 1
+        assert last["next_cursor"] is None
+        assert get_purchase_history("missing")["status"] == "error"
+        bad = get_purchase_history("123", cursor="abc")
+        assert bad == {"status": "error", "message": "Invalid cursor 'abc'"}
+    finally:
+        set_repository(None)
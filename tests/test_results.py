@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+from mcp import types as mcp_types
+
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+from mcp_server.results import DeferredResult, MalformedResult, ProductList, decode
+
+CATALOG = {
+    "department": "all",
+    "total_products": 2,
+    "products": [
+        {"product_id": "tool-001", "name": "Hand Trowel", "price": 12.99},
+        {"product_id": "seed-101", "name": "Tomato Seeds", "price": 3.99},
+    ],
+}
+
+
+def tool_result(payload, structured=False):
+    text = payload if isinstance(payload, str) else json.dumps(payload)
+    return mcp_types.CallToolResult(
+        content=[mcp_types.TextContent(type="text", text=text)],
+        structuredContent=payload if structured else None,
+    )
+
+
+def test_structured_content_is_used_as_is():
+    result = tool_result(CATALOG, structured=True)
+    assert decode(result, ProductList) is result.structuredContent
+
+
+def test_text_is_decoded_on_first_access():
+    deferred = decode(tool_result(CATALOG), ProductList)
+    assert isinstance(deferred, DeferredResult)
+    assert not deferred.decoded
+    assert deferred["total_products"] == 2
+    assert deferred.decoded
+    assert deferred == CATALOG
+    assert "error" not in deferred
+
+
+def test_malformed_payloads():
+    # The lenient mode keeps the old fallback.
+    assert dict(decode(tool_result("not json"))) == {"raw_result": "not json"}
+
+    with pytest.raises(MalformedResult):
+        decode(tool_result("not json"), ProductList, strict=True)
+    with pytest.raises(MalformedResult):
+        decode(tool_result([1, 2]), ProductList, strict=True)
+    with pytest.raises(MalformedResult):
+        decode(
+            tool_result({**CATALOG, "total_products": "2"}), ProductList, strict=True
+        )
+    with pytest.raises(MalformedResult):
+        decode(tool_result({"department": "all"}), ProductList, strict=True)
+
+    error = {"error": "No products found", "products": []}
+    assert decode(tool_result(error), ProductList, strict=True) == error
+    extra = {**CATALOG, "currency": "GBP"}
+    assert decode(tool_result(extra), ProductList, strict=True) == extra
+
+
+def test_strict_client_accepts_every_tool_result():
+    from mcp_server.fast_mcp_server import mcp
+
+    async def run():
+        async with CustomerServicesMCPClient(mcp, strict=True) as client:
+            results = [
+                await client.check_product_list(),
+                await client.check_product_list("seeds"),
+                await client.get_product_recommendations("Tomatoes", "123"),
+                await client.get_product_recommendations("cactus", "456"),
+                await client.check_product_availability("seed-101", "london"),
+                await client.check_product_availability("nope", "london"),
+                await client.access_cart_information("123"),
+                await client.modify_cart(
+                    "123", items_to_add=[{"product_id": "tool-001", "quantity": 1}]
+                ),
+                await client.get_purchase_history("123", page_size=2),
+                await client.get_purchase_analytics("123"),
+                await client.get_customer_analytics("123"),
+                await client.get_user_profile("123"),
+            ]
+            return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, dict) for result in results)
+    assert results[1]["department"] == "seeds"
+    assert results[5]["error"]
+    assert results[-1]["profile"]["customer_id"] == "123"
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+from app.agent.entities.repository import CustomerRepository, DEFAULT_FIXTURE
+from app.agent.entities.segments import (
+    FEATURE_DIM,
+    FEATURE_NAMES,
+    SegmentIndex,
+    customer_features,
+    kmeans,
+    set_segment_index,
+)
+from app.agent.tools.tools import get_product_recommendations
+
+
+def customers():
+    repo = CustomerRepository()
+    repo.load_fixture(DEFAULT_FIXTURE)
+    return list(repo.iter_customers(batch_size=3))
+
+
+def test_customer_features():
+    alex = next(c for c in customers() if c.customer_id == "123")
+    vector = dict(zip(FEATURE_NAMES, customer_features(alex)))
+
+    assert len(customer_features(alex)) == FEATURE_DIM
+    assert vector["type:backyard"] == 1.0
+    assert vector["size"] == 0.5
+    assert vector["interest:vegetables"] == 1.0
+    assert vector["interest:herbs"] == 0.0
+    assert 0 < vector["spend:fertilizer"] < 1
+    assert sum(v for k, v in vector.items() if k.startswith("spend:")) <= 1.0001
+
+
+def test_kmeans_separates_clusters():
+    rng = np.random.default_rng(0)
+    x = np.vstack([rng.normal(0, 0.1, (50, 2)), rng.normal(5, 0.1, (50, 2))])
+
+    _, labels = kmeans(x.astype(np.float32), 2)
+
+    assert len(set(labels[:50])) == 1
+    assert len(set(labels[50:])) == 1
+    assert labels[0] != labels[-1]
+
+
+def test_index_lookups_and_round_trip(tmp_path):
+    index = SegmentIndex.build(customers(), n_segments=2)
+
+    assert len(index) == 4
+    assert index.segment("missing") is None
+    neighbours = index.nearest("123", k=5, within_segment=False)
+    assert [n for n, _ in neighbours if n == "123"] == []
+    assert len(neighbours) == 3
+    assert [s for _, s in neighbours] == sorted((s for _, s in neighbours), reverse=True)
+    assert sum(index.profile(s)["size"] for s in range(2)) == 4
+
+    for name in ("segments.npz", "segments"):
+        path = str(tmp_path / name)
+        index.save(path)
+        loaded = SegmentIndex.load(path)
+        assert loaded.segment("456") == index.segment("456")
+        assert np.array_equal(loaded.vector("789"), index.vector("789"))
+    assert sorted(os.listdir(tmp_path)) == ["segments", "segments.npz"]
+
+
+def test_recommendations_name_the_customer_segment():
+    index = SegmentIndex.build(customers(), n_segments=2)
+    set_segment_index(index)
+    try:
+        result = get_product_recommendations("tomatoes", "789")
+        assert result["customer_segment"] == index.profile(index.segment("789"))
+        assert "customer_segment" not in get_product_recommendations("tomatoes", "x")
+    finally:
+        set_segment_index(None)
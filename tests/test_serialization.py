@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+import json
+import logging
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from mcp_server.serialization import (
+    PydanticSerializer,
+    SampledLogger,
+    Serializer,
+    build_serializer,
+)
+from mcp_server.server import create_mcp_server
+
+RESULT = {
+    "customer_id": "123",
+    "total": 12.5,
+    "in_stock": True,
+    "note": None,
+    "name": "Pruning Shears – bypass",
+    "items": [{"product_id": "seed-101", "quantity": 2}],
+    "date": datetime.date(2024, 1, 20),
+}
+
+
+@pytest.mark.parametrize("name", ["json", "pydantic", "auto"])
+def test_serializers_agree(name):
+    serializer = build_serializer(name)
+    decoded = json.loads(serializer.dumps(RESULT))
+    assert decoded == {**RESULT, "date": "2024-01-20"}
+
+
+def test_unknown_serializer():
+    with pytest.raises(ValueError):
+        build_serializer("yaml")
+
+
+def test_stdio_server_returns_structured_content_and_keeps_stdout_clean(capsys):
+    async def run():
+        server = create_mcp_server(serializer=PydanticSerializer())
+        async with create_connected_server_and_client_session(server) as session:
+            return await session.call_tool(
+                "check_product_availability",
+                {"product_id": "seed-101", "store_id": "london"},
+            )
+
+    result = asyncio.run(run())
+    assert result.structuredContent["product_id"] == "seed-101"
+    assert json.loads(result.content[0].text) == result.structuredContent
+    assert capsys.readouterr().out == ""
+
+
+def test_sampled_logger(caplog):
+    log = logging.getLogger("tests.sampled")
+    sampled = SampledLogger(log, sample_rate=1.0, max_per_second=3, max_chars=10)
+
+    with caplog.at_level(logging.INFO, logger="tests.sampled"):
+        assert not sampled.debug("result %s", "x")
+    assert sampled.suppressed == 0
+
+    with caplog.at_level(logging.DEBUG, logger="tests.sampled"):
+        logged = [sampled.debug("result %s", "y" * 50) for _ in range(10)]
+    assert logged.count(True) == 3
+    assert sampled.suppressed == 7
+    assert caplog.records[0].getMessage() == "result yyyyyyyyyy... (50 chars)"
+
+    never = SampledLogger(log, sample_rate=0.0)
+    with caplog.at_level(logging.DEBUG, logger="tests.sampled"):
+        assert not never.debug("result %s", "z")
+
+
+def test_base_serializer_is_compact():
+    assert Serializer().dumps({"a": [1, 2]}) == '{"a":[1,2]}'
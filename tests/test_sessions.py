@@ -0,0 +1,234 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from google.adk.cli.fast_api import get_fast_api_app
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai import types
+
+from app.agent.shared_libraries.sessions import (
+    SqliteSessionService,
+    default_session_service,
+    session_lifespan,
+)
+
+APP = "customer_services_app"
+
+
+def text_event(author, text, **state_delta):
+    return Event(
+        invocation_id="i",
+        author=author,
+        content=types.Content(
+            role="user" if author == "user" else "model", parts=[types.Part(text=text)]
+        ),
+        actions=EventActions(state_delta=state_delta),
+    )
+
+
+def tool_events(name):
+    call = Event(
+        invocation_id="i",
+        author="root_agent",
+        content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(name=name, args={}))],
+        ),
+    )
+    response = Event(
+        invocation_id="i",
+        author="root_agent",
+        content=types.Content(
+            role="user",
+            parts=[
+                types.Part(
+                    function_response=types.FunctionResponse(
+                        name=name, response={"ok": True}
+                    )
+                )
+            ],
+        ),
+    )
+    return [call, response]
+
+
+async def add_turn(service, session, i, tools=1):
+    await service.append_event(session, text_event("user", f"question {i}"))
+    for _ in range(tools):
+        for event in tool_events("check_product_list"):
+            await service.append_event(session, event)
+    await service.append_event(session, text_event("root_agent", f"answer {i}"))
+
+
+def test_sessions_survive_a_restart_with_their_state(tmp_path):
+    path = str(tmp_path / "sessions.db")
+
+    async def write():
+        service = SqliteSessionService(path)
+        session = await service.create_session(
+            app_name=APP,
+            user_id="u1",
+            state={"customer_id": "123", "user:tier": "gold", "temp:x": 1},
+        )
+        await add_turn(service, session, 0)
+        await service.append_event(
+            session, text_event("root_agent", "noted", **{"app:promo": "spring"})
+        )
+        other = await service.create_session(app_name=APP, user_id="u1")
+        service.close()
+        return session, other
+
+    async def read(session_id):
+        service = SqliteSessionService(path)
+        session = await service.get_session(
+            app_name=APP, user_id="u1", session_id=session_id
+        )
+        listed = await service.list_sessions(app_name=APP, user_id="u1")
+        recent = await service.get_session(
+            app_name=APP,
+            user_id="u1",
+            session_id=session_id,
+            config=GetSessionConfig(num_recent_events=2),
+        )
+        await service.delete_session(app_name=APP, user_id="u1", session_id=session_id)
+        deleted = await service.get_session(
+            app_name=APP, user_id="u1", session_id=session_id
+        )
+        return session, listed, recent, deleted
+
+    written, other = asyncio.run(write())
+    session, listed, recent, deleted = asyncio.run(read(written.id))
+
+    assert [event.id for event in session.events] == [
+        event.id for event in written.events
+    ]
+    assert session.events[1].get_function_calls()[0].name == "check_product_list"
+    assert session.state == {
+        "customer_id": "123",
+        "user:tier": "gold",
+        "app:promo": "spring",
+    }
+    assert {s.id for s in listed.sessions} == {written.id, other.id}
+    assert all(s.state["user:tier"] == "gold" for s in listed.sessions)
+    assert [e.content.parts[0].text for e in recent.events] == ["answer 0", "noted"]
+    assert deleted is None
+
+
+def test_events_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    service = SqliteSessionService(path, batch_size=4, flush_interval=10.0)
+    reader = SqliteSessionService(path)
+
+    async def stored(session):
+        found = await reader.get_session(
+            app_name=APP, user_id="u1", session_id=session.id
+        )
+        return len(found.events)
+
+    async def run():
+        session = await service.create_session(app_name=APP, user_id="u1")
+        await service.append_event(session, text_event("user", "hi"))
+        await service.append_event(session, tool_events("check_product_list")[0])
+        counts = [await stored(session)]
+        # The agent's answer ends the turn.
+        await service.append_event(session, tool_events("check_product_list")[1])
+        await service.append_event(session, text_event("root_agent", "hello"))
+        counts.append(await stored(session))
+        for i in range(4):
+            await service.append_event(session, text_event("user", f"more {i}"))
+        counts.append(await stored(session))
+        await service.append_event(session, text_event("user", "pending"))
+        # Reads through the writing service see buffered events.
+        own = await service.get_session(
+            app_name=APP, user_id="u1", session_id=session.id
+        )
+        counts.append(len(own.events))
+        return counts
+
+    assert asyncio.run(run()) == [0, 4, 8, 9]
+
+
+def test_long_sessions_are_compacted(tmp_path):
+    service = SqliteSessionService(
+        str(tmp_path / "sessions.db"), compact_after_events=40, keep_recent_turns=2
+    )
+
+    async def run():
+        session = await service.create_session(app_name=APP, user_id="u1")
+        for i in range(8):
+            await add_turn(service, session, i, tools=2)
+        return await service.get_session(
+            app_name=APP, user_id="u1", session_id=session.id
+        )
+
+    session = asyncio.run(run())
+    texts = [e.content.parts[0].text for e in session.events]
+    # Compacted after turn 6, at 42 events: turns 0-4 lost their tool calls,
+    # then turn 0 was dropped to get down to 20 events. Turn 7 came after.
+    assert len(session.events) == 26
+    assert texts[:8] == [
+        f"{kind} {i}" for i in range(1, 5) for kind in ("question", "answer")
+    ]
+    recent = session.events[-12:]
+    assert [e.content.parts[0].text for e in recent[::6]] == [
+        "question 6",
+        "question 7",
+    ]
+    assert len([e for e in recent if e.get_function_calls()]) == 4
+
+
+def test_fast_api_app_uses_the_session_service(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    agents_dir = tmp_path / "agents"
+    agents_dir.mkdir()
+    service = SqliteSessionService(path)
+    with default_session_service(service):
+        app = get_fast_api_app(agents_dir=str(agents_dir), web=False)
+
+    with TestClient(app) as client:
+        response = client.post(
+            f"/apps/{APP}/users/u1/sessions", json={"state": {"customer_id": "123"}}
+        )
+        session_id = response.json()["id"]
+
+    stored = asyncio.run(
+        SqliteSessionService(path).get_session(
+            app_name=APP, user_id="u1", session_id=session_id
+        )
+    )
+    assert stored.state == {"customer_id": "123"}
+
+
+def test_buffered_events_are_written_when_the_server_stops(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    agents_dir = tmp_path / "agents"
+    agents_dir.mkdir()
+    service = SqliteSessionService(path, batch_size=100, flush_interval=60.0)
+    # Nothing is opened until the service is used, e.g. in a forked worker.
+    assert service._conn is None
+    with default_session_service(service):
+        app = get_fast_api_app(
+            agents_dir=str(agents_dir), web=False, lifespan=session_lifespan(service)
+        )
+
+    with TestClient(app) as client:
+        session_id = client.post(f"/apps/{APP}/users/u1/sessions").json()["id"]
+
+        async def append():
+            session = await service.get_session(
+                app_name=APP, user_id="u1", session_id=session_id
+            )
+            await service.append_event(session, text_event("user", "hi"))
+
+        client.portal.call(append)
+        assert service._pending
+
+    # Closed on shutdown, after writing the buffer.
+    assert service._conn is None
+    assert not service._pending
+    stored = asyncio.run(
+        SqliteSessionService(path).get_session(
+            app_name=APP, user_id="u1", session_id=session_id
+        )
+    )
+    assert [e.content.parts[0].text for e in stored.events] == ["hi"]
@@ -0,0 +1,37 @@
+import json
+import subprocess
+import sys
+
+# Modules used without the agent, e.g. by the MCP client, the repository
+# tooling and most tests.
+LIGHT_MODULES = [
+    "app.agent",
+    "app.agent.config",
+    "app.agent.entities.repository",
+    "app.agent.shared_libraries.metrics",
+    "app.agent.tools.tools",
+]
+
+
+def test_light_modules_do_not_import_the_agent_framework():
+    code = (
+        "import importlib, json, sys\n"
+        f"for module in {LIGHT_MODULES!r}:\n"
+        "    importlib.import_module(module)\n"
+        "heavy = ('google.adk', 'vertexai', 'google.cloud.aiplatform')\n"
+        "print(json.dumps(sorted(m for m in sys.modules if m.startswith(heavy))))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert json.loads(output) == []
+
+
+def test_agent_is_loaded_on_first_access():
+    import app.agent
+    from app.agent.shared_libraries import before_agent, metrics
+    from app.agent.shared_libraries.metrics import MetricsRegistry
+
+    assert app.agent.agent.root_agent.before_agent_callback is before_agent
+    assert isinstance(metrics, MetricsRegistry)
+
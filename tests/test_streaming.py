@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastmcp import FastMCP
+
+from app.agent.shared_libraries.metrics import metrics
+
+from app.agent.tools.registry import ToolRegistry
+from mcp_server import streaming
+from mcp_server.executor import ToolExecutor, ToolTimeout
+from mcp_server.fast_mcp_client import CustomerServicesMCPClient
+
+
+def slow_catalog(pages: int) -> dict:
+    """Lists a catalog that takes a while to build.
+
+    Args:
+        pages: Number of pages in the catalog.
+    """
+    return {"items": list(range(pages * 2))}
+
+
+def slow_catalog_chunks(args, chunk_size):
+    for page in range(args["pages"]):
+        time.sleep(0.1)
+        yield [page * 2, page * 2 + 1]
+    return {"pages": args["pages"]}
+
+
+def test_stream_yields_chunks_before_the_result_is_complete(monkeypatch):
+    monkeypatch.setitem(streaming.CHUNK_SOURCES, "slow_catalog", slow_catalog_chunks)
+    executor = ToolExecutor(ToolRegistry([slow_catalog]), thread_workers=2)
+    mcp = FastMCP(name="streaming-test")
+    executor.register_fastmcp(mcp)
+
+    async def run():
+        arrivals, chunks = [], []
+        async with CustomerServicesMCPClient(mcp) as client:
+            start = time.monotonic()
+            async for chunk in client.stream("slow_catalog", {"pages": 5}):
+                arrivals.append(time.monotonic() - start)
+                chunks.append(chunk)
+            return arrivals, chunks, client.last_stream_summary
+
+    try:
+        arrivals, chunks, summary = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert chunks == [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9]]
+    assert summary == {"pages": 5}
+    assert arrivals[0] < 0.3
+    assert arrivals[-1] >= 0.5
+
+
+class Overlap:
+    """Counts how many chunks are being produced at once."""
+
+    def __init__(self):
+        self.current = self.most = 0
+        self._lock = threading.Lock()
+
+    def chunks(self, args, chunk_size):
+        for page in range(args["pages"]):
+            with self._lock:
+                self.current += 1
+                self.most = max(self.most, self.current)
+            time.sleep(0.05)
+            with self._lock:
+                self.current -= 1
+            yield [page]
+        return {}
+
+
+def test_streams_share_the_tool_concurrency_limit(monkeypatch):
+    metrics.reset()
+    overlap = Overlap()
+    monkeypatch.setitem(streaming.CHUNK_SOURCES, "slow_catalog", overlap.chunks)
+    executor = ToolExecutor(
+        ToolRegistry([slow_catalog]),
+        thread_workers=4,
+        tool_limits={"slow_catalog": 1},
+    )
+
+    async def read(stream):
+        return [chunk async for chunk in stream]
+
+    async def run():
+        streams = [
+            await executor.stream("slow_catalog", {"pages": 3}) for _ in range(3)
+        ]
+        return await asyncio.gather(*(read(stream) for stream in streams))
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert results == [[[0], [1], [2]]] * 3
+    assert overlap.most == 1
+    assert metrics.get("tool_queue", "slow_catalog").calls == 12
+
+
+def test_stream_gives_up_at_the_tool_timeout(monkeypatch):
+    metrics.reset()
+    monkeypatch.setitem(streaming.CHUNK_SOURCES, "slow_catalog", slow_catalog_chunks)
+    executor = ToolExecutor(
+        ToolRegistry([slow_catalog]),
+        thread_workers=2,
+        tool_timeouts={"slow_catalog": 0.25},
+    )
+
+    async def run():
+        chunks = []
+        stream = await executor.stream("slow_catalog", {"pages": 5})
+        start = time.monotonic()
+        with pytest.raises(ToolTimeout):
+            async for chunk in stream:
+                chunks.append(chunk)
+        return chunks, time.monotonic() - start
+
+    try:
+        chunks, elapsed = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    # Each chunk takes 0.1s: the timeout covers the stream, not each chunk.
+    assert chunks == [[0, 1], [2, 3]]
+    assert elapsed < 0.35
+    assert (
+        metrics.counter("tool_timeouts_total", tool="slow_catalog", limit="timeout")
+        == 1
+    )
+
+
+def test_stream_call_without_progress_token_returns_items_inline():
+    executor = ToolExecutor(thread_workers=2)
+
+    async def run():
+        listed = await streaming.stream_call(
+            executor, "check_product_list", {"department": "seeds"}, chunk_size=2
+        )
+        sent = []
+
+        async def send(progress, message):
+            sent.append((progress, message))
+
+        streamed = await streaming.stream_call(
+            executor,
+            "check_product_availability",
+            {
+                "product_ids": ["seed-101", "tool-001", "decor-202"],
+                "store_id": "london",
+            },
+            chunk_size=2,
+            send=send,
+        )
+        return listed, streamed, sent
+
+    try:
+        listed, streamed, sent = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert listed["streamed"] is False
+    assert [p["department"] for p in listed["items"]] == ["seeds"] * 3
+    assert listed["summary"] == {"department": "seeds", "total_products": 3}
+
+    assert streamed["chunks"] == 2 and streamed["items"] == 3
+    assert streamed["summary"] == {"store": "london", "product_count": 3}
+    assert [progress for progress, _ in sent] == [2, 3]
@@ -0,0 +1,53 @@
+from typing import List
+
+from app.agent.entities.customer import Customer, Purchase, type_adapter
+from app.agent.entities.repository import (
+    DEFAULT_FIXTURE,
+    CustomerRepository,
+    decode_many,
+)
+from app.agent.entities.views import CustomerView
+
+
+def stored_profile():
+    repo = CustomerRepository()
+    repo.load_fixture(DEFAULT_FIXTURE)
+    return repo, repo.get("456").model_dump_json()
+
+
+def test_view_parses_lazily_and_is_read_only():
+    repo, raw = stored_profile()
+    view = repo.get_view("456")
+
+    assert view.to_json() == raw
+    assert view.customer_first_name == "Priya"
+    assert view.billing_address.city == "London"
+    assert view.purchase_summary.recent_orders[0].items[0].product_id == "decor-201"
+    assert view.to_customer() == repo.get("456")
+    assert repo.get_view("missing") is None
+    try:
+        view.email = "x"
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("views are read-only")
+    assert not hasattr(view, "__dict__")
+
+
+def test_decode_many_matches_per_document_validation():
+    repo, raw = stored_profile()
+    documents = [repo.get(i).model_dump_json() for i in ("123", "456", "789")]
+
+    assert decode_many(Customer, documents) == [
+        Customer.model_validate_json(d) for d in documents
+    ]
+    assert decode_many(Customer, []) == []
+    assert type_adapter(List[Purchase]) is type_adapter(List[Purchase])
+
+
+def test_view_from_dict():
+    _, raw = stored_profile()
+    view = CustomerView(Customer.model_validate_json(raw).model_dump())
+
+    assert view.garden_profile.interests == ["flowers", "containers"]
+    assert view.to_customer() == Customer.model_validate_json(raw)
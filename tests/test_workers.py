@@ -0,0 +1,168 @@
+import importlib.util
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+
+import httpx
+
+from app.agent.config import SchedulerModel
+from app.agent.entities.carts import CartStore, set_cart_store
+from app.agent.shared_libraries.scheduler import LlmScheduler
+from app.agent.tools.tools import access_cart_information, modify_cart
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = os.path.join(ROOT, "deploy", "workers.py")
+
+
+def load_workers():
+    spec = importlib.util.spec_from_file_location("workers", WORKERS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def add_to_cart(path, times):
+    set_cart_store(CartStore(path))
+    for _ in range(times):
+        modify_cart(
+            "123",
+            items_to_add=[{"product_id": "seed-101", "quantity": 1}],
+            items_to_remove=[],
+        )
+
+
+def test_cart_edits_from_several_workers_are_not_lost(tmp_path):
+    path = str(tmp_path / "carts.db")
+    store = CartStore(path)
+    set_cart_store(store)
+    try:
+        assert access_cart_information("123")["subtotal"] == 25.97
+
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=add_to_cart, args=(path, 25)) for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+            assert process.exitcode == 0
+
+        cart = {item["product_id"]: item for item in store.get("123")}
+        assert cart["seed-101"]["quantity"] == 101
+        assert cart["soil-123"]["quantity"] == 2
+    finally:
+        set_cart_store(None)
+        store.close()
+
+
+def test_scheduler_limits_are_split_between_workers():
+    workers = load_workers()
+    settings = SchedulerModel(max_concurrency=8, rpm=10)
+    scheduler = LlmScheduler(max_concurrency=8, rpm=10)
+
+    workers.split_scheduler_limits(4, 1, scheduler, settings)
+
+    assert scheduler.max_concurrency == 2
+    assert scheduler.rpm == 3
+    # A second split, e.g. in a recycled worker, starts from the settings.
+    workers.split_scheduler_limits(4, 1, scheduler, settings)
+    assert scheduler.max_concurrency == 2
+    assert scheduler.rpm == 3
+
+
+def test_scheduler_limits_add_up_to_the_configured_ones():
+    workers = load_workers()
+    for settings, requested in (
+        (SchedulerModel(max_concurrency=4, rpm=10), 4),
+        # More workers than requests per minute: capped, not given 1 rpm each.
+        (SchedulerModel(max_concurrency=8, rpm=3), 16),
+    ):
+        count = min(requested, workers.scheduler_worker_cap(settings))
+        schedulers = [LlmScheduler() for _ in range(count)]
+        for slot, scheduler in enumerate(schedulers):
+            workers.split_scheduler_limits(count, slot, scheduler, settings)
+
+        assert sum(s.max_concurrency for s in schedulers) == settings.max_concurrency
+        assert sum(s.rpm for s in schedulers) == settings.rpm
+        assert min(s.rpm for s in schedulers) >= 1
+
+
+SERVER = """
+import importlib.util
+import os
+
+from fastapi import FastAPI
+
+spec = importlib.util.spec_from_file_location("workers", {path!r})
+workers = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(workers)
+
+app = FastAPI()
+
+
+@app.get("/pid")
+async def pid():
+    return {{"pid": os.getpid()}}
+
+
+workers.Supervisor(
+    app, host="127.0.0.1", port={port}, workers=2, max_requests=5,
+    graceful_timeout=5,
+).run()
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_pid(client, timeout=10.0):
+    give_up = time.monotonic() + timeout
+    while True:
+        try:
+            return client.get("/pid").json()["pid"]
+        except httpx.TransportError:
+            if time.monotonic() > give_up:
+                raise
+            time.sleep(0.05)
+
+
+def test_supervisor_recycles_and_stops_workers():
+    port = free_port()
+    source = textwrap.dedent(SERVER.format(path=WORKERS, port=port))
+    supervisor = subprocess.Popen([sys.executable, "-c", source])
+    try:
+        with httpx.Client(
+            base_url=f"http://127.0.0.1:{port}",
+            # A new connection per request, so requests reach both workers.
+            limits=httpx.Limits(max_keepalive_connections=0),
+        ) as client:
+            # Each worker is replaced after 5 requests.
+            pids = set()
+            give_up = time.monotonic() + 20
+            while len(pids) < 5 and time.monotonic() < give_up:
+                pids.add(get_pid(client))
+                time.sleep(0.02)
+            assert len(pids) >= 5
+            assert supervisor.pid not in pids
+
+            before = {get_pid(client) for _ in range(4)}
+            supervisor.send_signal(signal.SIGHUP)
+            time.sleep(1.0)
+            after = {get_pid(client) for _ in range(4)}
+            assert not before & after
+
+        supervisor.send_signal(signal.SIGTERM)
+        assert supervisor.wait(15) == 0
+    finally:
+        if supervisor.poll() is None:
+            supervisor.kill()
+            supervisor.wait()